@@ -1,16 +1,12 @@
+import json
 import os
 import sys
 import streamlit as st
-import nltk
 import streamlit.components.v1 as components
-from collections import Counter
 import random
-import wikipedia
+import time
 import re
-
-# Download NLTK punkt tokenizer if not already present
-nltk.download('punkt_tab')
-from nltk.tokenize import sent_tokenize
+import uuid
 
 # Setup for local module imports
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -18,10 +14,49 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 # Custom modules
-from utils.preprocess import extract_text_from_pdf, chunk_text, get_document_stats, estimate_document_size
-from models.summarizer import summarize_chunks, create_document_summary
-from models.relations_extract import extract_relations, extract_relations_batch
-from pipeline.concept_graph import parse_triplets, build_graph, visualize_graph, get_layout_options, get_learning_path_mermaid
+from pipeline.concept_graph import build_graph, render_graph_html, get_layout_options, get_learning_path_mermaid
+from pipeline import stages
+from pipeline.concept_index import get_concept_index
+from pipeline.lod import render_lod_html, use_level_of_detail
+from pipeline.analytics import get_analytics
+from pipeline.corpus import CorpusGraph, corpus_path
+from pipeline.glossary import build_glossary_engine
+from utils.groq_utils import llm_available, llm_backend
+from pipeline.jobs import CANCELLED, DONE, FAILED, JobRegistry, PipelineJob
+from config import PROFILES, profile_name
+from utils.tracing import tracing
+
+# Seconds between progress polls while a pipeline job runs
+JOB_POLL_INTERVAL = 1.0
+
+# One job registry per server, so reruns and sessions share running jobs
+@st.cache_resource(show_spinner=False)
+def get_job_registry():
+    return JobRegistry()
+
+# Later stages are memoized by the upload's content hash and their
+# parameters, so widget interactions only re-run rendering. Arguments with a
+# leading underscore are not hashed by Streamlit; the hash stands in for them.
+# Streamlit hashes only the arguments actually passed, not defaults, so call
+# sites pass the stage's version explicitly.
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_canonical(file_hash, use_llm, profile, _triplets, version):
+    return stages.canonicalize_stage(_triplets)
+
+# Graphs are shared, not copied, so their memoized analytics and search
+# index survive reruns
+@st.cache_resource(show_spinner=False, max_entries=8)
+def cached_graph(file_hash, use_llm, profile, _triplets, version):
+    return stages.graph_stage(_triplets)
+
+# Sentence index and resolved definitions are kept per document
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_glossary_engine(file_hash, use_llm, profile, _summaries, _chunks):
+    return build_glossary_engine(_summaries, _chunks, profile=profile)
+
+@st.cache_resource(show_spinner=False)
+def load_corpus(corpus_name):
+    return CorpusGraph(corpus_path(corpus_name))
 
 # Streamlit UI config
 st.set_page_config(page_title="MindSketch", layout="wide")
@@ -91,13 +126,31 @@ st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 st.markdown('<div class="section-title">📄 Document Upload & Stats</div>', unsafe_allow_html=True)
 st.markdown('<div class="card">', unsafe_allow_html=True)
 
-# Check for Groq API key
-groq_available = os.getenv("GROQ_API_KEY") is not None
-if groq_available:
+# Check for Groq API key (or the offline fake backend)
+groq_available = llm_available()
+if groq_available and llm_backend() == "fake":
+    st.info("🧪 Fake LLM backend active - results are for testing only.")
+elif groq_available:
     st.success("✅ Groq API detected - Using enhanced AI models!")
 else:
     st.warning("⚠️ GROQ_API_KEY not found. Using fallback models (BART + REBEL).")
 
+# Runtime profile: trades speed and cost against quality for new documents
+st.sidebar.header("⚡ Performance")
+profile_names = list(PROFILES)
+selected_profile = st.sidebar.selectbox(
+    "Profile:",
+    options=profile_names,
+    format_func=lambda name: f"{name.capitalize()} - {PROFILES[name]['description']}",
+    index=profile_names.index(profile_name()),
+    help="Model, chunk size and concurrency used to process the document"
+)
+trace_enabled = st.sidebar.checkbox(
+    "Trace pipeline stages",
+    value=False,
+    help="Time every stage and LLM call; shows a summary and a Chrome/Perfetto trace download"
+)
+
 # Layout selection
 st.sidebar.header("🎨 Visualization Options")
 layout_options = get_layout_options()
@@ -108,6 +161,26 @@ selected_layout = st.sidebar.selectbox(
     index=0
 )
 
+detail_options = {
+    "auto": "Automatic (clusters for large maps)",
+    "clusters": "Cluster overview (click to expand)",
+    "all": "All concepts",
+}
+detail_level = st.sidebar.selectbox(
+    "Level of detail:",
+    options=list(detail_options.keys()),
+    format_func=lambda x: detail_options[x],
+    index=0
+)
+
+# Corpus mode: merge every upload into one persistent course-level map
+st.sidebar.header("📚 Corpus")
+corpus_name = st.sidebar.text_input(
+    "Corpus name (optional):",
+    placeholder="e.g. Biology 101",
+    help="Uploads with the same corpus name are merged into one concept map that is kept between sessions"
+).strip()
+
 # Search functionality
 st.sidebar.header("🔍 Search & Filter")
 
@@ -131,6 +204,13 @@ with col2:
         st.session_state.regenerate_graph = False
         st.rerun()
 
+fuzzy_search = st.sidebar.checkbox(
+    "Match partial and misspelled words",
+    value=False,
+    help="Also match word prefixes and close spellings"
+)
+search_mode = "fuzzy" if fuzzy_search else "exact"
+
 # Add toggle button for view mode
 if search_term:
     col1, col2 = st.sidebar.columns([1, 1])
@@ -152,51 +232,12 @@ if search_term:
             st.session_state.regenerate_graph = False
             st.rerun()
 
-# Show search results
-if search_term and 'final_triplets' in locals():
-    matching_nodes = []
-    search_words = search_term.lower().split()  # Split into individual words
-    
-    for triplet in final_triplets:
-        subject, relation, obj = triplet
-        subject_words = subject.lower().split()
-        obj_words = obj.lower().split()
-        
-        # Check if any search word exactly matches any word in subject or object
-        for search_word in search_words:
-            if (search_word in subject_words or search_word in obj_words):
-                matching_nodes.extend([subject, obj])
-                break  # Found a match, no need to check other search words
-    
-    matching_nodes = list(set(matching_nodes))  # Remove duplicates
-    
-    if matching_nodes:
-        st.sidebar.success(f"Found {len(matching_nodes)} matching concepts!")
-        
-        if st.session_state.show_filtered:
-            st.sidebar.info("💡 Graph view is filtered to show only matching concepts and their connections")
-        else:
-            st.sidebar.info("🌐 Showing complete concept map (all concepts)")
-        
-        st.sidebar.write("**Matching concepts:**")
-        for node in matching_nodes[:5]:  # Show first 5
-            st.sidebar.write(f"• {node}")
-        if len(matching_nodes) > 5:
-            st.sidebar.write(f"... and {len(matching_nodes) - 5} more")
-    else:
-        st.sidebar.info("No matching concepts found")
-        st.sidebar.warning("Graph will show all concepts")
-elif search_term:
-    st.sidebar.info("Upload a PDF and generate a concept map to search")
-
 # File uploader
 uploaded = st.file_uploader("📄 Upload your notes or textbook (PDF)", type=["pdf"])
 
 if uploaded:
-    os.makedirs("data", exist_ok=True)
-    pdf_path = "data/input.pdf"
-    with open(pdf_path, "wb") as f:
-        f.write(uploaded.read())
+    pdf_bytes = uploaded.getvalue()
+    file_hash = stages.content_hash(pdf_bytes)
 
     # Check file size and warn for very large files
     file_size_mb = uploaded.size / (1024 * 1024)
@@ -206,158 +247,185 @@ if uploaded:
     elif file_size_mb > 10:
         st.info(f"📄 PDF size: {file_size_mb:.1f} MB - Processing should be smooth.")
 
-    # Step 1: Extract text from PDF
-    with st.spinner("🔍 Extracting text from PDF..."):
-        try:
-            progress_placeholder = st.empty()
-            def progress_callback(message):
-                progress_placeholder.info(message)
-            raw_text = extract_text_from_pdf(pdf_path, progress_callback)
-            doc_stats = get_document_stats(raw_text)
-            # --- Professional Info Card for Document Stats ---
-            st.markdown("""
-            <div style='display:flex;gap:24px;justify-content:center;margin-bottom:18px;'>
-                <div style='background:linear-gradient(120deg,#e0f2fe 60%,#38bdf8 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #2563eb18;'>
-                    <div style='font-size:2em;'>📄</div>
-                    <div style='font-size:1.2em;font-weight:600;color:#2563eb;'>Pages</div>
-                    <div style='font-size:1.3em;font-weight:700;'>{pages}</div>
-                </div>
-                <div style='background:linear-gradient(120deg,#fbbf24 60%,#ffe082 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #fbbf2418;'>
-                    <div style='font-size:2em;'>📝</div>
-                    <div style='font-size:1.2em;font-weight:600;color:#b45309;'>Words</div>
-                    <div style='font-size:1.3em;font-weight:700;'>{words}</div>
-                </div>
-                <div style='background:linear-gradient(120deg,#d1fae5 60%,#34d399 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #34d39918;'>
-                    <div style='font-size:2em;'>🔤</div>
-                    <div style='font-size:1.2em;font-weight:600;color:#059669;'>Sentences</div>
-                    <div style='font-size:1.3em;font-weight:700;'>{sentences}</div>
-                </div>
-                <div style='background:linear-gradient(120deg,#fce7f3 60%,#f472b6 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #f472b618;'>
-                    <div style='font-size:2em;'>📊</div>
-                    <div style='font-size:1.2em;font-weight:600;color:#be185d;'>Size</div>
-                    <div style='font-size:1.3em;font-weight:700;'>{size}</div>
-                </div>
+    # Steps 1-5 (text extraction, overview, chunking, relations, summaries) run
+    # as a background job shared by every rerun and session with the same upload.
+    # The job is keyed on content and profile only and always traced, so
+    # toggling the trace display does not rerun any LLM work.
+    registry = get_job_registry()
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    job_key = (file_hash, groq_available, selected_profile)
+    previous_key = st.session_state.get("job_key")
+    if previous_key is not None and previous_key != job_key:
+        # A new file was uploaded: stop working on the old one unless another session still uses it
+        registry.release(previous_key, session_id)
+    st.session_state.job_key = job_key
+    job = registry.submit(
+        job_key, lambda: PipelineJob(pdf_bytes, use_llm=groq_available, profile=selected_profile, trace=True),
+        session=session_id,
+    )
+    job_state = job.snapshot()
+    tracer = job.tracer if trace_enabled else None
+
+    doc_stats = job.partial_result("doc_stats")
+    if doc_stats:
+        # --- Professional Info Card for Document Stats ---
+        st.markdown("""
+        <div style='display:flex;gap:24px;justify-content:center;margin-bottom:18px;'>
+            <div style='background:linear-gradient(120deg,#e0f2fe 60%,#38bdf8 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #2563eb18;'>
+                <div style='font-size:2em;'>📄</div>
+                <div style='font-size:1.2em;font-weight:600;color:#2563eb;'>Pages</div>
+                <div style='font-size:1.3em;font-weight:700;'>{pages}</div>
             </div>
-            """.format(
-                pages=f"{doc_stats.get('estimated_pages', 0):.0f}",
-                words=f"{doc_stats.get('words', 0):,}",
-                sentences=f"{doc_stats.get('sentences', 0):,}",
-                size=doc_stats.get('size_category', 'unknown').title()
-            ), unsafe_allow_html=True)
-        except Exception as e:
-            st.error(f"Failed to extract text: {e}")
-            st.stop()
-
-    # Step 2: Create document overview
-    if groq_available:
-        with st.spinner("📋 Creating document overview..."):
-            try:
-                doc_summary = create_document_summary(raw_text)
-                st.markdown("""
-                <div style='background:linear-gradient(120deg,#f9fafb 60%,#e0f2fe 100%);border-radius:12px;padding:20px 28px;margin:18px 0 0 0;box-shadow:0 2px 8px #2563eb12;'>
-                    <div style='font-size:1.15em;font-weight:600;color:#2563eb;margin-bottom:6px;'>📝 Document Overview</div>
-                    <div style='font-size:1.08em;color:#222;'>{summary}</div>
-                </div>
-                """.format(summary=doc_summary), unsafe_allow_html=True)
-            except Exception as e:
-                st.warning(f"Document overview failed: {e}")
-
-    # Step 3: Sentence tokenization
-    with st.spinner("🔤 Processing sentences..."):
-        try:
-            sentences = sent_tokenize(raw_text)
-        except Exception as e:
-            st.error(f"Sentence tokenization failed: {e}")
-            st.stop()
-
-    # Step 4: Chunking text
-    with st.spinner("Processing document..."):
-        try:
-            chunk_progress_placeholder = st.empty()
-            def chunk_progress_callback(message):
-                pass  # No UI update
-            doc_size, recommended_chunk_size, recommended_overlap = estimate_document_size(raw_text)
-            chunks = chunk_text(raw_text, max_tokens=recommended_chunk_size, progress_callback=chunk_progress_callback)
-        except Exception as e:
-            st.error(f"Chunking failed: {e}")
-            st.stop()
-
-    # Step 5: Overlap chunks
-    with st.spinner():
-        try:
-            def overlap_progress_callback(message):
-                pass  # No UI update
-            from utils.preprocess import overlap_chunks
-            chunks = overlap_chunks(chunks, overlap=recommended_overlap, progress_callback=overlap_progress_callback)
-        except Exception as e:
-            st.error(f"Overlap creation failed: {e}")
-            st.stop()
-
-    # Step 6: Summarize chunks
-    try:
-        summaries = summarize_chunks(chunks)
-    except Exception as e:
-        st.error(f"Summarization failed: {e}")
+            <div style='background:linear-gradient(120deg,#fbbf24 60%,#ffe082 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #fbbf2418;'>
+                <div style='font-size:2em;'>📝</div>
+                <div style='font-size:1.2em;font-weight:600;color:#b45309;'>Words</div>
+                <div style='font-size:1.3em;font-weight:700;'>{words}</div>
+            </div>
+            <div style='background:linear-gradient(120deg,#d1fae5 60%,#34d399 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #34d39918;'>
+                <div style='font-size:2em;'>🔤</div>
+                <div style='font-size:1.2em;font-weight:600;color:#059669;'>Sentences</div>
+                <div style='font-size:1.3em;font-weight:700;'>{sentences}</div>
+            </div>
+            <div style='background:linear-gradient(120deg,#fce7f3 60%,#f472b6 100%);border-radius:12px;padding:18px 28px;min-width:120px;text-align:center;box-shadow:0 2px 8px #f472b618;'>
+                <div style='font-size:2em;'>📊</div>
+                <div style='font-size:1.2em;font-weight:600;color:#be185d;'>Size</div>
+                <div style='font-size:1.3em;font-weight:700;'>{size}</div>
+            </div>
+        </div>
+        """.format(
+            pages=f"{doc_stats.get('estimated_pages', 0):.0f}",
+            words=f"{doc_stats.get('words', 0):,}",
+            sentences=f"{doc_stats.get('sentences', 0):,}",
+            size=doc_stats.get('size_category', 'unknown').title()
+        ), unsafe_allow_html=True)
+
+    doc_summary = job.partial_result("overview")
+    if doc_summary:
+        st.markdown("""
+        <div style='background:linear-gradient(120deg,#f9fafb 60%,#e0f2fe 100%);border-radius:12px;padding:20px 28px;margin:18px 0 0 0;box-shadow:0 2px 8px #2563eb12;'>
+            <div style='font-size:1.15em;font-weight:600;color:#2563eb;margin-bottom:6px;'>📝 Document Overview</div>
+            <div style='font-size:1.08em;color:#222;'>{summary}</div>
+        </div>
+        """.format(summary=doc_summary), unsafe_allow_html=True)
+
+    if job_state["status"] == FAILED:
+        st.error(f"Processing failed: {job_state['error']}")
+        if st.button("🔄 Retry"):
+            registry.discard(job_key)
+            st.rerun()
         st.stop()
 
-    # Step 7: Extract relations
-    st.info("🔗 Extracting relations...")
-    all_triplets = []
-    
-    # Use batch extraction if Groq is available
-    if groq_available:
-        try:
-            with st.spinner("Extracting relations using Groq..."):
-                all_triplets = extract_relations_batch(chunks)
-        except Exception as e:
-            st.warning(f"Batch extraction failed: {e}. Trying individual extraction...")
-            all_triplets = []
-    
-    # Fallback to individual extraction
-    if not all_triplets:
-        for i, chunk in enumerate(chunks):
-            with st.spinner(f"Extracting relations from chunk {i+1}/{len(chunks)}..."):
-                try:
-                    rel_text = extract_relations(chunk)
-                    triplets = parse_triplets(rel_text)
-                    all_triplets.extend(triplets)
-                except Exception as e:
-                    st.warning(f"Relation extraction failed for chunk {i+1}: {e}")
-
-    # Deduplicate and filter triplets
-    def is_valid_triplet(triplet):
-        s, r, o = triplet
-        if not s or not r or not o:
-            return False
-        if len(s) < 2 or len(r) < 2 or len(o) < 2:
-            return False
-        if s == o:
-            return False
-        generic_relations = {"has", "is", "part", "of", "in", "on", "with"}
-        if r.lower() in generic_relations:
-            return False
-        return True
-
-    filtered_triplets = [t for t in all_triplets if is_valid_triplet(t)]
-    triplet_counts = Counter(filtered_triplets)
-    final_triplets = [t for t, count in triplet_counts.items() if count > 1]
-    if len(final_triplets) < 5:
-        final_triplets = filtered_triplets
+    if job_state["status"] == CANCELLED:
+        st.info("⏹️ Processing was cancelled.")
+        if st.button("▶️ Restart processing"):
+            registry.discard(job_key)
+            st.rerun()
+        st.stop()
+
+    if job_state["status"] != DONE:
+        # Show progress and the concept map found so far, then poll again
+        if job_state["chunks_total"]:
+            st.progress(
+                job_state["progress"],
+                text=f"{job_state['stage']}: {job_state['chunks_done']}/{job_state['chunks_total']} chunks, "
+                     f"{job_state['triplets']} relations found",
+            )
+        else:
+            st.info(f"⏳ {job_state['stage']}...")
+        if st.button("⏹️ Cancel processing"):
+            registry.cancel(job_key)
+            st.rerun()
+        partial_triplets = job.partial_triplets()
+        if partial_triplets:
+            partial_graph = build_graph(partial_triplets)
+            st.caption(f"🌱 Partial concept map: {partial_graph.number_of_nodes()} concepts so far")
+            components.html(render_graph_html(partial_graph, selected_layout), height=600, scrolling=True)
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+
+    chunks = job.result["chunks"]
+    summaries = job.result["summaries"]
+    final_triplets = job.result["triplets"]
+    for warning in job.result["warnings"]:
+        st.warning(warning)
+    novelty_report = job.result.get("novelty")
+    if novelty_report and novelty_report["calls_saved"]:
+        st.caption(
+            f"🧭 Adaptive extraction: {novelty_report['chunks_processed']}/{novelty_report['chunks_total']} chunks "
+            f"sent to the model ({novelty_report['calls_saved']} calls saved) once new concepts became rare; "
+            f"estimated concept coverage {novelty_report['concept_coverage']:.0%}, "
+            f"vocabulary coverage {novelty_report['term_coverage']:.0%}. "
+            f"Choose the quality profile to extract every chunk."
+        )
 
     if not final_triplets:
         st.warning("⚠️ No relations could be extracted. Try uploading clearer text or check your model output above.")
         st.stop()
 
-    # Step 8: Build and visualize graph
+    # Merge near-duplicate concepts ("Neuron", "neurons", "the neuron") before graph construction
+    with st.spinner("🧩 Merging duplicate concepts..."), tracing(tracer):
+        final_triplets, canon_stats = cached_canonical(
+            file_hash, groq_available, selected_profile, final_triplets, stages.STAGE_VERSIONS["canonicalize"]
+        )
+    if canon_stats["canonical_nodes"] < canon_stats["original_nodes"]:
+        st.caption(
+            f"🧩 Merged duplicate concepts: {canon_stats['original_nodes']} → "
+            f"{canon_stats['canonical_nodes']} nodes ({canon_stats['reduction']:.0%} fewer)"
+        )
+
+    # Step 6: Build and visualize graph
     st.info("🌐 Building concept map...")
     try:
-        G = build_graph(final_triplets)
-        os.makedirs("outputs", exist_ok=True)
-        out_file = "outputs/concept_map.html"
+        # Graph building and rendering are recorded in the job's trace too (on every rerun)
+        with tracing(tracer):
+            if corpus_name:
+                corpus = load_corpus(corpus_name)
+                # Merged once per upload; re-uploading a changed document replaces its earlier contribution.
+                # The corpus is shared by every session: G is the merged graph at this point,
+                # which later uploads replace rather than change.
+                with corpus.lock:
+                    if not corpus.has_document(uploaded.name, file_hash):
+                        corpus.add_document(uploaded.name, final_triplets, content_hash=file_hash)
+                        corpus.save()
+                    G = corpus.G
+                    corpus_documents = len(corpus.documents)
+                st.caption(
+                    f"📚 Corpus '{corpus_name}': {corpus_documents} documents, "
+                    f"{G.number_of_nodes()} concepts, {G.number_of_edges()} relations"
+                )
+            else:
+                G = cached_graph(
+                    file_hash, groq_available, selected_profile, final_triplets, stages.STAGE_VERSIONS["graph"]
+                )
         
-        # Pass search term only if filtering is enabled
-        search_term_for_graph = search_term if st.session_state.show_filtered else None
-        visualize_graph(G, out_file, selected_layout, search_term_for_graph)
+            # Pass search term only if filtering is enabled
+            search_term_for_graph = search_term if st.session_state.show_filtered else None
+            # Rendered in memory and memoized per graph, layout and filter
+            if not search_term_for_graph and use_level_of_detail(G, detail_level):
+                html_content = render_lod_html(G, selected_layout)
+            else:
+                html_content = render_graph_html(G, selected_layout, search_term_for_graph, search_mode)
+
+        # Show search results (token index lookup, built once per graph)
+        if search_term:
+            matching_nodes = sorted(get_concept_index(G).search(search_term, search_mode).matches)
+            
+            if matching_nodes:
+                st.sidebar.success(f"Found {len(matching_nodes)} matching concepts!")
+                
+                if st.session_state.show_filtered:
+                    st.sidebar.info("💡 Graph view is filtered to show only matching concepts and their connections")
+                else:
+                    st.sidebar.info("🌐 Showing complete concept map (all concepts)")
+                
+                st.sidebar.write("**Matching concepts:**")
+                for node in matching_nodes[:5]:  # Show first 5
+                    st.sidebar.write(f"• {node}")
+                if len(matching_nodes) > 5:
+                    st.sidebar.write(f"... and {len(matching_nodes) - 5} more")
+            else:
+                st.sidebar.info("No matching concepts found")
+                st.sidebar.warning("Graph will show all concepts")
         
         # Reset regenerate flag after successful generation
         st.session_state.regenerate_graph = False
@@ -367,12 +435,8 @@ if uploaded:
         # Only display the graph if not regenerating
         if not st.session_state.regenerate_graph:
             try:
-                with open(out_file, "r", encoding="utf-8") as f:
-                    html_content = f.read()
                 components.html(html_content, height=800, scrolling=True)
                 st.download_button("Download Concept Map (HTML)", data=html_content, file_name="concept_map.html", mime="text/html")
-            except FileNotFoundError:
-                st.error("Graph file not found. Please try regenerating the concept map.")
             except Exception as e:
                 st.error(f"Error displaying graph: {e}")
         else:
@@ -380,22 +444,11 @@ if uploaded:
         
         # --- Learning Path (Visually Enhanced, Themed Colors, Max 6 Steps) ---
         st.subheader("🛤️ Learning Path (Recommended Order)")
-        try:
-            import networkx as nx
-            order = list(nx.topological_sort(G))
-        except Exception:
-            order = list(G.nodes)
-        # Remove duplicates, preserve order
-        seen = set()
-        unique_order = []
-        for concept in order:
-            c_lower = concept.strip().lower()
-            if c_lower not in seen:
-                unique_order.append(concept)
-                seen.add(c_lower)
-        # Prioritize by degree centrality for importance
-        degree_centrality = nx.degree_centrality(G)
-        unique_order = sorted(unique_order, key=lambda x: -degree_centrality.get(x, 0))
+        # Prerequisite order (SCC condensation), deduplicated and ranked by
+        # degree centrality; shared with rendering via the graph's analytics
+        analytics = get_analytics(G)
+        with tracing(tracer):
+            unique_order = analytics.ranked_concepts
         max_steps = 6
         if unique_order:
             st.markdown("""
@@ -448,23 +501,19 @@ if uploaded:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         # Use node names from the concept map as glossary terms
         if 'G' in locals() and G is not None:
-            terms = sorted(set(G.nodes))
+            terms = analytics.terms
         else:
             terms = []
-        def get_definition(term, summaries):
-            for s in summaries:
-                if term in s and len(s) < 120:
-                    return s
-            try:
-                return wikipedia.summary(term, sentences=1, auto_suggest=True, redirect=True)
-            except Exception:
-                return "No definition found."
         search = st.text_input("Search glossary:", "", key="glossary_search")
         filtered_terms = [t for t in terms if search.lower() in t.lower()]
         if filtered_terms:
+            # Document sentences first, then cached or concurrently fetched external definitions
+            glossary = get_glossary_engine(file_hash, groq_available, selected_profile, summaries, chunks)
+            with st.spinner("📚 Looking up definitions..."), tracing(tracer):
+                definitions = glossary.define_all(filtered_terms)
             for term in filtered_terms:
-                definition = get_definition(term, summaries)
-                if definition and definition != "No definition found.":
+                definition = definitions.get(term)
+                if definition:
                     st.markdown(f"""
                     <div style='background:linear-gradient(120deg,#e0f2fe 60%,#38bdf8 100%);border-radius:10px;padding:14px 20px;margin-bottom:12px;box-shadow:0 1px 4px #2563eb10;'>
                         <b style='color:#2563eb;font-size:1.1em;'>{term}</b><br>
@@ -492,6 +541,31 @@ if uploaded:
     except Exception as e:
         st.error(f"Graph building or visualization failed: {e}")
 
+    if tracer is not None:
+        with st.expander("⏱️ Pipeline trace", expanded=False):
+            st.dataframe(
+                [
+                    {
+                        "Span": row["name"],
+                        "Calls": row["count"],
+                        "Total (ms)": round(row["total_ms"], 1),
+                        "Mean (ms)": round(row["mean_ms"], 2),
+                        "Max (ms)": round(row["max_ms"], 1),
+                        "Share": f"{row['share']:.0%}",
+                    }
+                    for row in tracer.summary()
+                ],
+                use_container_width=True,
+            )
+            st.download_button(
+                "Download trace (Chrome / Perfetto JSON)",
+                data=json.dumps(tracer.to_chrome_trace(), default=str),
+                file_name="mindsketch_trace.json",
+                mime="application/json",
+            )
+elif search_term:
+    st.sidebar.info("Upload a PDF and generate a concept map to search")
+
 st.markdown('</div>', unsafe_allow_html=True)
 st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 st.markdown('<div class="section-title">🌐 Concept Map Visualization</div>', unsafe_allow_html=True)
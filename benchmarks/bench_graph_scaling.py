@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the graph layer on synthetic triplets (benchmarks/synthetic.py).
+
+For each size, builds the concept graph and runs every graph stage the app
+uses: canonicalization, the analytics behind the learning path and glossary
+(centrality, communities, condensation, ordering, ranking, terms), concept
+search, server-side layout, rendering (visualize_graph and the cluster
+view), the Mermaid learning path and binary persistence. Reports wall time
+and peak Python heap per stage, plus the growth exponent between sizes
+(1.0 = linear, 2.0 = quadratic):
+
+    python benchmarks/bench_graph_scaling.py --sizes 1000 10000 100000 1000000
+
+A stage that exceeds --budget seconds is not run at larger sizes. Memory is
+measured with tracemalloc in a second run, only up to --memory-max triplets
+because tracing allocations slows everything down several times.
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import describe, generate_triplets
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+def reset_caches():
+    from pipeline import communities, concept_graph, layouts, lod
+    for cache in (communities._community_cache, concept_graph._render_cache, layouts._layout_cache, lod._lod_cache):
+        cache.clear()
+
+def graph_stages(out_dir):
+    """(name, function of state) in dependency order; state starts with the triplets."""
+    from pipeline.analytics import get_analytics
+    from pipeline.canonicalize import canonicalize_triplets
+    from pipeline.concept_graph import build_graph, get_learning_path_mermaid, visualize_graph
+    from pipeline.concept_index import get_concept_index
+    from pipeline.layouts import compute_layout
+    from pipeline.lod import render_lod_html
+    from pipeline.persistence import load_graph, save_graph
+
+    graph_path = os.path.join(out_dir, "graph.mskg")
+    html_path = os.path.join(out_dir, "concept_map.html")
+
+    def search(state):
+        index = get_concept_index(state["G"])
+        hub = next(iter(state["G"].nodes))
+        index.search(hub.split()[0], "prefix")
+
+    return [
+        ("canonicalize", lambda s: s.update(canonical=canonicalize_triplets(s["triplets"], use_embeddings=False)[0])),
+        ("build_graph", lambda s: s.update(G=build_graph(s["canonical"]))),
+        ("centrality", lambda s: get_analytics(s["G"]).centrality),
+        ("communities", lambda s: get_analytics(s["G"]).communities),
+        ("condensation", lambda s: get_analytics(s["G"]).condensation),
+        ("ordering", lambda s: get_analytics(s["G"]).ordering),
+        ("ranked_concepts", lambda s: get_analytics(s["G"]).ranked_concepts),
+        ("terms", lambda s: get_analytics(s["G"]).terms),
+        ("concept_search", search),
+        ("layout", lambda s: compute_layout(s["G"], use_cache=False)),
+        ("learning_path", lambda s: get_learning_path_mermaid(s["G"])),
+        ("visualize_graph", lambda s: visualize_graph(s["G"], out_file=html_path)),
+        ("render_lod", lambda s: render_lod_html(s["G"], use_cache=False)),
+        ("save_graph", lambda s: save_graph(s["G"], graph_path)),
+        ("load_graph", lambda s: load_graph(graph_path)),
+    ]
+
+def run_size(triplets, skip, out_dir, measure_memory):
+    """{stage: {"seconds", "peak_kb"}} for one triplet set; stages in skip are not run."""
+    results = {}
+    for with_memory in ([False, True] if measure_memory else [False]):
+        reset_caches()
+        gc.collect()
+        state = {"triplets": triplets}
+        for name, func in graph_stages(out_dir):
+            if name in skip:
+                continue
+            if with_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            try:
+                func(state)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - started
+            result = results.setdefault(name, {})
+            if with_memory:
+                result["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024)
+                tracemalloc.stop()
+            else:
+                result["seconds"] = round(elapsed, 4)
+            if error:
+                result["error"] = error
+                if name == "build_graph":
+                    break
+    return results
+
+def exponent(n1, t1, n2, t2):
+    """Growth exponent k in t ~ n^k between two measurements."""
+    if not t1 or not t2 or t1 <= 0 or t2 <= 0:
+        return None
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Triplet counts")
+    parser.add_argument("--budget", type=float, default=60.0, help="Seconds after which a stage is dropped for larger sizes")
+    parser.add_argument("--memory-max", type=int, default=100000, help="Largest size measured with tracemalloc")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write all results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MINDSKETCH_OFFLINE", "1")
+    report = {"sizes": [], "stages": {}}
+    skip = {}
+    previous = None
+    with tempfile.TemporaryDirectory() as out_dir:
+        for n in sorted(args.sizes):
+            started = time.perf_counter()
+            triplets = generate_triplets(n, seed=args.seed)
+            shape = describe(triplets)
+            shape["generate_seconds"] = round(time.perf_counter() - started, 2)
+            print(f"\n=== {n:,} triplets: {shape['concepts']:,} concepts, {shape['edges']:,} edges, "
+                  f"{shape['repeated_edges']:,} repeated, max degree {shape['max_degree']:,}", flush=True)
+
+            results = run_size(triplets, skip, out_dir, n <= args.memory_max)
+            shape["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+            report["sizes"].append(shape)
+
+            print(f"{'stage':<16} {'seconds':>10} {'peak MB':>9} {'growth':>7}")
+            for name, _ in graph_stages(out_dir):
+                if name in skip:
+                    print(f"{name:<16} {'skipped':>10}   (over budget at {skip[name]:,})")
+                    continue
+                result = results.get(name)
+                if result is None:
+                    continue
+                curve = report["stages"].setdefault(name, [])
+                growth = None
+                if previous is not None and curve:
+                    growth = exponent(previous, curve[-1]["seconds"], n, result["seconds"])
+                curve.append({"triplets": n, **result})
+                peak = f"{result['peak_kb'] / 1024:.1f}" if "peak_kb" in result else "-"
+                growth_text = f"{growth:.2f}" if growth is not None else "-"
+                print(f"{name:<16} {result['seconds']:>10.3f} {peak:>9} {growth_text:>7}"
+                      + (f"  {result['error']}" if "error" in result else ""))
+                if result["seconds"] > args.budget:
+                    skip[name] = n
+            print(f"process max RSS so far: {shape['max_rss_mb']:,} MB", flush=True)
+            previous = n
+            del triplets, results
+            gc.collect()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Peak memory of the text stages on a large PDF, with and without the lean
+document representation (utils/document.py).
+
+Each mode runs in a fresh process: extraction and document stats, chunking,
+relation extraction and chunk summaries with the offline LLM stand-in. It
+reports the process's peak RSS, the RSS after imports, and the peak
+Python heap (tracemalloc, measured in a separate run):
+
+    python benchmarks/bench_memory.py                   # generates a 600-page PDF
+    python benchmarks/bench_memory.py --pdf big.pdf
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+_WORDS = ("neuron axon dendrite synapse signal membrane potential channel sodium potassium receptor "
+          "cortex spinal cord reflex brain stem hormone gland cell nucleus energy transport pathway").split()
+
+def make_pdf(path, pages, seed=42):
+    """Write a PDF of pages pages of sentence-like filler text."""
+    import fitz
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        sentences = []
+        for _ in range(28):
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 18))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), " ".join(sentences), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+_CHILD = r"""
+import json, os, resource, sys, tracemalloc
+sys.path.insert(0, {root!r})
+os.environ.update(MINDSKETCH_LLM_BACKEND="fake", MINDSKETCH_OFFLINE="1", MINDSKETCH_FAKE_LATENCY="0")
+from pipeline import stages
+from utils.preprocess import ensure_nltk_data
+ensure_nltk_data()
+import fitz
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+baseline = rss_mb()
+if {trace!r}:
+    tracemalloc.start()
+text, doc_stats = stages.extract_stage({pdf!r}, lean={lean!r})
+chunks, doc_size = stages.chunk_stage(text)
+triplets, _ = stages.relations_stage(chunks)
+summaries = stages.summarize_stage(chunks)
+result = {{
+    "pages": round(doc_stats["estimated_pages"]),
+    "characters": doc_stats["characters"],
+    "chunks": len(chunks),
+    "triplets": len(triplets),
+    "baseline_rss_mb": round(baseline, 1),
+    "peak_rss_mb": round(rss_mb(), 1),
+}}
+if {trace!r}:
+    result["heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+print(json.dumps(result))
+"""
+
+def measure(pdf, lean, trace=False):
+    code = _CHILD.format(root=PROJECT_ROOT, pdf=pdf, lean=lean, trace=trace)
+    output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to measure (default: a generated one)")
+    parser.add_argument("--pages", type=int, default=600, help="Pages of the generated PDF")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = args.pdf
+        if pdf is None:
+            pdf = os.path.join(tmp, "large.pdf")
+            make_pdf(pdf, args.pages)
+        pdf = os.path.abspath(pdf)
+
+        print(f"{'mode':<8} {'pages':>6} {'chunks':>7} {'RSS after imports':>18} {'peak RSS':>9} "
+              f"{'growth':>7} {'heap peak':>10}")
+        for lean in (False, True):
+            result = measure(pdf, lean)
+            result["heap_peak_mb"] = measure(pdf, lean, trace=True)["heap_peak_mb"]
+            growth = result["peak_rss_mb"] - result["baseline_rss_mb"]
+            print(f"{'lean' if lean else 'legacy':<8} {result['pages']:>6} {result['chunks']:>7} "
+                  f"{result['baseline_rss_mb']:>15.1f} MB {result['peak_rss_mb']:>6.1f} MB {growth:>4.1f} MB "
+                  f"{result['heap_peak_mb']:>7.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark over the bundled PDFs.
+
+Runs every pipeline stage, and the whole pipeline, on each PDF with the
+deterministic offline LLM stand-in (utils/fake_llm.py), so results only
+change when the code does. For each PDF and stage it records:
+
+  seconds   median wall time over --repeat runs, caches cleared before each
+  peak_kb   peak Python heap allocation (tracemalloc; PyMuPDF's C heap is not seen)
+  calls     span counts from utils.tracing, e.g. LLM calls and cache hits
+
+Results are compared with benchmarks/baselines.json; the run fails (exit 1)
+when a stage is slower or uses more memory than its baseline by more than
+--threshold, or makes more LLM calls than before:
+
+    python benchmarks/bench_pipeline.py                 # compare with baselines
+    python benchmarks/bench_pipeline.py --update        # record new baselines
+    python benchmarks/bench_pipeline.py --pdfs try.pdf --repeat 5
+
+Wall times depend on the machine, so record baselines on the machine that
+runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Deterministic and offline, set before any pipeline module is imported
+os.environ["MINDSKETCH_LLM_BACKEND"] = "fake"
+os.environ["MINDSKETCH_FAKE_LATENCY"] = "0"
+os.environ["MINDSKETCH_OFFLINE"] = "1"
+
+BUNDLED_PDFS = [
+    "Solar_System_Overview.pdf",
+    "Nervous_System_MindSketch_Test.pdf",
+    "test.pdf",
+    "try.pdf",
+    "check.pdf",
+]
+BASELINE_PATH = os.path.join(PROJECT_ROOT, "benchmarks", "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.005
+MIN_PEAK_KB_DELTA = 256
+# Span names counted in "calls"
+COUNTED_SPANS = ["llm.call", "chunk.relations", "chunk.summary", "sentences.split", "graph.communities",
+                 "render.pyvis", "render.lod"]
+
+def reset_caches():
+    """Drop every in-process memo, so each run does the full work."""
+    from pipeline import communities, concept_graph, layouts, lod
+    from utils.groq_utils import clear_response_cache
+    clear_response_cache()
+    for cache in (communities._community_cache, concept_graph._render_cache, layouts._layout_cache, lod._lod_cache):
+        cache.clear()
+
+def stage_functions(pdf_bytes):
+    """(name, function) pairs; each function takes the previous stage outputs from a shared dict."""
+    from models.summarizer import create_document_summary
+    from pipeline import stages
+    from pipeline.analytics import get_analytics
+    from pipeline.concept_graph import render_graph_html
+    from pipeline.jobs import DONE, PipelineJob
+    from pipeline.lod import render_lod_html, use_level_of_detail
+
+    def render(G):
+        analytics = get_analytics(G)
+        analytics.centrality
+        analytics.communities
+        if use_level_of_detail(G):
+            return render_lod_html(G, use_cache=False)
+        return render_graph_html(G, use_cache=False)
+
+    def full(state):
+        job = PipelineJob(pdf_bytes, use_llm=True)
+        job.run()
+        if job.status != DONE:
+            raise RuntimeError(f"pipeline job {job.status}: {job.error}")
+        triplets, _ = stages.canonicalize_stage(job.result["triplets"])
+        return render(stages.graph_stage(triplets))
+
+    return [
+        ("extract", lambda s: s.update(text=stages.extract_stage(pdf_bytes)[0])),
+        ("overview", lambda s: create_document_summary(s["text"])),
+        ("chunk", lambda s: s.update(chunks=stages.chunk_stage(s["text"])[0])),
+        ("relations", lambda s: s.update(triplets=stages.relations_stage(s["chunks"])[0])),
+        ("summarize", lambda s: stages.summarize_stage(s["chunks"])),
+        ("canonicalize", lambda s: s.update(canonical=stages.canonicalize_stage(s["triplets"])[0])),
+        ("graph", lambda s: s.update(graph=stages.graph_stage(s["canonical"]))),
+        ("render", lambda s: render(s["graph"])),
+        ("full", full),
+    ]
+
+def run_stages(pdf_bytes, measure):
+    """Run every stage in order with measure(name, func, state) and return {stage: result}."""
+    state = {}
+    return {name: measure(name, func, state) for name, func in stage_functions(pdf_bytes)}
+
+def instrumented_pass(pdf_bytes):
+    """One run under tracemalloc and a tracer: peak memory and call counts per stage."""
+    from utils.tracing import Tracer, tracing
+
+    def measure(name, func, state):
+        reset_caches()
+        tracer = Tracer(name)
+        tracemalloc.start()
+        try:
+            with tracing(tracer):
+                func(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        counts = {row["name"]: row["count"] for row in tracer.summary() if row["name"] in COUNTED_SPANS}
+        cache_hits = sum(
+            1 for event in tracer.events if event["name"] == "llm.call" and event["args"].get("cache_hit")
+        )
+        if cache_hits:
+            counts["llm.cache_hit"] = cache_hits
+        return {"peak_kb": round(peak / 1024), "calls": counts}
+
+    return run_stages(pdf_bytes, measure)
+
+def timed_pass(pdf_bytes):
+    """One uninstrumented run: wall seconds per stage."""
+    def measure(name, func, state):
+        reset_caches()
+        started = time.perf_counter()
+        func(state)
+        return time.perf_counter() - started
+
+    return run_stages(pdf_bytes, measure)
+
+def benchmark_pdf(path, repeat):
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+    results = instrumented_pass(pdf_bytes)
+    times = [timed_pass(pdf_bytes) for _ in range(repeat)]
+    for stage, result in results.items():
+        result["seconds"] = round(statistics.median(run[stage] for run in times), 4)
+    return results
+
+def compare(results, baselines, threshold):
+    """List of regression messages; an empty list means the run passed."""
+    regressions = []
+    for pdf, stages in results.items():
+        for stage, result in stages.items():
+            base = baselines.get(pdf, {}).get(stage)
+            if base is None:
+                continue
+            where = f"{pdf} / {stage}"
+            seconds, base_seconds = result["seconds"], base["seconds"]
+            if seconds > base_seconds * (1 + threshold) and seconds - base_seconds > MIN_SECONDS_DELTA:
+                regressions.append(f"{where}: {seconds:.4f}s vs baseline {base_seconds:.4f}s "
+                                   f"(+{seconds / base_seconds - 1:.0%})")
+            peak, base_peak = result["peak_kb"], base["peak_kb"]
+            if peak > base_peak * (1 + threshold) and peak - base_peak > MIN_PEAK_KB_DELTA:
+                regressions.append(f"{where}: peak {peak} KB vs baseline {base_peak} KB")
+            base_llm = base["calls"].get("llm.call", 0)
+            llm = result["calls"].get("llm.call", 0)
+            if llm > base_llm:
+                regressions.append(f"{where}: {llm} LLM calls vs baseline {base_llm}")
+    return regressions
+
+def print_results(results, baselines):
+    print(f"{'pdf':<36} {'stage':<13} {'seconds':>9} {'base':>9} {'peak KB':>9} {'llm':>5}  calls")
+    for pdf, stages in results.items():
+        for stage, result in stages.items():
+            base = baselines.get(pdf, {}).get(stage)
+            base_text = f"{base['seconds']:.4f}" if base else "-"
+            calls = ", ".join(f"{name}={count}" for name, count in sorted(result["calls"].items()))
+            print(f"{pdf[:36]:<36} {stage:<13} {result['seconds']:>9.4f} {base_text:>9} {result['peak_kb']:>9} "
+                  f"{result['calls'].get('llm.call', 0):>5}  {calls}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", nargs="+", default=BUNDLED_PDFS, help="PDFs relative to the project root")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per PDF; the median is reported")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help=f"Allowed slowdown ratio (default: from the baselines file, else {DEFAULT_THRESHOLD})")
+    parser.add_argument("--baselines", default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baselines")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    from utils.preprocess import ensure_nltk_data
+    # One-time setup (NLTK data check, model imports) is not part of any stage
+    sentence_backend = "nltk" if ensure_nltk_data() else "regex"
+    with open(os.path.join(PROJECT_ROOT, args.pdfs[0]), "rb") as f:
+        run_stages(f.read(), lambda name, func, state: func(state))
+
+    results = {}
+    for pdf in args.pdfs:
+        print(f"⏱️  {pdf}", file=sys.stderr)
+        results[pdf] = benchmark_pdf(os.path.join(PROJECT_ROOT, pdf), args.repeat)
+
+    stored = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines, encoding="utf-8") as f:
+            stored = json.load(f)
+    baselines = stored.get("results", {})
+    threshold = args.threshold if args.threshold is not None else stored.get("threshold", DEFAULT_THRESHOLD)
+    print_results(results, baselines)
+
+    environment = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "sentence_backend": sentence_backend,
+        "repeat": args.repeat,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment, "results": results}, f, indent=2)
+
+    if args.update:
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump({"threshold": threshold, "environment": environment, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    if not baselines:
+        print("No baselines yet; run with --update to record them.")
+        return 0
+    if stored.get("environment", {}).get("sentence_backend") not in (None, sentence_backend):
+        print(f"Warning: baselines used the {stored['environment']['sentence_backend']} sentence splitter, "
+              f"this run uses {sentence_backend}")
+    regressions = compare(results, baselines, threshold)
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} regressions beyond {threshold:.0%}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nOK: no regressions beyond {threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long importing the app's modules takes.
+
+Each run imports the modules app/app.py needs in a fresh interpreter and
+reports the median time. It also checks that no heavy module (NLTK, the
+OpenAI client, PyMuPDF, transformers, ...) is loaded at import time; they
+should only be imported when first used.
+
+    python benchmarks/bench_startup.py --runs 5 --budget 2.0
+
+Exits with status 1 if the median exceeds --budget seconds or a heavy
+module was imported.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+APP_MODULES = [
+    "pipeline.concept_graph",
+    "pipeline.stages",
+    "pipeline.concept_index",
+    "pipeline.lod",
+    "pipeline.analytics",
+    "pipeline.corpus",
+    "pipeline.glossary",
+    "pipeline.jobs",
+    "utils.groq_utils",
+]
+
+HEAVY_MODULES = ["nltk", "openai", "fitz", "transformers", "torch", "wikipedia", "sentence_transformers", "pyvis"]
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(modules=APP_MODULES, heavy=HEAVY_MODULES):
+    """Import time in seconds and the heavy modules loaded, from a fresh interpreter."""
+    code = _PROBE.format(root=PROJECT_ROOT, modules=modules, heavy=heavy)
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0, help="Maximum median import time in seconds")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    times = [run["seconds"] for run in runs]
+    heavy = sorted({name for run in runs for name in run["heavy"]})
+    median = statistics.median(times)
+    print(f"import time: median {median:.3f}s, min {min(times):.3f}s, max {max(times):.3f}s over {args.runs} runs")
+    print(f"heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+    failed = False
+    if median > args.budget:
+        print(f"FAIL: median import time {median:.3f}s exceeds budget {args.budget:.3f}s")
+        failed = True
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Local load test for the HTTP service (pipeline/service.py).
+
+Starts the service in-process with the fake LLM backend, submits many
+PDFs over HTTP and reports throughput for each worker count:
+
+    python benchmarks/load_service.py --jobs 40 --pages 3 --workers 1 2 4 8 --latency 0.2
+
+--latency adds a delay to every fake LLM call, standing in for API latency.
+Every job gets a different generated document and the LLM response cache is
+cleared before each worker count, so no job is answered from the cache.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bench_memory import make_pdf
+
+def make_documents(count, pages):
+    """count distinct PDFs (bytes) of pages pages each."""
+    documents = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(count):
+            path = os.path.join(tmp, f"load_{i}.pdf")
+            make_pdf(path, pages, seed=i)
+            with open(path, "rb") as f:
+                documents.append(f.read())
+    return documents
+
+def request(url, data=None, method=None):
+    req = urllib.request.Request(url, data=data, method=method)
+    if data is not None:
+        req.add_header("Content-Type", "application/pdf")
+    with urllib.request.urlopen(req) as response:
+        return json.loads(response.read())
+
+def run_load(documents, workers, poll=0.1):
+    from pipeline.service import make_server
+    from utils.groq_utils import clear_response_cache
+
+    clear_response_cache()
+    jobs = len(documents)
+    server = make_server("127.0.0.1", 0, workers=workers)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        started = time.perf_counter()
+        ids = [request(f"{base}/jobs", data=pdf_bytes)["id"] for pdf_bytes in documents]
+        pending = set(ids)
+        statuses = {}
+        while pending:
+            time.sleep(poll)
+            for job_id in list(pending):
+                state = request(f"{base}/jobs/{job_id}")
+                if state["status"] in ("done", "failed", "cancelled"):
+                    statuses[job_id] = state["status"]
+                    pending.discard(job_id)
+        elapsed = time.perf_counter() - started
+        # Fetch one graph to make sure results are served
+        done = [job_id for job_id, status in statuses.items() if status == "done"]
+        nodes = len(request(f"{base}/jobs/{done[0]}/graph")["nodes"]) if done else 0
+        return {
+            "workers": workers,
+            "jobs": jobs,
+            "done": len(done),
+            "seconds": round(elapsed, 2),
+            "jobs_per_second": round(jobs / elapsed, 2),
+            "graph_nodes": nodes,
+        }
+    finally:
+        server.shutdown()
+        server.service.shutdown()
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=3, help="Pages per generated document")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds added to each fake LLM call")
+    args = parser.parse_args()
+
+    os.environ["MINDSKETCH_LLM_BACKEND"] = "fake"
+    os.environ["MINDSKETCH_FAKE_LATENCY"] = str(args.latency)
+    documents = make_documents(args.jobs, args.pages)
+    # One untimed job, so the first worker count does not pay for imports and model setup
+    run_load(documents[:1], 1)
+
+    print(f"{'workers':>8} {'jobs':>6} {'done':>6} {'seconds':>9} {'jobs/s':>8}")
+    for workers in args.workers:
+        result = run_load(documents, workers)
+        print(f"{result['workers']:>8} {result['jobs']:>6} {result['done']:>6} "
+              f"{result['seconds']:>9} {result['jobs_per_second']:>8}")
+
+if __name__ == "__main__":
+    main()
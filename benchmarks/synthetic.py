@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Synthetic triplets shaped like real extraction output, for scaling tests.
+
+Concept popularity follows a Zipf-like power law, so a few hub concepts
+appear in many triplets and most concepts in only a few; popular pairs
+repeat, giving edges with weight > 1 and several relation labels. Concepts
+are grouped into topics, and most triplets link concepts of the same topic,
+which gives community detection something to find. A small share of
+mentions use a surface variant of the name ("Neural Pathway",
+"neural pathways") for canonicalization to merge. Triplets are tagged with
+chunk ids in extraction order.
+
+    python benchmarks/synthetic.py 100000 --stats
+"""
+
+import argparse
+import bisect
+import itertools
+import math
+import os
+import random
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from utils.triplets import Triplet
+
+RELATIONS = [
+    "causes", "contains", "produces", "requires", "regulates", "controls", "connects to",
+    "depends on", "is part of", "is a type of", "leads to", "transmits", "consists of",
+    "influences", "converts", "supports", "forms", "releases", "protects", "stores",
+]
+_SYLLABLES = ["ra", "ne", "to", "li", "mo", "ka", "se", "vi", "do", "pha", "ter", "gen", "cor", "lum",
+              "syn", "ax", "tron", "bio", "neo", "cyt"]
+_NOUNS = ["system", "cell", "pathway", "membrane", "process", "structure", "signal", "field", "layer",
+          "cycle", "network", "receptor", "orbit", "particle", "region", "mechanism"]
+
+def concept_names(count, seed=42):
+    """count distinct, deterministic two-word concept names."""
+    rng = random.Random(seed)
+    names = []
+    seen = set()
+    for length in itertools.count(2):
+        for _ in range(count * 4):
+            word = "".join(rng.choice(_SYLLABLES) for _ in range(length))
+            name = f"{word} {rng.choice(_NOUNS)}"
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+                if len(names) == count:
+                    return names
+
+def _variant(name, rng):
+    """A surface variant of a concept name, as an LLM might write it."""
+    choice = rng.random()
+    if choice < 0.4:
+        return name.title()
+    if choice < 0.8:
+        return name + "s"
+    return "the " + name
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+def default_concepts(n):
+    """Vocabulary size for n triplets: grows sublinearly, as in real documents."""
+    return max(50, int(n ** 0.8))
+
+def generate_triplets(n, concepts=None, topics=None, exponent=1.1, intra_topic=0.8,
+                      variant_rate=0.05, chunk_size=25, seed=42):
+    """
+    n synthetic Triplets. concepts defaults to default_concepts(n) and topics
+    to about sqrt(concepts) / 2. exponent is the Zipf exponent of concept
+    popularity; intra_topic is the share of triplets whose object is drawn
+    from the subject's topic.
+    """
+    rng = random.Random(seed)
+    concepts = concepts or default_concepts(n)
+    topics = topics or max(2, int(math.sqrt(concepts) / 2))
+    names = concept_names(concepts, seed)
+
+    # Rank r has weight 1 / r^exponent; ranks are dealt to topics round-robin
+    weights = [1.0 / (rank + 1) ** exponent for rank in range(concepts)]
+    global_cum = _cumulative(weights)
+    topic_members = [list(range(t, concepts, topics)) for t in range(topics)]
+    topic_cum = [_cumulative(weights[i] for i in members) for members in topic_members]
+    relation_cum = _cumulative(1.0 / (rank + 1) for rank in range(len(RELATIONS)))
+
+    subjects = rng.choices(range(concepts), cum_weights=global_cum, k=n)
+    triplets = []
+    for i, subject in enumerate(subjects):
+        topic = subject % topics
+        if rng.random() < intra_topic:
+            cum = topic_cum[topic]
+            obj = topic_members[topic][bisect.bisect_left(cum, rng.random() * cum[-1])]
+        else:
+            obj = bisect.bisect_left(global_cum, rng.random() * global_cum[-1])
+        if obj == subject:
+            obj = (subject + topics) % concepts
+        relation = RELATIONS[bisect.bisect_left(relation_cum, rng.random() * relation_cum[-1])]
+        subject_name, object_name = names[subject], names[obj]
+        if rng.random() < variant_rate:
+            subject_name = _variant(subject_name, rng)
+        if rng.random() < variant_rate:
+            object_name = _variant(object_name, rng)
+        triplets.append(Triplet(subject_name, relation, object_name, i // chunk_size))
+    return triplets
+
+def describe(triplets):
+    """Shape of a triplet set: distinct concepts and pairs, repeats and hub size."""
+    degree = {}
+    pairs = {}
+    for t in triplets:
+        degree[t.subject] = degree.get(t.subject, 0) + 1
+        degree[t.object] = degree.get(t.object, 0) + 1
+        pairs[(t.subject, t.object)] = pairs.get((t.subject, t.object), 0) + 1
+    degrees = sorted(degree.values(), reverse=True)
+    return {
+        "triplets": len(triplets),
+        "concepts": len(degree),
+        "edges": len(pairs),
+        "repeated_edges": sum(1 for count in pairs.values() if count > 1),
+        "max_degree": degrees[0] if degrees else 0,
+        "median_degree": degrees[len(degrees) // 2] if degrees else 0,
+        "top1pct_share": sum(degrees[:max(1, len(degrees) // 100)]) / max(1, sum(degrees)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("n", type=int, help="Number of triplets")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stats", action="store_true", help="Print the shape instead of the triplets")
+    args = parser.parse_args()
+
+    triplets = generate_triplets(args.n, seed=args.seed)
+    if args.stats:
+        for key, value in describe(triplets).items():
+            print(f"{key:>16}: {value:.3f}" if isinstance(value, float) else f"{key:>16}: {value}")
+    else:
+        for t in triplets:
+            print(f"({t.subject}, {t.relation}, {t.object})")
+
+if __name__ == "__main__":
+    main()
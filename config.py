@@ -1,5 +1,7 @@
 # config.py
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 
 # Load environment variables from .env file if it exists
@@ -18,12 +20,122 @@ SUMMARY_MAX_LENGTH = 150
 SUMMARY_TEMPERATURE = 0.3
 
 # Relation Extraction Configuration
-EXTRACTION_TEMPERATURE = 0.2
-EXTRACTION_MAX_TOKENS = 500
+EXTRACTION_TEMPERATURE = 0.1
+EXTRACTION_MAX_TOKENS = 800
 
 # Graph Configuration
 MIN_TRIPLET_COUNT = 5  # Minimum triplets to create a meaningful graph
 
+# Runtime profiles trade latency and cost against quality. The settings
+# above are the "balanced" profile; select another with MINDSKETCH_PROFILE.
+PROFILE_ENV = "MINDSKETCH_PROFILE"
+DEFAULT_PROFILE = "balanced"
+
+PROFILES = {
+    "fast": {
+        "description": "Smaller model, larger chunks and parallel extraction",
+        "model": "llama3-8b-8192",
+        "chunk_scale": 1.5,          # multiplies the chunk size chosen for the document size
+        "max_overlap": 1,            # caps the overlap chosen for the document size
+        "summary_max_tokens": 100,
+        "summary_temperature": SUMMARY_TEMPERATURE,
+        "extraction_max_tokens": 500,
+        "extraction_temperature": EXTRACTION_TEMPERATURE,
+        "overview_max_tokens": 200,
+        "overview_temperature": 0.4,
+        "llm_concurrency": 4,        # chunks extracted at the same time
+        "request_delay": 0.1,        # seconds between summary calls, to stay under rate limits
+        "llm_cache_size": 1024,      # LLM responses kept per process
+        "glossary_workers": 16,
+        "glossary_timeout": 3.0,
+        "service_workers": 8,
+        "local_summary_model": "sshleifer/distilbart-cnn-12-6",
+        "local_summary_length": 80,
+        "rebel_beams": 1,
+        "novelty_mode": "stop",      # very large documents: "off", "stop" or "sample" once few new concepts appear
+        "novelty_threshold": 0.15,   # share of new concepts and relations per chunk counted as saturated
+        "novelty_sample_every": 4,   # in "sample" mode, chunks extracted after saturation: one in this many
+    },
+    "balanced": {
+        "description": "Default settings",
+        "model": GROQ_MODEL,
+        "chunk_scale": 1.0,
+        "max_overlap": 4,
+        "summary_max_tokens": SUMMARY_MAX_LENGTH,
+        "summary_temperature": SUMMARY_TEMPERATURE,
+        "extraction_max_tokens": EXTRACTION_MAX_TOKENS,
+        "extraction_temperature": EXTRACTION_TEMPERATURE,
+        "overview_max_tokens": 300,
+        "overview_temperature": 0.4,
+        "llm_concurrency": 1,
+        "request_delay": 0.5,
+        "llm_cache_size": 256,
+        "glossary_workers": 8,
+        "glossary_timeout": 8.0,
+        "service_workers": 4,
+        "local_summary_model": "facebook/bart-large-cnn",
+        "local_summary_length": 100,
+        "rebel_beams": 1,
+        "novelty_mode": "sample",
+        "novelty_threshold": 0.1,
+        "novelty_sample_every": 4,
+    },
+    "quality": {
+        "description": "Largest model, smaller chunks and longer answers",
+        "model": GROQ_MODEL,
+        "chunk_scale": 0.75,
+        "max_overlap": 4,
+        "summary_max_tokens": 250,
+        "summary_temperature": 0.2,
+        "extraction_max_tokens": 1200,
+        "extraction_temperature": 0.0,
+        "overview_max_tokens": 500,
+        "overview_temperature": 0.3,
+        "llm_concurrency": 1,
+        "request_delay": 0.5,
+        "llm_cache_size": 256,
+        "glossary_workers": 8,
+        "glossary_timeout": 15.0,
+        "service_workers": 2,
+        "local_summary_model": "facebook/bart-large-cnn",
+        "local_summary_length": 150,
+        "rebel_beams": 4,
+        "novelty_mode": "off",
+        "novelty_threshold": 0.05,
+        "novelty_sample_every": 2,
+    },
+}
+
+# Profile chosen for the current job; threads running a job set it with use_profile
+_active_profile = ContextVar("mindsketch_profile", default=None)
+
+def profile_name(name=None):
+    """
+    Resolve a profile name: the one given, else the one set with
+    use_profile, else MINDSKETCH_PROFILE, else the default. Unknown names
+    fall back to the default.
+    """
+    name = name or _active_profile.get() or os.getenv(PROFILE_ENV) or DEFAULT_PROFILE
+    name = name.strip().lower()
+    if name not in PROFILES:
+        print(f"Unknown profile '{name}', using '{DEFAULT_PROFILE}'")
+        return DEFAULT_PROFILE
+    return name
+
+def get_profile(name=None):
+    """Settings of a profile (see profile_name) as a dict, including its name."""
+    name = profile_name(name)
+    return dict(PROFILES[name], name=name)
+
+@contextmanager
+def use_profile(name):
+    """Make name the active profile for the current thread or task."""
+    token = _active_profile.set(profile_name(name))
+    try:
+        yield
+    finally:
+        _active_profile.reset(token)
+
 def check_groq_setup():
     """
     Check if Groq is properly configured.
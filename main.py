@@ -1,5 +1,54 @@
+import argparse
 import os
+import sys
+
+# Paths given on the command line are relative to where the command was run
+INVOKED_FROM = os.getcwd()
 
 # Change working directory to project root
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
-os.system("streamlit run app/app.py")
+
+def run_batch_command(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="Build concept maps for a folder or manifest of PDFs without the web interface.",
+    )
+    parser.add_argument("source", help="Directory of PDFs, or a manifest (.json list or text file with one path per line)")
+    parser.add_argument("--out", default="outputs/batch", help="Directory for .mskg, .mskt and .html artifacts")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess documents finished by an earlier run")
+    parser.add_argument("--profile", default=None, help="Runtime profile: fast, balanced or quality (default: MINDSKETCH_PROFILE)")
+    parser.add_argument("--trace", action="store_true", help="Write a Chrome trace (<doc>.trace.json) per document")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    from pipeline.batch import run_batch
+    source = os.path.join(INVOKED_FROM, args.source)
+    out_dir = os.path.join(INVOKED_FROM, args.out)
+    records = run_batch(source, out_dir=out_dir, workers=args.workers, resume=not args.no_resume,
+                        profile=args.profile, trace=args.trace)
+    return 1 if any(record["status"] != "done" for record in records) else 0
+
+def run_serve_command(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Serve the pipeline over HTTP: POST /jobs with a PDF, then GET /jobs/<id>[/triplets|/graph|/html].",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=None, help="Pipeline worker threads (default: from the profile)")
+    parser.add_argument("--profile", default=None, help="Runtime profile: fast, balanced or quality (default: MINDSKETCH_PROFILE)")
+    parser.add_argument("--trace", action="store_true", help="Trace every job; served at GET /jobs/<id>/trace")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    from pipeline.service import serve
+    serve(args.host, args.port, args.workers, profile=args.profile, trace=args.trace)
+    return 0
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(run_batch_command(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        sys.exit(run_serve_command(sys.argv[2:]))
+    os.system("streamlit run app/app.py")
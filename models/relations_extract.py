@@ -1,58 +1,59 @@
 # models/relations_extract.py
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import lru_cache
 
 # Add project root to path for imports
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from utils.groq_utils import extract_relations_enhanced, extract_triplets
+from utils.groq_utils import extract_relations_enhanced, extract_triplets, llm_available
+from utils.triplets import parse_triplets
+from config import get_profile
+from utils.tracing import span, traced
 
-def extract_relations(text):
+REBEL_MODEL = "Babelscape/rebel-large"
+
+@lru_cache(maxsize=1)
+def _load_rebel():
+    """REBEL tokenizer and model, loaded once per process."""
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    return AutoTokenizer.from_pretrained(REBEL_MODEL), AutoModelForSeq2SeqLM.from_pretrained(REBEL_MODEL)
+
+def extract_relations(text, chunk_id=None):
     """
     Extract relations using Groq's Llama3-70b model for better quality.
     Falls back to REBEL if Groq is not available.
+    Returns a list of Triplet objects tagged with chunk_id.
     """
     try:
-        # Check if GROQ_API_KEY is set
-        if not os.getenv("GROQ_API_KEY"):
+        # Check if an LLM backend is configured
+        if not llm_available():
             print("Warning: GROQ_API_KEY not found. Using REBEL fallback.")
-            return rebel_extract_relations(text)
+            return parse_triplets(rebel_extract_relations(text), chunk_id)
         
         print("Using Groq for relation extraction...")
         # Use the enhanced version that returns parsed triplets
-        triplets = extract_relations_enhanced(text)
+        triplets = extract_relations_enhanced(text, chunk_id)
         if triplets:
-            # Convert triplets back to text format for compatibility
-            return format_triplets_as_text(triplets)
+            return triplets
         else:
             # Fallback to text-based extraction
-            return extract_triplets(text)
+            return parse_triplets(extract_triplets(text), chunk_id)
     except Exception as e:
         print(f"Groq relation extraction failed: {e}. Falling back to REBEL...")
-        return rebel_extract_relations(text)
-
-def format_triplets_as_text(triplets):
-    """
-    Format triplets as text for compatibility with existing pipeline.
-    """
-    formatted = []
-    for subject, relation, obj in triplets:
-        formatted.append(f"({subject}, {relation}, {obj})")
-    return "\n".join(formatted)
+        return parse_triplets(rebel_extract_relations(text), chunk_id)
 
+@traced("local.rebel", category="model")
 def rebel_extract_relations(text):
     """
     Fallback to REBEL model for relation extraction.
     """
     try:
-        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-        
-        # Load REBEL model and tokenizer
-        model_name = "Babelscape/rebel-large"
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        tokenizer, model = _load_rebel()
         
         # Add task-specific prompt
         prompt = f"extract all factual (subject, relation, object) triplets from the following text: {text}"
@@ -61,7 +62,7 @@ def rebel_extract_relations(text):
         inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
         
         # Generate prediction
-        output_ids = model.generate(**inputs, max_length=256)
+        output_ids = model.generate(**inputs, max_length=256, num_beams=get_profile()["rebel_beams"])
         
         # Decode output
         decoded_text = tokenizer.batch_decode(output_ids, skip_special_tokens=True)[0]
@@ -71,18 +72,55 @@ def rebel_extract_relations(text):
         print(f"REBEL extraction also failed: {e}")
         return f"Extraction error: {str(e)}"
 
+def _extract_one(text, chunk_id, total):
+    print(f"Extracting relations from text {chunk_id+1}/{total}")
+    with span("chunk.relations", chunk_id=chunk_id, chars=len(text)) as s:
+        try:
+            triplets = extract_relations_enhanced(text, chunk_id=chunk_id)
+        except Exception as e:
+            print(f"Failed to extract relations from text {chunk_id+1}: {e}")
+            triplets = []
+        s.set(triplets=len(triplets))
+        return triplets
+
+def iter_relations_batch(texts, concurrency=None, order=None):
+    """
+    Extract relations from multiple texts using Groq,
+    yielding the triplets of each text, in order, as soon as it is processed.
+
+    Up to concurrency texts (default: the profile's llm_concurrency) are
+    extracted at the same time. Only that many calls are in flight, so a
+    caller that stops iterating wastes at most that many.
+
+    order, if given, is an iterable of the indices of the texts to extract,
+    in the order to extract them (see pipeline.novelty.NoveltyPlan). It is
+    consumed lazily, one index per call submitted.
+    """
+    concurrency = concurrency or get_profile()["llm_concurrency"]
+    indices = range(len(texts)) if order is None else order
+    if concurrency <= 1 or len(texts) <= 1:
+        for i in indices:
+            yield _extract_one(texts[i], i, len(texts))
+        return
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="relations")
+    pending = []
+    try:
+        for i in indices:
+            # Each call runs in a copy of the caller's context, so it sees the active profile
+            pending.append(executor.submit(copy_context().run, _extract_one, texts[i], i, len(texts)))
+            if len(pending) >= concurrency:
+                yield pending.pop(0).result()
+        while pending:
+            yield pending.pop(0).result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def extract_relations_batch(texts):
     """
     Extract relations from multiple texts using Groq.
     """
     all_triplets = []
-    
-    for i, text in enumerate(texts):
-        print(f"Extracting relations from text {i+1}/{len(texts)}")
-        try:
-            triplets = extract_relations_enhanced(text)
-            all_triplets.extend(triplets)
-        except Exception as e:
-            print(f"Failed to extract relations from text {i+1}: {e}")
-    
+    for triplets in iter_relations_batch(texts):
+        all_triplets.extend(triplets)
     return all_triplets
@@ -1,42 +1,56 @@
 import sys
 import os
+from functools import lru_cache
 
 # Add project root to path for imports
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from utils.groq_utils import summarize_chunks as groq_summarize_chunks, summarize_text, create_concept_summary
+from utils.groq_utils import summarize_chunks as groq_summarize_chunks, summarize_text, create_concept_summary, llm_available
+from config import get_profile
+from utils.tracing import traced
 
-def summarize_chunks(chunks):
+@lru_cache(maxsize=2)
+def _load_bart(model_name):
+    """Local summarization pipeline, loaded once per process and model."""
+    from transformers import pipeline
+    return pipeline("summarization", model=model_name)
+
+def summarize_chunks(chunks, on_chunk=None):
     """
     Summarize chunks using Groq's Llama3-70b model for better quality.
-    Falls back to BART if Groq is not available.
+    Falls back to BART if Groq is not available. on_chunk(done) is called
+    after each summary; returning False stops summarizing early.
     """
     try:
-        # Check if GROQ_API_KEY is set
-        if not os.getenv("GROQ_API_KEY"):
+        # Check if an LLM backend is configured
+        if not llm_available():
             print("Warning: GROQ_API_KEY not found. Using BART fallback.")
-            return bart_summarize_chunks(chunks)
+            return bart_summarize_chunks(chunks, on_chunk)
         
         print("Using Groq for summarization...")
-        return groq_summarize_chunks(chunks)
+        return groq_summarize_chunks(chunks, on_chunk)
     except Exception as e:
         print(f"Groq summarization failed: {e}. Falling back to BART...")
-        return bart_summarize_chunks(chunks)
+        return bart_summarize_chunks(chunks, on_chunk)
 
-def bart_summarize_chunks(chunks):
+@traced("local.bart", category="model")
+def bart_summarize_chunks(chunks, on_chunk=None):
     """
     Fallback to BART summarization if Groq is not available.
     """
     try:
-        from transformers import pipeline
-        summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+        profile = get_profile()
+        summarizer = _load_bart(profile["local_summary_model"])
+        max_length = profile["local_summary_length"]
         
         summarized = []
         for chunk in chunks:
-            summary = summarizer(chunk, max_length=100, min_length=30, do_sample=False)[0]["summary_text"]
+            summary = summarizer(chunk, max_length=max_length, min_length=min(30, max_length // 2), do_sample=False)[0]["summary_text"]
             summarized.append(summary)
+            if on_chunk is not None and on_chunk(len(summarized)) is False:
+                break
         return summarized
     except Exception as e:
         print(f"BART summarization also failed: {e}")
@@ -47,7 +61,7 @@ def create_document_summary(text):
     Create a high-level summary of the entire document using Groq.
     """
     try:
-        if not os.getenv("GROQ_API_KEY"):
+        if not llm_available():
             return "Document summary not available without Groq API key."
         
         return create_concept_summary(text)
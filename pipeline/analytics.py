@@ -0,0 +1,126 @@
+# pipeline/analytics.py
+
+import networkx as nx
+
+from pipeline.communities import detect_communities, node_community_map
+from pipeline.graph_cache import graph_version
+from utils.tracing import span
+
+class GraphAnalytics:
+    """
+    Lazily computed, memoized analytics for one concept graph.
+
+    Centrality, communities, SCC condensation and concept ordering are each
+    computed on first access and reused by rendering, the learning path,
+    Mermaid export and the glossary. The memo is dropped automatically when
+    the number of nodes or edges changes, or when the graph is marked with
+    graph_cache.mark_changed, which every in-place change that keeps the
+    size (relabeling, re-weighting, swapping edges) must call.
+    """
+
+    def __init__(self, G):
+        self.G = G
+        self._memo = {}
+        self._signature = self._current_signature()
+
+    def _current_signature(self):
+        # Hashing the whole graph here would cost more than most analytics
+        return (graph_version(self.G), self.G.number_of_nodes(), self.G.number_of_edges())
+
+    def invalidate(self):
+        """Forget every memoized result."""
+        self._memo.clear()
+        self._signature = self._current_signature()
+
+    def peek(self, name):
+        """Memoized value of name, or None if it has not been computed."""
+        if self._current_signature() != self._signature:
+            self.invalidate()
+        return self._memo.get(name)
+
+    def prime(self, name, value):
+        """Seed the memo with a precomputed value, e.g. one loaded from disk."""
+        if self._current_signature() != self._signature:
+            self.invalidate()
+        self._memo[name] = value
+
+    def _get(self, name, compute):
+        if self._current_signature() != self._signature:
+            self.invalidate()
+        if name not in self._memo:
+            with span(f"analytics.{name}"):
+                self._memo[name] = compute()
+        return self._memo[name]
+
+    @property
+    def centrality(self):
+        """Degree centrality of every node."""
+        return self._get("centrality", lambda: nx.degree_centrality(self.G))
+
+    @property
+    def communities(self):
+        """Communities, largest first (see pipeline.communities)."""
+        return self._get("communities", lambda: detect_communities(self.G))
+
+    @property
+    def node_community(self):
+        """Map of node to community index."""
+        return self._get("node_community", lambda: node_community_map(self.communities))
+
+    @property
+    def condensation(self):
+        """DAG of strongly connected components; graph["mapping"] maps node -> component."""
+        return self._get("condensation", lambda: nx.condensation(self.G))
+
+    @property
+    def ordering(self):
+        """
+        All concepts in prerequisite order. Components of the condensation are
+        visited topologically, so cycles never make ordering fail; concepts
+        within one component are ordered by centrality.
+        """
+        return self._get("ordering", self._compute_ordering)
+
+    def _compute_ordering(self):
+        C = self.condensation
+        centrality = self.centrality
+        order = []
+        for comp in nx.topological_sort(C):
+            members = C.nodes[comp]["members"]
+            order.extend(sorted(members, key=lambda n: (-centrality.get(n, 0), str(n))))
+        return order
+
+    @property
+    def ranked_concepts(self):
+        """
+        Concepts deduplicated case-insensitively and sorted by centrality,
+        ties kept in prerequisite order. Used for the learning path.
+        """
+        return self._get("ranked_concepts", self._compute_ranked_concepts)
+
+    def _compute_ranked_concepts(self):
+        seen = set()
+        unique_order = []
+        for concept in self.ordering:
+            c_lower = concept.strip().lower()
+            if c_lower not in seen:
+                unique_order.append(concept)
+                seen.add(c_lower)
+        centrality = self.centrality
+        return sorted(unique_order, key=lambda x: -centrality.get(x, 0))
+
+    @property
+    def terms(self):
+        """Alphabetical list of concept names for the glossary."""
+        return self._get("terms", lambda: sorted(set(self.G.nodes)))
+
+def get_analytics(G):
+    """
+    Return the analytics object attached to G, creating it on first use.
+    """
+    analytics = G.graph.get("analytics")
+    # Subgraph copies inherit G.graph, so check the analytics belong to this graph
+    if analytics is None or analytics.G is not G:
+        analytics = GraphAnalytics(G)
+        G.graph["analytics"] = analytics
+    return analytics
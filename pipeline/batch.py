@@ -0,0 +1,282 @@
+# pipeline/batch.py
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+STATE_FILE = "batch_state.json"
+
+def discover_documents(source):
+    """
+    PDFs to process, as a list of (doc_id, path).
+
+    source is a directory (every *.pdf in it, recursively) or a manifest:
+    a .json file holding a list of paths or of {"path", "id"} objects, or a
+    text file with one path per line (blank lines and # comments ignored).
+    Relative manifest paths are resolved against the manifest's directory.
+    Ids name the output files, so they may not contain path separators or
+    start with a dot.
+    """
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+            if name.lower().endswith(".pdf")
+        )
+        entries = [(None, path) for path in paths]
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding="utf-8") as f:
+            if source.lower().endswith(".json"):
+                data = json.load(f)
+                if isinstance(data, dict):
+                    data = data.get("documents", [])
+                entries = [
+                    (item.get("id"), item["path"]) if isinstance(item, dict) else (None, item)
+                    for item in data
+                ]
+            else:
+                entries = [
+                    (None, line.strip()) for line in f
+                    if line.strip() and not line.lstrip().startswith("#")
+                ]
+        entries = [(doc_id, os.path.join(base, path)) for doc_id, path in entries]
+
+    documents = []
+    used = set()
+    for doc_id, path in entries:
+        if doc_id and not _safe_doc_id(doc_id):
+            raise ValueError(f"Invalid document id in batch (used as a file name): {doc_id!r}")
+        if not doc_id:
+            doc_id = os.path.splitext(os.path.basename(path))[0]
+            if doc_id in used:
+                # Same file name in different folders
+                doc_id += "-" + hashlib.blake2b(path.encode("utf-8"), digest_size=4).hexdigest()
+        if doc_id in used:
+            raise ValueError(f"Duplicate document id in batch: {doc_id}")
+        used.add(doc_id)
+        documents.append((doc_id, path))
+    return documents
+
+def _safe_doc_id(doc_id):
+    return (
+        isinstance(doc_id, str)
+        and not doc_id.startswith(".")
+        and not any(char in doc_id for char in ("/", "\\", "\0"))
+    )
+
+def file_hash(path):
+    """Content hash of a file, read in blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def artifact_paths(out_dir, doc_id, trace=False):
+    """Output files of a document; the trace only when one is written."""
+    paths = {
+        "triplets": os.path.join(out_dir, f"{doc_id}.mskt"),
+        "graph": os.path.join(out_dir, f"{doc_id}.mskg"),
+        "html": os.path.join(out_dir, f"{doc_id}.html"),
+    }
+    if trace:
+        paths["trace"] = os.path.join(out_dir, f"{doc_id}.trace.json")
+    return paths
+
+def process_document(doc_id, path, out_dir, use_llm, profile=None, trace=False):
+    """
+    Run the full pipeline for one PDF under a runtime profile and write its
+    artifacts. With trace, the stage spans are also written as a Chrome
+    trace next to them.
+
+    Runs in a worker process, so it imports the pipeline itself and only
+    returns a plain, JSON-serializable record with per-stage timings.
+    """
+    from config import profile_name, use_profile
+    from utils.tracing import Tracer, tracing
+    profile = profile_name(profile)
+    tracer = Tracer(doc_id) if trace else None
+    with use_profile(profile), tracing(tracer):
+        record = _process_document(doc_id, path, out_dir, use_llm)
+    record["profile"] = profile
+    if tracer is not None:
+        record["trace"] = tracer.save(artifact_paths(out_dir, doc_id, trace=True)["trace"])
+        if "artifacts" in record:
+            record["artifacts"]["trace"] = record["trace"]
+    return record
+
+def _process_document(doc_id, path, out_dir, use_llm):
+    from pipeline import novelty, stages
+    from pipeline.analytics import get_analytics
+    from pipeline.concept_graph import render_graph_html
+    from pipeline.lod import render_lod_html, use_level_of_detail
+    from pipeline.persistence import save_graph, save_triplets
+
+    record = {"doc_id": doc_id, "path": path, "status": "failed", "use_llm": use_llm, "timings": {}}
+    timings = record["timings"]
+    started = time.perf_counter()
+
+    def timed(name, func, *args, **kwargs):
+        t0 = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[name] = round(time.perf_counter() - t0, 3)
+        return result
+
+    try:
+        record["hash"] = file_hash(path)
+        raw_text, doc_stats = timed("extract", stages.extract_stage, path)
+        if not raw_text:
+            raise ValueError("no text could be extracted")
+        chunks, doc_size = timed("chunk", stages.chunk_stage, raw_text)
+        plan = novelty.adaptive_plan(chunks, doc_size) if use_llm else None
+        triplets, warnings = timed("relations", stages.relations_stage, chunks, use_batch=use_llm, plan=plan)
+        triplets, _ = timed("canonicalize", stages.canonicalize_stage, triplets)
+        G = timed("graph", stages.graph_stage, triplets)
+
+        def render():
+            # Computed once here so the saved graph carries its analytics
+            analytics = get_analytics(G)
+            analytics.centrality
+            analytics.communities
+            if use_level_of_detail(G):
+                return render_lod_html(G, use_cache=False)
+            return render_graph_html(G, use_cache=False)
+        html = timed("render", render)
+
+        artifacts = artifact_paths(out_dir, doc_id)
+        def write():
+            save_triplets(triplets, artifacts["triplets"])
+            save_graph(G, artifacts["graph"])
+            tmp_path = artifacts["html"] + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp_path, artifacts["html"])
+        timed("write", write)
+
+        record.update(
+            status="done",
+            doc_size=doc_size,
+            words=doc_stats.get("words", 0),
+            chunks=len(chunks),
+            triplets=len(triplets),
+            nodes=G.number_of_nodes(),
+            edges=G.number_of_edges(),
+            warnings=warnings,
+            novelty=plan.report() if plan else None,
+            artifacts=artifacts,
+        )
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    timings["total"] = round(time.perf_counter() - started, 3)
+    return record
+
+class BatchState:
+    """
+    Progress of a batch run, saved to <out_dir>/batch_state.json after every
+    document so an interrupted run can resume where it stopped.
+    """
+
+    def __init__(self, out_dir):
+        self.path = os.path.join(out_dir, STATE_FILE)
+        self.documents = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.documents = json.load(f).get("documents", {})
+
+    def is_done(self, doc_id, path, profile, use_llm):
+        """
+        Whether doc_id was already processed from this exact file, under the
+        same profile (name) and with or without the LLM as asked, and its
+        artifacts exist.
+        """
+        record = self.documents.get(doc_id)
+        if not record or record.get("status") != "done":
+            return False
+        if record.get("profile") != profile or record.get("use_llm") != use_llm:
+            return False
+        if not all(os.path.exists(p) for p in record.get("artifacts", {}).values()):
+            return False
+        try:
+            return record.get("hash") == file_hash(path)
+        except OSError:
+            return False
+
+    def update(self, record):
+        self.documents[record["doc_id"]] = record
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated": int(time.time()), "documents": self.documents}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def format_record(record):
+    """One report line for a processed document."""
+    timings = record["timings"]
+    if record["status"] != "done":
+        error = " ".join(record.get("error", "failed").split())[:200]
+        return f"❌ {record['doc_id']}: {error} ({timings.get('total', 0):.1f}s)"
+    stages_text = " ".join(f"{name}={seconds:.1f}s" for name, seconds in timings.items() if name != "total")
+    return (
+        f"✅ {record['doc_id']}: {record['nodes']} concepts, {record['edges']} relations "
+        f"in {timings['total']:.1f}s ({stages_text})"
+    )
+
+def run_batch(source, out_dir="outputs/batch", workers=None, use_llm=None, resume=True, report=print, profile=None,
+              trace=False):
+    """
+    Process every document in source (see discover_documents) with a pool of
+    worker processes, all under one runtime profile. Documents already
+    completed by an earlier run are skipped unless resume is False.
+    Returns the records of this run.
+    """
+    if use_llm is None:
+        from utils.groq_utils import llm_available
+        use_llm = llm_available()
+    from config import profile_name
+    profile = profile_name(profile)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+
+    documents = discover_documents(source)
+    state = BatchState(out_dir)
+    todo = [
+        (doc_id, path) for doc_id, path in documents
+        if not (resume and state.is_done(doc_id, path, profile, use_llm))
+    ]
+    skipped = len(documents) - len(todo)
+    report(f"📚 {len(documents)} documents, {skipped} already done, {len(todo)} to process with {workers} workers")
+
+    records = []
+    started = time.perf_counter()
+    if workers == 1:
+        # Inline, which keeps tracebacks and debuggers simple
+        for doc_id, path in todo:
+            record = process_document(doc_id, path, out_dir, use_llm, profile, trace)
+            state.update(record)
+            records.append(record)
+            report(format_record(record))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(process_document, doc_id, path, out_dir, use_llm, profile, trace): (doc_id, path)
+                for doc_id, path in todo
+            }
+            for future in as_completed(futures):
+                doc_id, path = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # The worker process itself died
+                    record = {"doc_id": doc_id, "path": path, "status": "failed",
+                              "error": f"{type(e).__name__}: {e}", "timings": {}}
+                state.update(record)
+                records.append(record)
+                report(format_record(record))
+
+    done = sum(record["status"] == "done" for record in records)
+    report(f"🏁 {done}/{len(records)} documents processed in {time.perf_counter() - started:.1f}s, "
+           f"{len(records) - done} failed; state saved to {state.path}")
+    return records
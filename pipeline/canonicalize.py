@@ -0,0 +1,161 @@
+# pipeline/canonicalize.py
+
+import re
+from collections import Counter, defaultdict
+
+from utils.triplets import as_triplet
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+
+# Keep each similarity block around 64 MB of float32 scores
+_MAX_BLOCK_CELLS = 2 ** 24
+
+_LEADING_ARTICLES = re.compile(r"^(?:the|a|an)\s+")
+_NON_WORD = re.compile(r"[^\w\s-]")
+_SINGULAR_EXCEPTIONS = {"species", "series", "physics", "mathematics", "genetics", "news"}
+
+_model_cache = {}
+
+def _singularize(word):
+    """
+    Very small English singularizer for the last word of a concept name.
+    """
+    if len(word) <= 3 or word in _SINGULAR_EXCEPTIONS:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("sses", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def canonical_key(name):
+    """
+    Lexical identity of a concept name.
+    "Neuron", "neurons" and "the neuron" all map to "neuron".
+    """
+    key = _NON_WORD.sub(" ", name.lower())
+    key = _LEADING_ARTICLES.sub("", " ".join(key.split()))
+    words = key.split()
+    if not words:
+        return ""
+    words[-1] = _singularize(words[-1])
+    return " ".join(words)
+
+def _load_model(model_name):
+    """Load a sentence-transformers model once per process."""
+    if model_name not in _model_cache:
+        from sentence_transformers import SentenceTransformer
+        _model_cache[model_name] = SentenceTransformer(model_name)
+    return _model_cache[model_name]
+
+def _embedding_leaders(names, weights, model_name, threshold):
+    """
+    Cluster names by cosine similarity of their embeddings.
+
+    All names are embedded in one batch. Names are visited from most to least
+    frequent; each unassigned name becomes the leader of every still-unassigned
+    name whose similarity is above the threshold. Similarities are computed
+    block-wise as matrix products, so no Python loop runs over pairs.
+    Returns a list mapping each name index to its leader index.
+    """
+    import numpy as np
+
+    model = _load_model(model_name)
+    embeddings = model.encode(
+        names,
+        batch_size=64,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    ).astype(np.float32, copy=False)
+
+    count = len(names)
+    order = np.argsort(-np.asarray(weights), kind="stable")
+    embeddings = embeddings[order]
+    leader = np.full(count, -1, dtype=np.int64)
+    block_size = max(1, min(1024, _MAX_BLOCK_CELLS // count))
+
+    for start in range(0, count, block_size):
+        scores = embeddings[start:start + block_size] @ embeddings.T
+        for row in range(scores.shape[0]):
+            i = start + row
+            if leader[i] >= 0:
+                continue
+            leader[i] = i
+            hits = np.flatnonzero((scores[row] >= threshold) & (leader < 0))
+            leader[hits] = i
+
+    # Map positions in sorted order back to original name indices
+    result = [0] * count
+    for pos, lead in enumerate(leader):
+        result[order[pos]] = int(order[lead])
+    return result
+
+def canonicalize_triplets(triplets, threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                          model_name=DEFAULT_EMBEDDING_MODEL, use_embeddings=True):
+    """
+    Rewrite triplets so that near-duplicate concepts share one canonical name.
+
+    Names are first grouped by a cheap lexical key, then the group
+    representatives are embedded with sentence-transformers and merged by
+    vectorized cosine similarity. Falls back to lexical grouping only if
+    sentence-transformers is not available.
+
+    Returns (canonical_triplets, mapping, stats) where mapping takes every
+    original name to its canonical name and stats reports the node reduction.
+    """
+    triplets = [as_triplet(t) for t in triplets]
+    mentions = Counter()
+    for triplet in triplets:
+        mentions[triplet.subject.strip()] += triplet.count
+        mentions[triplet.object.strip()] += triplet.count
+    mentions.pop("", None)
+
+    # Lexical grouping: the most frequent surface form names the group
+    groups = defaultdict(list)
+    for name in mentions:
+        groups[canonical_key(name) or name.lower()].append(name)
+    keys = list(groups)
+    representatives = [
+        min(groups[key], key=lambda n: (-mentions[n], len(n), n)) for key in keys
+    ]
+    weights = [sum(mentions[n] for n in groups[key]) for key in keys]
+
+    method = "lexical"
+    leaders = list(range(len(keys)))
+    if use_embeddings and len(keys) > 1:
+        try:
+            leaders = _embedding_leaders(representatives, weights, model_name, threshold)
+            method = "embedding"
+        except Exception as e:
+            print(f"Embedding canonicalization unavailable: {e}. Using lexical matching only.")
+
+    mapping = {}
+    for idx, key in enumerate(keys):
+        canonical = representatives[leaders[idx]]
+        for name in groups[key]:
+            mapping[name] = canonical
+
+    canonical_triplets = []
+    dropped = 0
+    for triplet in triplets:
+        subj = mapping.get(triplet.subject.strip(), triplet.subject.strip())
+        obj = mapping.get(triplet.object.strip(), triplet.object.strip())
+        if subj == obj:
+            dropped += 1
+            continue
+        canonical_triplets.append(triplet._replace(subject=subj, object=obj))
+
+    original_nodes = len(mentions)
+    canonical_nodes = len(set(mapping.values()))
+    stats = {
+        "original_nodes": original_nodes,
+        "canonical_nodes": canonical_nodes,
+        "reduction": 1 - canonical_nodes / original_nodes if original_nodes else 0.0,
+        "dropped_self_loops": dropped,
+        "method": method,
+    }
+    return canonical_triplets, mapping, stats
@@ -1,59 +1,61 @@
 # pipeline/concept_graph.py
 
+import os
 import re
 import networkx as nx
-from pyvis.network import Network
-from networkx.algorithms.community import greedy_modularity_communities
 import random
+from collections import Counter
 
-def parse_triplets(rel_text):
-    """
-    Parse triplets from relation extraction output.
-    Handles both Groq format and REBEL format.
-    """
-    if not rel_text or "error" in rel_text.lower():
-        return []
-    
-    triplets = []
-    lines = rel_text.strip().split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Handle Groq format: (subject, relation, object)
-        if line.startswith('(') and line.endswith(')'):
-            try:
-                content = line[1:-1]  # Remove parentheses
-                parts = [part.strip() for part in content.split(',')]
-                if len(parts) >= 3:
-                    subject = parts[0]
-                    relation = parts[1]
-                    object_part = ','.join(parts[2:])  # Handle objects with commas
-                    triplets.append((subject, relation, object_part))
-            except Exception as e:
-                print(f"Error parsing triplet line '{line}': {e}")
-                continue
-        
-        # Handle REBEL format: subject relation object
-        else:
-            tokens = line.split()
-            if len(tokens) >= 3:
-                # Try to find the relation (usually the middle token)
-                for i in range(1, len(tokens) - 1):
-                    subject = ' '.join(tokens[:i])
-                    relation = tokens[i]
-                    obj = ' '.join(tokens[i+1:])
-                    if len(subject) > 0 and len(obj) > 0:
-                        triplets.append((subject, relation, obj))
-                        break
-    
-    return triplets
+# parse_triplets is re-exported for existing callers
+from utils.triplets import as_triplet, parse_triplets
+from utils.tracing import traced
+from pipeline.analytics import get_analytics
+from pipeline.communities import DEFAULT_SEED
+from pipeline.concept_index import get_concept_index
+from pipeline.graph_cache import LRUCache, graph_fingerprint
+from pipeline.layouts import compute_layout, use_server_layout
+from pipeline.mermaid import (
+    DEFAULT_MAX_EDGES,
+    DEFAULT_MAX_NODES,
+    learning_path_skeleton,
+    sanitize_label,
+    skeleton_to_mermaid,
+)
+
+# Rendered HTML keyed by (graph fingerprint, layout, search term, search mode)
+_render_cache = LRUCache(maxsize=16)
+_template_env = None
+
+COMMUNITY_PALETTE = [
+    "#6baed6", "#fd8d3c", "#74c476", "#9e9ac8", "#e377c2", "#ff9896", "#c7c7c7", "#bcbd22", "#17becf"
+]
+
+EDGE_LEGEND_HTML = '''
+    <div style="margin-top:10px;padding-top:10px;border-top:1px solid #444;">
+      <b>Edge Colors:</b><br>
+      <span style="color:#74c476;">■</span> Contains/Has <span style="color:#fd8d3c;">■</span> Causes/Leads <span style="color:#6baed6;">■</span> Transmits/Carries<br>
+      <span style="color:#e377c2;">■</span> Controls/Regulates <span style="color:#ff9896;">■</span> Connects/Links <span style="color:#c7c7c7;">■</span> Other
+    </div>
+    '''
+
+def get_community_palette(seed=DEFAULT_SEED):
+    """Community colors in a fixed, seed-determined order."""
+    palette = list(COMMUNITY_PALETTE)
+    random.Random(seed).shuffle(palette)
+    return palette
 
 def build_graph(triplets):
     """
-    Build a directed graph from triplets.
+    Build a directed graph from Triplet objects (or plain 3-tuples).
+
+    Repeated (subject, object) pairs are aggregated in a single pass,
+    so each edge carries:
+      weight    - number of triplets supporting the edge
+      relations - {relation label: count}
+      label     - the most frequent relation label
+      sources   - sorted IDs of the chunks the edge was extracted from
+    Each node carries ``mentions``, the number of triplets naming it.
+    A deduplicated triplet counts as many times as its ``count``.
     """
     G = nx.DiGraph()
     
@@ -61,16 +63,39 @@ def build_graph(triplets):
         print("Warning: No triplets provided to build graph")
         return G
     
-    for subj, rel, obj in triplets:
+    mentions = Counter()
+    edges = {}
+    for triplet in triplets:
+        triplet = as_triplet(triplet)
         # Clean up node names
-        subj = subj.strip()
-        obj = obj.strip()
-        rel = rel.strip()
+        subj = triplet.subject.strip()
+        obj = triplet.object.strip()
+        rel = triplet.relation.strip()
         
         if subj and obj and rel:
-            G.add_node(subj)
-            G.add_node(obj)
-            G.add_edge(subj, obj, label=rel)
+            count = triplet.count
+            mentions[subj] += count
+            mentions[obj] += count
+            edge = edges.get((subj, obj))
+            if edge is None:
+                edge = edges[(subj, obj)] = {"weight": 0, "relations": Counter(), "sources": set()}
+            edge["weight"] += count
+            edge["relations"][rel] += count
+            if triplet.sources:
+                edge["sources"].update(triplet.sources)
+            elif triplet.chunk_id is not None:
+                edge["sources"].add(triplet.chunk_id)
+    
+    G.add_nodes_from((node, {"mentions": count}) for node, count in mentions.items())
+    G.add_edges_from(
+        (subj, obj, {
+            "weight": edge["weight"],
+            "label": edge["relations"].most_common(1)[0][0],
+            "relations": dict(edge["relations"]),
+            "sources": sorted(edge["sources"]),
+        })
+        for (subj, obj), edge in edges.items()
+    )
     
     return G
 
@@ -85,11 +110,27 @@ def get_layout_options():
         "spring": "Spring Physics"
     }
 
-def get_physics_config(layout_type="force"):
+def get_physics_config(layout_type="force", precomputed=False):
     """
     Get physics configuration for different layout types.
+    With precomputed=True node positions are fixed server-side,
+    so browser physics is switched off entirely.
     """
-    if layout_type == "hierarchical":
+    if precomputed:
+        return """
+        var options = {
+          "physics": {
+            "enabled": false
+          },
+          "edges": {
+            "smooth": false
+          },
+          "interaction": {
+            "hideEdgesOnDrag": true
+          }
+        }
+        """
+    elif layout_type == "hierarchical":
         return """
         var options = {
           "physics": {
@@ -183,62 +224,95 @@ def get_relation_color(relation):
     else:
         return "#c7c7c7"  # Gray for other relations
 
-def visualize_graph(G, out_file="outputs/concept_map.html", layout_type="force", search_term=None):
+def use_shared_template(net):
+    """
+    Point a pyvis Network at one shared template environment, so the HTML
+    template is loaded and compiled once per process instead of per render.
     """
-    Create an interactive HTML visualization of the concept graph.
+    global _template_env
+    if _template_env is None:
+        _template_env = net.templateEnv
+    else:
+        net.templateEnv = _template_env
+
+def fast_add_node(net, node, **options):
+    """
+    Same as net.add_node for a node known to be new, without pyvis'
+    linear scan of existing node IDs (quadratic on large graphs).
+    """
+    options.update(id=node, shape=net.shape, font=dict(color=net.font_color))
+    net.nodes.append(options)
+    net.node_ids.append(node)
+    net.node_map[node] = options
+
+def fast_add_edge(net, source, to, **options):
+    """
+    Same as net.add_edge for an edge known to be new, without pyvis'
+    linear scans of existing nodes and edges.
+    """
+    options.update({"from": source, "to": to})
+    net.edges.append(options)
+
+@traced("render.pyvis")
+def render_graph_html(G, layout_type="force", search_term=None, search_mode="exact", use_cache=True,
+                      precompute_layout=None):
+    """
+    Render the interactive concept graph to an HTML string, entirely in memory.
     Node size = degree centrality, color = community, enhanced tooltips.
+    search_mode is "exact", "prefix" or "fuzzy" word matching.
+    precompute_layout fixes node positions server-side and disables browser
+    physics; None turns it on automatically for large graphs.
+    Results are memoized by graph fingerprint, layout and search filter.
     """
     if not G.nodes():
         print("Warning: No nodes in graph to visualize")
-        return
+        return ""
+    
+    key = None
+    if use_cache:
+        key = (graph_fingerprint(G), layout_type, search_term or "", search_mode, precompute_layout)
+        html = _render_cache.get(key)
+        if html is not None:
+            return html
     
     # --- Filter graph based on search term ---
     if search_term:
-        search_words = search_term.lower().split()
-        
-        # Find matching nodes
-        matching_nodes = set()
-        for node in G.nodes():
-            node_words = node.lower().split()
-            for search_word in search_words:
-                if search_word in node_words:
-                    matching_nodes.add(node)
-                    break
+        # Token index lookup; the neighbourhood subgraph is cached per query
+        search_result = get_concept_index(G).search(search_term, search_mode)
+        matching_nodes = search_result.matches
+        G_filtered = search_result.subgraph
         
-        # Include immediate neighbors of matching nodes
-        neighbor_nodes = set()
-        for node in matching_nodes:
-            neighbor_nodes.update(G.predecessors(node))  # Incoming connections
-            neighbor_nodes.update(G.successors(node))    # Outgoing connections
-        
-        # Create filtered graph with only matching nodes and their neighbors
-        filtered_nodes = matching_nodes.union(neighbor_nodes)
-        G_filtered = G.subgraph(filtered_nodes).copy()
-        
-        print(f"Filtered graph: showing {len(G_filtered.nodes())} nodes (searched: {len(matching_nodes)}, neighbors: {len(neighbor_nodes)})")
+        print(f"Filtered graph: showing {len(G_filtered.nodes())} nodes (searched: {len(matching_nodes)}, neighbors: {len(search_result.neighbors)})")
         G = G_filtered
     else:
         matching_nodes = set()
     
+    from pyvis.network import Network  # Imported on first render; it is slow to import
     net = Network(height="600px", width="100%", bgcolor="#222222", font_color="white")
+    use_shared_template(net)
     
-    # --- Node size by degree centrality ---
-    centrality = nx.degree_centrality(G)
+    # --- Fixed server-side positions for large graphs ---
+    if precompute_layout is None:
+        precompute_layout = use_server_layout(G)
+    positions = compute_layout(G, layout_type) if precompute_layout else {}
+    
+    # --- Node size by degree centrality (memoized per graph) ---
+    analytics = get_analytics(G)
+    centrality = analytics.centrality
     min_size, max_size = 15, 40
     
     # --- Community detection for coloring ---
+    # Algorithm is chosen by graph size; results are cached per graph
+    palette = get_community_palette()
     try:
-        communities = list(greedy_modularity_communities(G.to_undirected()))
+        communities = analytics.communities
         node_community = {}
-        palette = [
-            "#6baed6", "#fd8d3c", "#74c476", "#9e9ac8", "#e377c2", "#ff9896", "#c7c7c7", "#bcbd22", "#17becf"
-        ]
-        random.shuffle(palette)
         for idx, comm in enumerate(communities):
             for node in comm:
                 node_community[node] = palette[idx % len(palette)]
     except Exception as e:
         print(f"Community detection failed: {e}")
+        communities = []
         node_community = {n: "#6baed6" for n in G.nodes}
     
     # --- Simple tooltips: just node name ---
@@ -247,76 +321,48 @@ def visualize_graph(G, out_file="outputs/concept_map.html", layout_type="force",
         color = node_community.get(node, "#6baed6")
         degree = G.degree[node]
         
-        # Check if node matches search term
-        is_highlighted = False
-        if search_term:
-            search_words = search_term.lower().split()  # Split into individual words
-            node_words = node.lower().split()
-            
-            # Check if any search word exactly matches any word in the node
-            for search_word in search_words:
-                if search_word in node_words:
-                    is_highlighted = True
-                    break
-            
-            if is_highlighted:
-                # Make highlighted nodes larger and add border
-                size += 10
-                border_color = "#ffff00"  # Yellow border for highlighted nodes
-            else:
-                border_color = "#ffffff"
+        # Highlight nodes matching the search term
+        if node in matching_nodes:
+            # Make highlighted nodes larger and add border
+            size += 10
+            border_color = "#ffff00"  # Yellow border for highlighted nodes
         else:
             border_color = "#ffffff"
         
         # Tooltip is just the node name (plain text)
         title = node
         
-        net.add_node(node, label=node, title=title, color=color, size=size, border=border_color)
-    
-    # --- Edge styling by relation type ---
-    edge_counts = {}
-    for u, v in G.edges():
-        edge_counts[(u, v)] = edge_counts.get((u, v), 0) + 1
+        if node in positions:
+            x, y = positions[node]
+            fast_add_node(net, node, label=node, title=title, color=color, size=size, border=border_color,
+                      x=x, y=y, physics=False)
+        else:
+            fast_add_node(net, node, label=node, title=title, color=color, size=size, border=border_color)
     
+    # --- Edge styling by relation type, thickness by frequency ---
     for u, v, data in G.edges(data=True):
         label = data.get("label", "")
-        width = 2 + edge_counts.get((u, v), 1)  # Thicker if more frequent
+        weight = data.get("weight", 1)
+        width = 2 + min(weight, 8)  # Thicker if more frequent
         color = get_relation_color(label)
+        relations = data.get("relations") or {label: weight}
+        title = ", ".join(f"{rel} ({count})" if count > 1 else rel for rel, count in relations.items())
         
         # Highlight edges connected to searched nodes
-        edge_highlighted = False
-        if search_term:
-            search_words = search_term.lower().split()
-            u_words = u.lower().split()
-            v_words = v.lower().split()
-            
-            # Check if any search word exactly matches any word in either node
-            for search_word in search_words:
-                if (search_word in u_words or search_word in v_words):
-                    edge_highlighted = True
-                    width += 2  # Make highlighted edges thicker
-                    break
+        if u in matching_nodes or v in matching_nodes:
+            width += 2  # Make highlighted edges thicker
         
-        net.add_edge(u, v, title=label, label=label, arrows='to', width=width, color=color)
+        fast_add_edge(net, u, v, title=title, label=label, arrows='to', width=width, color=color)
     
     # Configure physics based on layout type
-    physics_config = get_physics_config(layout_type)
+    physics_config = get_physics_config(layout_type, precomputed=bool(positions))
     net.set_options(physics_config)
     
-    # Ensure output directory exists
-    import os
-    os.makedirs(os.path.dirname(out_file), exist_ok=True)
-    
-    net.write_html(out_file, notebook=False)
+    html = net.generate_html(notebook=False)
 
     # --- Add legend to HTML output ---
-    # Read the generated HTML
-    with open(out_file, "r", encoding="utf-8") as f:
-        html = f.read()
-
-    # Build legend HTML
     legend_items = []
-    if 'communities' in locals():
+    if communities:
         # Generic cluster names
         cluster_names = ["Core concepts", "Supporting concepts", "Related concepts", "Secondary concepts", "Additional concepts"]
         
@@ -339,13 +385,7 @@ def visualize_graph(G, out_file="outputs/concept_map.html", layout_type="force",
         '''
     
     # Add edge color legend
-    edge_legend = '''
-    <div style="margin-top:10px;padding-top:10px;border-top:1px solid #444;">
-      <b>Edge Colors:</b><br>
-      <span style="color:#74c476;">■</span> Contains/Has <span style="color:#fd8d3c;">■</span> Causes/Leads <span style="color:#6baed6;">■</span> Transmits/Carries<br>
-      <span style="color:#e377c2;">■</span> Controls/Regulates <span style="color:#ff9896;">■</span> Connects/Links <span style="color:#c7c7c7;">■</span> Other
-    </div>
-    '''
+    edge_legend = EDGE_LEGEND_HTML
     
     legend_html = f'''
     <div style="position:fixed;top:20px;right:20px;z-index:1000;background:#222;color:#fff;padding:12px 18px;border-radius:8px;max-width:300px;font-size:13px;box-shadow:0 2px 8px #0007;max-height:80vh;overflow-y:auto;">
@@ -360,34 +400,46 @@ def visualize_graph(G, out_file="outputs/concept_map.html", layout_type="force",
     # Insert legend just after <body>
     html = html.replace('<body>', '<body>' + legend_html, 1)
 
-    # Write back the HTML with legend
+    if key is not None:
+        _render_cache.put(key, html)
+    return html
+
+def visualize_graph(G, out_file="outputs/concept_map.html", layout_type="force", search_term=None, search_mode="exact"):
+    """
+    Create an interactive HTML visualization of the concept graph and save it to out_file.
+    See render_graph_html for the rendering options.
+    """
+    html = render_graph_html(G, layout_type, search_term, search_mode)
+    if not html:
+        return
+    
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
     with open(out_file, "w", encoding="utf-8") as f:
         f.write(html)
 
     print(f"Graph visualization saved to: {out_file} (with enhanced features)")
 
-def get_learning_path_mermaid(G):
+def get_learning_path_mermaid(G, max_nodes=DEFAULT_MAX_NODES, max_edges=DEFAULT_MAX_EDGES):
     """
-    Generate a Mermaid flowchart for the learning path (topological sort) of the concept map graph G.
+    Generate a Mermaid flowchart for the learning path of the concept map graph G.
+
+    By default the diagram is size-bounded: cycles are condensed, the
+    max_nodes most important concepts are kept, shortcut edges are removed
+    by transitive reduction and at most max_edges edges are drawn (see
+    pipeline.mermaid). Pass max_nodes=None for one line per edge of G.
     Escapes node names for Mermaid compatibility.
     """
-    import networkx as nx
-    import re
-    def sanitize(node):
-        # Remove newlines, tabs, and escape quotes/backslashes
-        node = str(node).replace('"', '\"').replace('\\', '\\')
-        node = re.sub(r'[\n\r\t]', ' ', node)
-        return node.strip()
     if not G or not G.nodes:
         return "flowchart TD\n  %% No concepts found"
-    try:
-        order = list(nx.topological_sort(G))
-    except Exception:
-        order = list(G.nodes)
+    if max_nodes is not None:
+        return skeleton_to_mermaid(*learning_path_skeleton(G, max_nodes, max_edges))
+    # Condensation-based ordering never fails on cycles
+    order = get_analytics(G).ordering
     edges = list(G.edges())
     if not edges:
-        return "flowchart TD\n  " + " --> ".join([f'"{sanitize(n)}"' for n in order])
+        return "flowchart TD\n  " + " --> ".join([f'"{sanitize_label(n)}"' for n in order])
     mermaid = ["flowchart TD"]
     for u, v in edges:
-        mermaid.append(f'  "{sanitize(u)}" --> "{sanitize(v)}"')
+        mermaid.append(f'  "{sanitize_label(u)}" --> "{sanitize_label(v)}"')
     return "\n".join(mermaid)
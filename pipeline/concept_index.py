@@ -0,0 +1,124 @@
+# pipeline/concept_index.py
+
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import FrozenSet, NamedTuple
+
+from pipeline.graph_cache import LRUCache, graph_version
+
+_TOKEN_RE = re.compile(r"\w+")
+MIN_PREFIX_LENGTH = 2
+FUZZY_CUTOFF = 0.8
+MAX_FUZZY_CANDIDATES = 200
+
+SEARCH_MODES = ("exact", "prefix", "fuzzy")
+
+def tokenize(text):
+    """Lowercase word tokens of a concept name or query."""
+    return _TOKEN_RE.findall(text.lower())
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ConceptSearchResult(NamedTuple):
+    matches: FrozenSet[str]      # nodes whose words match the query
+    neighbors: FrozenSet[str]    # direct predecessors/successors of matches
+    subgraph: object             # copy of G restricted to matches and neighbors
+
+class ConceptIndex:
+    """
+    Token index over the concept names of one graph.
+
+    Maps word tokens, token prefixes and token trigrams to concepts, so a
+    search touches only the matching entries instead of scanning every node.
+    Search results, including the neighbourhood subgraph, are cached per query.
+    """
+
+    def __init__(self, G):
+        self.G = G
+        self.signature = index_signature(G)
+        self._token_nodes = defaultdict(set)
+        self._prefix_tokens = defaultdict(set)
+        self._trigram_tokens = defaultdict(set)
+        self._results = LRUCache(maxsize=64)
+
+        for node in G.nodes:
+            for token in tokenize(str(node)):
+                self._token_nodes[token].add(node)
+
+        for token in self._token_nodes:
+            for end in range(MIN_PREFIX_LENGTH, len(token) + 1):
+                self._prefix_tokens[token[:end]].add(token)
+            for gram in _trigrams(token):
+                self._trigram_tokens[gram].add(token)
+
+    def _tokens_for(self, word, mode):
+        if mode == "exact":
+            return {word} if word in self._token_nodes else set()
+        if mode == "prefix":
+            return self._prefix_tokens.get(word, set())
+        if mode == "fuzzy":
+            tokens = set(self._prefix_tokens.get(word, ()))
+            # Candidates share trigrams with the word; only the best are scored
+            shared = defaultdict(int)
+            for gram in _trigrams(word):
+                for token in self._trigram_tokens.get(gram, ()):
+                    shared[token] += 1
+            candidates = sorted(shared, key=shared.get, reverse=True)[:MAX_FUZZY_CANDIDATES]
+            for token in candidates:
+                if SequenceMatcher(None, word, token).ratio() >= FUZZY_CUTOFF:
+                    tokens.add(token)
+            return tokens
+        raise ValueError(f"Unknown search mode: {mode}")
+
+    def match(self, query, mode="exact"):
+        """Nodes containing any word of the query."""
+        matches = set()
+        for word in tokenize(query):
+            for token in self._tokens_for(word, mode):
+                matches.update(self._token_nodes[token])
+        return matches
+
+    def search(self, query, mode="exact"):
+        """
+        Matching nodes plus their direct neighbours and the subgraph
+        induced by both. Results are cached per (query, mode).
+        """
+        key = (" ".join(tokenize(query)), mode)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+
+        G = self.G
+        matches = self.match(query, mode)
+        neighbors = set()
+        for node in matches:
+            neighbors.update(G.predecessors(node))  # Incoming connections
+            neighbors.update(G.successors(node))    # Outgoing connections
+        neighbors -= matches
+
+        result = ConceptSearchResult(
+            frozenset(matches),
+            frozenset(neighbors),
+            G.subgraph(matches | neighbors).copy(),
+        )
+        self._results.put(key, result)
+        return result
+
+def index_signature(G):
+    return (graph_version(G), G.number_of_nodes())
+
+def get_concept_index(G):
+    """
+    Return the concept index for G, building it on first use.
+    The index is stored on the graph so every caller shares it.
+    """
+    index = G.graph.get("concept_index")
+    # Subgraph copies inherit G.graph, so check the index belongs to this graph
+    # and is as recent as the graph
+    if index is None or index.G is not G or index.signature != index_signature(G):
+        index = ConceptIndex(G)
+        G.graph["concept_index"] = index
+    return index
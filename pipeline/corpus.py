@@ -0,0 +1,284 @@
+# pipeline/corpus.py
+
+import itertools
+import os
+import threading
+import time
+from collections import Counter, deque
+
+import networkx as nx
+
+from pipeline.analytics import get_analytics
+from pipeline.canonicalize import canonical_key
+from pipeline.concept_graph import build_graph
+from pipeline.graph_cache import mark_changed
+from pipeline.persistence import load_graph, save_graph
+from utils.triplets import as_triplet
+
+DEFAULT_CORPUS_DIR = "data/corpora"
+# Above this fraction of changed nodes, communities are recomputed from scratch
+COMMUNITY_REFRESH_FRACTION = 0.2
+
+def _source_order(source):
+    doc_id, chunk_id = source
+    return (str(doc_id), -1 if chunk_id is None else chunk_id)
+
+def corpus_path(name, directory=DEFAULT_CORPUS_DIR):
+    """File a named corpus is stored in."""
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name.strip()) or "corpus"
+    return os.path.join(directory, f"{safe}.mskg")
+
+class CorpusGraph:
+    """
+    One concept graph shared by many documents, kept on disk between sessions.
+
+    Documents are merged in one at a time. Concept names are matched by
+    canonical_key, so "Neuron" from one PDF and "neurons" from another become
+    the same node. Every node and edge records which documents contributed to
+    it in a ``documents`` attribute:
+      node: {doc_id: mentions}
+      edge: {doc_id: {"relations": {label: count}, "sources": [chunk ids]}}
+    and the usual build_graph attributes (mentions, weight, relations, label)
+    are the sums over documents. An edge's ``sources`` lists the
+    [doc_id, chunk id] pairs it was extracted from ([doc_id, None] when the
+    chunk is unknown). Adding a document again replaces its previous
+    contribution.
+
+    Communities are updated incrementally: new concepts join the community
+    most of their neighbours belong to, and a full recomputation only happens
+    when a large fraction of the graph changed. Either way they are computed
+    when the document is added, so save() stores them for the next update.
+    Centrality is recomputed lazily by the graph's analytics when next read.
+
+    Several sessions may share one corpus. A document is merged into a copy
+    of the graph that replaces ``G`` in one step, so a graph a reader got
+    from ``G`` is never changed afterwards; check, add and save under
+    ``lock`` to merge each upload once.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        if path and os.path.exists(path):
+            self.G = load_graph(path)
+        else:
+            self.G = nx.DiGraph()
+        self.G.graph.setdefault("documents", {})
+        # One corpus may be shared by several sessions
+        self.lock = threading.RLock()
+        self._keys = {}
+        for node in self.G.nodes:
+            self._keys.setdefault(canonical_key(node) or node.lower(), node)
+
+    @property
+    def documents(self):
+        """
+        {doc_id: {"triplets": count, "added": unix time, "hash": content hash}}
+        for every merged document.
+        """
+        return self.G.graph["documents"]
+
+    def has_document(self, doc_id, content_hash=None):
+        """Whether doc_id is merged, and with the given content if a hash is passed."""
+        info = self.documents.get(doc_id)
+        if info is None:
+            return False
+        return content_hash is None or info.get("hash") == content_hash
+
+    def _node_for(self, name):
+        key = canonical_key(name) or name.lower()
+        return self._keys.setdefault(key, name)
+
+    def _working_copy(self):
+        """
+        Copy of G to merge a document into: attribute dicts and the
+        per-document records are copied, memoized analytics and the search
+        index are left behind.
+        """
+        G = nx.DiGraph()
+        G.graph.update(
+            (key, value) for key, value in self.G.graph.items() if key not in ("analytics", "concept_index")
+        )
+        G.graph["documents"] = dict(self.G.graph["documents"])
+        G.add_nodes_from(
+            (node, dict(data, documents=dict(data["documents"]))) for node, data in self.G.nodes(data=True)
+        )
+        G.add_edges_from(
+            (u, v, dict(data, documents=dict(data["documents"]), sources=list(data.get("sources", []))))
+            for u, v, data in self.G.edges(data=True)
+        )
+        return G
+
+    def _remove_contribution(self, G, doc_id):
+        """Subtract everything doc_id added to G. Returns the nodes that disappeared."""
+        for u, v, data in list(G.edges(data=True)):
+            contribution = data["documents"].pop(doc_id, None)
+            if contribution is None:
+                continue
+            if not data["documents"]:
+                G.remove_edge(u, v)
+                continue
+            data["sources"] = [source for source in data["sources"] if source[0] != doc_id]
+            relations = Counter(data["relations"])
+            relations.subtract(contribution["relations"])
+            data["relations"] = {rel: count for rel, count in relations.items() if count > 0}
+            data["weight"] = sum(data["relations"].values())
+            data["label"] = max(data["relations"], key=lambda rel: (data["relations"][rel], rel))
+
+        removed = set()
+        for node, data in list(G.nodes(data=True)):
+            mentions = data["documents"].pop(doc_id, None)
+            if mentions is None:
+                continue
+            data["mentions"] -= mentions
+            if not data["documents"] and not G.degree(node):
+                G.remove_node(node)
+                removed.add(node)
+        for node in removed:
+            key = canonical_key(node) or node.lower()
+            if self._keys.get(key) == node:
+                del self._keys[key]
+        return removed
+
+    def add_document(self, doc_id, triplets, content_hash=None):
+        """
+        Merge a document's triplets into the corpus graph.
+
+        Names are mapped onto existing concepts by canonical_key before the
+        document's own edges are aggregated with build_graph and added to
+        the totals. Returns a stats dict with new_nodes, new_edges,
+        total_nodes, total_edges and whether communities were fully recomputed.
+        """
+        with self.lock:
+            return self._add_document(doc_id, triplets, content_hash)
+
+    def _add_document(self, doc_id, triplets, content_hash):
+        previous = get_analytics(self.G).peek("communities")
+        G = self._working_copy()
+        old_nodes = G.number_of_nodes()
+        old_edges = G.number_of_edges()
+
+        removed = self._remove_contribution(G, doc_id) if doc_id in self.documents else set()
+
+        mapped = []
+        for triplet in triplets:
+            triplet = as_triplet(triplet)
+            subj, obj = triplet.subject.strip(), triplet.object.strip()
+            if not subj or not obj:
+                continue
+            subj, obj = self._node_for(subj), self._node_for(obj)
+            if subj != obj:
+                mapped.append(triplet._replace(subject=subj, object=obj))
+        D = build_graph(mapped)
+
+        added = set()
+        for node, mentions in D.nodes(data="mentions"):
+            if node in G:
+                data = G.nodes[node]
+                data["mentions"] += mentions
+            else:
+                G.add_node(node, mentions=mentions, documents={})
+                data = G.nodes[node]
+                added.add(node)
+            data["documents"][doc_id] = mentions
+
+        new_edges = 0
+        for u, v, edge in D.edges(data=True):
+            contribution = {"relations": edge["relations"], "sources": edge["sources"]}
+            sources = [[doc_id, chunk_id] for chunk_id in edge["sources"]] or [[doc_id, None]]
+            if G.has_edge(u, v):
+                data = G.edges[u, v]
+                relations = Counter(data["relations"])
+                relations.update(edge["relations"])
+                data["relations"] = dict(relations)
+                data["weight"] += edge["weight"]
+                data["label"] = max(relations, key=lambda rel: (relations[rel], rel))
+                data["documents"][doc_id] = contribution
+                data["sources"] = sorted(data.get("sources", []) + sources, key=_source_order)
+            else:
+                G.add_edge(u, v, weight=edge["weight"], label=edge["label"],
+                           relations=dict(edge["relations"]), sources=sources,
+                           documents={doc_id: contribution})
+                new_edges += 1
+
+        G.graph["documents"][doc_id] = {"triplets": sum(t.count for t in mapped), "added": int(time.time()), "hash": content_hash}
+
+        mark_changed(G)
+        analytics = get_analytics(G)
+        changed = len(added) + len(removed)
+        full_refresh = previous is None or changed > COMMUNITY_REFRESH_FRACTION * max(old_nodes, 1)
+        if full_refresh:
+            analytics.communities  # computed now so save() persists them
+        else:
+            analytics.prime("communities", self._extend_communities(G, previous, added, removed))
+        self.G = G
+
+        return {
+            "new_nodes": len(added),
+            "new_edges": new_edges,
+            "total_nodes": G.number_of_nodes(),
+            "total_edges": G.number_of_edges(),
+            "previous_nodes": old_nodes,
+            "previous_edges": old_edges,
+            "communities_recomputed": full_refresh,
+        }
+
+    def _extend_communities(self, G, communities, added, removed):
+        """
+        Drop removed nodes and place each new node in the community holding
+        most of its (weighted) neighbours. New nodes are visited breadth-first
+        from known ones so chains of new concepts follow their anchor; nodes
+        with no placed neighbour start communities of their own.
+        """
+        members = [set(comm) - removed for comm in communities]
+        assignment = {node: idx for idx, comm in enumerate(members) for node in comm}
+
+        def neighbours(node):
+            return itertools.chain(G.successors(node), G.predecessors(node))
+
+        def place(node):
+            votes = Counter()
+            for _, nbr, weight in G.out_edges(node, data="weight"):
+                if nbr in assignment:
+                    votes[assignment[nbr]] += weight
+            for nbr, _, weight in G.in_edges(node, data="weight"):
+                if nbr in assignment:
+                    votes[assignment[nbr]] += weight
+            idx = max(votes, key=lambda c: (votes[c], -c)) if votes else len(members)
+            if idx == len(members):
+                members.append(set())
+            assignment[node] = idx
+            members[idx].add(node)
+            pending.discard(node)
+            for nbr in neighbours(node):
+                if nbr in pending and nbr not in queued:
+                    queued.add(nbr)
+                    queue.append(nbr)
+
+        pending = set(added)
+        # Breadth-first from the placed nodes: each node is placed once, when
+        # it is reached, so all of its placed neighbours vote
+        queue = deque(sorted(
+            (node for node in pending if any(nbr in assignment for nbr in neighbours(node))), key=str,
+        ))
+        queued = set(queue)
+        while pending:
+            if not queue:
+                # Nothing left touches a placed node: seed a new community
+                node = min(pending, key=str)
+                queued.add(node)
+                queue.append(node)
+            place(queue.popleft())
+
+        return sorted(
+            (frozenset(c) for c in members if c),
+            key=lambda c: (-len(c), min(map(str, c))),
+        )
+
+    def save(self, path=None):
+        """Write the corpus graph, with its computed analytics, to disk."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for saving the corpus")
+        with self.lock:
+            save_graph(self.G, path)
+        self.path = path
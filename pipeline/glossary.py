@@ -0,0 +1,305 @@
+# pipeline/glossary.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import get_profile
+from pipeline.concept_index import tokenize
+from utils.preprocess import is_offline
+
+# Longest in-document sentence accepted as a definition
+MAX_DEFINITION_LENGTH = 200
+DEFAULT_CACHE_PATH = "data/definitions.sqlite"
+DEFAULT_LOCAL_PATH = "data/glossary.json"
+DEFAULT_TIMEOUT = 8.0       # seconds for one batch of external lookups
+DEFAULT_WORKERS = 8
+# Misses are remembered for a day so terms without a definition are not refetched every run
+NEGATIVE_TTL = 24 * 3600
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+# Phrases that suggest a sentence defines its subject
+_DEFINITION_CUES = re.compile(r"\b(?:is|are|refers to|means|is called|are called|defined as)\b", re.IGNORECASE)
+
+def split_sentences(text):
+    """Cheap sentence splitter; good enough for locating definitions."""
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+
+class SentenceIndex:
+    """
+    Inverted index from word tokens to the sentences of a document.
+
+    Built once per document over its summaries and chunks. A lookup
+    intersects the posting lists of the term's tokens, so only sentences
+    containing every word of the term are checked.
+    """
+
+    def __init__(self, *text_groups):
+        self.sentences = []
+        self._priority = []
+        self._postings = defaultdict(list)
+        # Earlier groups (summaries) are preferred over later ones (chunks)
+        seen = set()
+        for priority, texts in enumerate(text_groups):
+            for text in texts or []:
+                for sentence in split_sentences(text):
+                    if sentence in seen:
+                        continue
+                    seen.add(sentence)
+                    sentence_id = len(self.sentences)
+                    self.sentences.append(sentence)
+                    self._priority.append(priority)
+                    for token in set(tokenize(sentence)):
+                        self._postings[token].append(sentence_id)
+
+    def candidates(self, term):
+        """IDs of sentences containing every word of term."""
+        tokens = set(tokenize(term))
+        if not tokens:
+            return []
+        postings = sorted((self._postings.get(token, []) for token in tokens), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return result
+
+    def lookup(self, term, max_length=MAX_DEFINITION_LENGTH):
+        """
+        Best in-document definition of term, or None. Sentences from
+        summaries, with a defining phrase such as "is" or "refers to", and
+        shorter sentences are preferred.
+        """
+        lowered = term.lower()
+        best = None
+        for sentence_id in self.candidates(term):
+            sentence = self.sentences[sentence_id]
+            if len(sentence) > max_length or lowered not in sentence.lower():
+                continue
+            rank = (
+                self._priority[sentence_id],
+                _DEFINITION_CUES.search(sentence) is None,
+                len(sentence),
+                sentence_id,
+            )
+            if best is None or rank < best[0]:
+                best = (rank, sentence)
+        return best[1] if best else None
+
+class LocalSource:
+    """
+    Definitions from a local JSON file ({term: definition}) or dict.
+    A stand-in for online sources when working offline.
+    """
+
+    name = "local"
+
+    def __init__(self, definitions=None, path=DEFAULT_LOCAL_PATH):
+        if definitions is None:
+            definitions = {}
+            if path and os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    definitions = json.load(f)
+        self.definitions = {term.lower(): text for term, text in definitions.items()}
+
+    def lookup(self, term):
+        return self.definitions.get(term.lower())
+
+class WikipediaSource:
+    """
+    First sentences of the matching Wikipedia article. Terms without an
+    unambiguous article give None; network errors are raised, so the term
+    is retried later instead of being cached as having no definition.
+    """
+
+    name = "wikipedia"
+
+    def __init__(self, sentences=1):
+        self.sentences = sentences
+
+    def lookup(self, term):
+        import wikipedia  # Imported on first use; only needed when online
+        try:
+            return wikipedia.summary(term, sentences=self.sentences, auto_suggest=True, redirect=True)
+        except (wikipedia.exceptions.PageError, wikipedia.exceptions.DisambiguationError):
+            return None
+
+def default_sources(offline=None):
+    """
+    Local definitions, plus Wikipedia unless offline. offline defaults to the
+    MINDSKETCH_OFFLINE environment variable.
+    """
+    if offline is None:
+        offline = is_offline()
+    sources = [LocalSource()]
+    if not offline:
+        sources.append(WikipediaSource())
+    return sources
+
+class DefinitionCache:
+    """
+    Persistent cache of external definitions in a small SQLite file.
+    Misses are stored too, and expire after NEGATIVE_TTL seconds.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS definitions ("
+                "source TEXT, term TEXT, definition TEXT, fetched REAL, "
+                "PRIMARY KEY (source, term))"
+            )
+
+    def get_many(self, source, terms):
+        """{term: definition or None} for the terms with a valid cache entry."""
+        found = {}
+        now = time.time()
+        keys = {term.lower(): term for term in terms}
+        key_list = list(keys)
+        with self._lock:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(key_list), 500):
+                batch = key_list[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT term, definition, fetched FROM definitions WHERE source = ? AND term IN (%s)"
+                    % ",".join("?" * len(batch)),
+                    [source, *batch],
+                ).fetchall()
+                for term, definition, fetched in rows:
+                    if definition is None and now - fetched > NEGATIVE_TTL:
+                        continue
+                    found[keys[term]] = definition
+        return found
+
+    def put_many(self, source, definitions):
+        """Store {term: definition or None}."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO definitions VALUES (?, ?, ?, ?)",
+                [(source, term.lower(), definition, now) for term, definition in definitions.items()],
+            )
+
+    def close(self):
+        self._conn.close()
+
+class GlossaryEngine:
+    """
+    Resolves definitions for concept terms.
+
+    Each term is looked up in the document itself first (SentenceIndex),
+    then in every source in order. External results come from the
+    persistent DefinitionCache when possible; the remaining terms are
+    fetched concurrently, and anything not answered within the timeout (or
+    whose lookup failed) is left undefined for now rather than blocking the
+    page, and retried on the next call. Resolved
+    definitions are memoized in the engine, so reruns and glossary searches
+    do not repeat work.
+    """
+
+    def __init__(self, index, sources=None, cache=None, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self.index = index
+        self.sources = default_sources() if sources is None else sources
+        self.cache = cache
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def define(self, term):
+        """Definition of one term, or None."""
+        return self.define_all([term]).get(term)
+
+    def define_all(self, terms):
+        """{term: definition or None} for every term."""
+        with self._lock:
+            results = {term: self._resolved[term] for term in terms if term in self._resolved}
+        pending = [term for term in dict.fromkeys(terms) if term not in results]
+
+        unresolved = []
+        for term in pending:
+            definition = self.index.lookup(term) if self.index is not None else None
+            if definition:
+                results[term] = definition
+            else:
+                unresolved.append(term)
+
+        timed_out = set()
+        for source in self.sources:
+            if not unresolved:
+                break
+            found, missed = self._lookup_source(source, unresolved)
+            results.update({term: text for term, text in found.items() if text})
+            timed_out.update(missed)
+            unresolved = [term for term in unresolved if not found.get(term)]
+
+        for term in unresolved:
+            results[term] = None
+        with self._lock:
+            # Terms that timed out or failed are retried on the next call
+            self._resolved.update({term: text for term, text in results.items() if term not in timed_out or text})
+        return results
+
+    def _lookup_source(self, source, terms):
+        """
+        Returns ({term: definition or None}, terms that timed out or failed).
+        Only answered lookups are cached, misses included.
+        """
+        found = self.cache.get_many(source.name, terms) if self.cache is not None else {}
+        remaining = [term for term in terms if term not in found]
+        if not remaining:
+            return found, set()
+
+        # Even a single lookup goes through the pool, so a hung request
+        # cannot block the page past the timeout
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(remaining))))
+        futures = {executor.submit(source.lookup, term): term for term in remaining}
+        done, not_done = wait(futures, timeout=self.timeout)
+        # Do not wait for slow requests; their results are simply dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+        fetched = {}
+        missed = {futures[future] for future in not_done}
+        errors = []
+        for future in done:
+            try:
+                fetched[futures[future]] = future.result()
+            except Exception as e:
+                missed.add(futures[future])
+                errors.append(e)
+        if errors:
+            print(f"Definition lookup failed for {len(errors)} terms ({source.name}): {errors[0]}")
+
+        if self.cache is not None and fetched:
+            self.cache.put_many(source.name, fetched)
+        found.update(fetched)
+        return found, missed
+
+def build_glossary_engine(summaries, chunks, sources=None, cache_path=DEFAULT_CACHE_PATH, profile=None):
+    """
+    Glossary engine for one document, with the default sources and disk
+    cache, and the profile's lookup concurrency and timeout.
+    """
+    profile = get_profile(profile)
+    try:
+        cache = DefinitionCache(cache_path)
+    except Exception as e:
+        print(f"Definition cache unavailable: {e}")
+        cache = None
+    return GlossaryEngine(
+        SentenceIndex(summaries, chunks),
+        sources=sources,
+        cache=cache,
+        max_workers=profile["glossary_workers"],
+        timeout=profile["glossary_timeout"],
+    )
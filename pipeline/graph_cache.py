@@ -0,0 +1,72 @@
+# pipeline/graph_cache.py
+
+import hashlib
+from collections import OrderedDict
+
+def graph_version(G):
+    """How many times G was marked as changed in place (see mark_changed)."""
+    return G.graph.get("version", 0)
+
+def mark_changed(G):
+    """
+    Record that G was changed in place: nodes or edges relabeled, replaced
+    or re-weighted. Memoized analytics and the concept index of G are
+    rebuilt on their next use.
+    """
+    G.graph["version"] = graph_version(G) + 1
+
+# Edge attributes that show up in rendered HTML, besides the weight
+_RENDERED_EDGE_KEYS = ("label", "relations", "title")
+
+def graph_fingerprint(G):
+    """
+    Stable hash of a graph's nodes, edges, edge weights and the edge
+    attributes that are rendered (label, relation counts, title).
+    Two graphs built from the same triplets get the same fingerprint.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for node in G.nodes:
+        digest.update(f"{node}\0".encode("utf-8"))
+    digest.update(b"\1")
+    for u, v, data in G.edges(data=True):
+        rendered = [data.get(key) for key in _RENDERED_EDGE_KEYS]
+        # Relation order matters too: it is the order of the edge tooltip
+        if isinstance(rendered[1], dict):
+            rendered[1] = list(rendered[1].items())
+        digest.update(f"{u}\0{v}\0{data.get('weight', 1)}\0{rendered!r}\1".encode("utf-8"))
+    return digest.hexdigest()
+
+class LRUCache:
+    """
+    Small least-recently-used cache for per-graph results
+    such as community assignments, layouts and rendered HTML.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,249 @@
+# pipeline/jobs.py
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config import profile_name, use_profile
+from models.summarizer import create_document_summary
+from pipeline import novelty, stages
+from pipeline.triplet_store import TripletAggregator
+from utils.tracing import Tracer, current_tracer, span, tracing
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class JobCancelled(stages.StageCancelled):
+    """Raised inside a job's worker thread when the job is cancelled."""
+
+class PipelineJob:
+    """
+    Runs the document pipeline for one upload in a background thread.
+
+    Stages run in order: text extraction, document overview, chunking,
+    relation extraction (chunk by chunk) and chunk summaries. The UI polls
+    snapshot() for progress and partial_triplets() for the triplets found so
+    far, so the concept map can grow while extraction runs; chunks_done
+    counts the chunks of the current stage (relations, then summaries).
+    cancel() stops the job at the next chunk boundary.
+
+    When the job is done, ``result`` holds raw_text, doc_stats, overview,
+    chunks, doc_size, summaries, triplets, warnings and novelty. For large
+    documents raw_text is a utils.document.Document and chunks a ChunkList
+    of views into it (see stages.extract_stage). Very large documents may be
+    extracted adaptively (pipeline.novelty); novelty is then the plan's
+    report (chunks skipped, coverage), else None.
+
+    The whole job runs under one runtime profile (config.PROFILES), fixed
+    when the job is created. With trace=True every stage and per-chunk call
+    is recorded in ``tracer`` (a utils.tracing.Tracer).
+    """
+
+    def __init__(self, pdf_bytes, use_llm=True, profile=None, trace=False):
+        self.id = uuid.uuid4().hex
+        self.pdf_bytes = pdf_bytes
+        self.use_llm = use_llm
+        self.profile = profile_name(profile)
+        self.tracer = Tracer(f"job {self.id[:8]}") if trace else None
+        self.status = PENDING
+        self.stage = "Queued"
+        self.error = None
+        self.result = {}
+        self.chunks_done = 0
+        self.chunks_total = 0
+        self.started = None
+        self.finished = None
+        self._aggregator = TripletAggregator()
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the worker thread. Returns self."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name=f"pipeline-{self.id[:8]}", daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        """Ask the job to stop; takes effect at the next chunk or stage boundary."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished_running(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def wait(self, timeout=None):
+        """Block until the worker thread exits. Returns True if it did."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return self.finished_running
+
+    def snapshot(self):
+        """Progress of the job as a plain dict."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "profile": self.profile,
+                "stage": self.stage,
+                "chunks_done": self.chunks_done,
+                "chunks_total": self.chunks_total,
+                "progress": self.chunks_done / self.chunks_total if self.chunks_total else 0.0,
+                "triplets": len(self._aggregator),
+                "novelty": self.result.get("novelty"),
+                "error": self.error,
+                "elapsed": (self.finished or time.time()) - self.started if self.started else 0.0,
+            }
+
+    def partial_triplets(self):
+        """Deduplicated triplets, with counts, extracted so far (all of them once the job is done)."""
+        with self._lock:
+            return self._aggregator.results()
+
+    def partial_result(self, name, default=None):
+        """A result produced by an already finished stage, e.g. doc_stats."""
+        with self._lock:
+            return self.result.get(name, default)
+
+    def _set_stage(self, stage, **results):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        with self._lock:
+            self.stage = stage
+            self.result.update(results)
+
+    def run(self):
+        """Run the job in the calling thread; start() runs it in a new thread."""
+        # Without a tracer of its own, a job run inline is traced by its caller's
+        with use_profile(self.profile), tracing(self.tracer or current_tracer()), span("job", profile=self.profile):
+            self._run()
+
+    def _run(self):
+        with self._lock:
+            self.status = RUNNING
+            self.started = time.time()
+        try:
+            self._set_stage("Extracting text from PDF")
+            raw_text, doc_stats = stages.extract_stage(self.pdf_bytes)
+            self._set_stage("Creating document overview", raw_text=raw_text, doc_stats=doc_stats)
+            with span("stage.overview"):
+                overview = create_document_summary(raw_text) if self.use_llm else None
+            self._set_stage("Chunking document", overview=overview)
+            chunks, doc_size = stages.chunk_stage(raw_text)
+            with self._lock:
+                self.chunks_total = len(chunks)
+            self._set_stage("Extracting relations", chunks=chunks, doc_size=doc_size)
+            plan = novelty.adaptive_plan(chunks, doc_size) if self.use_llm else None
+            _, warnings = stages.relations_stage(
+                chunks, use_batch=self.use_llm, plan=plan,
+                aggregator=self._aggregator, lock=self._lock, on_chunk=self._chunk_done,
+            )
+            self._set_stage("Summarizing chunks", warnings=warnings, novelty=plan.report() if plan else None)
+            with self._lock:
+                self.chunks_done = 0
+            summaries = stages.summarize_stage(chunks, on_chunk=self._chunk_done)
+            self._set_stage("Done", summaries=summaries, triplets=self.partial_triplets())
+            status = DONE
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            print(f"Pipeline job {self.id} failed: {e}")
+            with self._lock:
+                self.error = str(e)
+            status = FAILED
+        with self._lock:
+            self.status = status
+            self.finished = time.time()
+            self.pdf_bytes = None
+
+    def _chunk_done(self, done):
+        """Progress callback of the chunk stages; stops the stage once the job is cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        with self._lock:
+            self.chunks_done = done
+
+class JobRegistry:
+    """
+    Jobs keyed by (upload hash, parameters), shared by every session.
+
+    Submitting a key that already has a live or finished job returns that
+    job, so reruns and other sessions uploading the same file attach to it
+    instead of starting over. Sessions that submit with a session id are
+    counted, and release() only cancels a job once no session uses it. At
+    most max_finished finished jobs are kept.
+    """
+
+    def __init__(self, max_finished=8):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._sessions = {}   # key -> ids of the sessions using the job
+        self._lock = threading.Lock()
+
+    def submit(self, key, factory, session=None):
+        """Return the job for key, starting factory() if there is none (or it was cancelled or failed)."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.status in (CANCELLED, FAILED):
+                job = factory().start()
+                self._jobs[key] = job
+            if session is not None:
+                self._sessions.setdefault(key, set()).add(session)
+            self._jobs.move_to_end(key)
+            self._evict()
+            return job
+
+    def release(self, key, session):
+        """
+        Stop using the job for key from session. Cancels the job if it is
+        still running and no other session uses it; returns True if it did.
+        """
+        with self._lock:
+            sessions = self._sessions.get(key, set())
+            sessions.discard(session)
+            if sessions:
+                return False
+            self._sessions.pop(key, None)
+            job = self._jobs.get(key)
+        if job is not None and not job.finished_running:
+            job.cancel()
+            return True
+        return False
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, key):
+        """Cancel the job for key if it is still running."""
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is not None and not job.finished_running:
+            job.cancel()
+
+    def discard(self, key):
+        """Cancel and forget the job for key."""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+            self._sessions.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def _evict(self):
+        finished = [key for key, job in self._jobs.items() if job.finished_running]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[key]
+            self._sessions.pop(key, None)
+
+    def __len__(self):
+        return len(self._jobs)
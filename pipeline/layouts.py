@@ -0,0 +1,161 @@
+# pipeline/layouts.py
+
+import math
+
+import networkx as nx
+import numpy as np
+
+from pipeline.communities import DEFAULT_SEED, detect_communities
+from pipeline.graph_cache import LRUCache, graph_fingerprint
+from utils.tracing import traced
+
+# Above this many nodes, positions are computed here instead of by vis.js physics
+SERVER_LAYOUT_MIN_NODES = 1000
+# Below this many nodes, force layout repulsion is computed exactly
+EXACT_REPULSION_MAX_NODES = 500
+NEGATIVE_SAMPLES = 30
+NODE_SPACING = 60      # vis.js canvas units between neighbouring nodes
+LEVEL_SPACING = 150    # vertical gap between hierarchy levels
+
+_layout_cache = LRUCache(maxsize=16)
+
+def _edge_arrays(G, index):
+    """Source, target and weight arrays for the edges of G."""
+    edges = list(G.edges(data="weight", default=1))
+    src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+    weight = np.fromiter((w for _, _, w in edges), dtype=np.float64, count=len(edges))
+    return src, dst, np.log1p(weight)
+
+def _force_positions(G, nodes, seed, iterations=80):
+    """
+    Fruchterman-Reingold style layout written with NumPy array operations.
+
+    Attraction is applied along every edge at once. Repulsion is exact for
+    small graphs and estimated from a fixed number of random nodes per node
+    for large ones, so each iteration is linear in nodes plus edges.
+    """
+    n = len(nodes)
+    rng = np.random.default_rng(seed)
+    index = {node: i for i, node in enumerate(nodes)}
+    src, dst, weight = _edge_arrays(G, index)
+
+    k = 1.0  # ideal edge length
+    pos = rng.uniform(-1.0, 1.0, size=(n, 2)) * math.sqrt(n)
+    temperature = math.sqrt(n)
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        disp = np.zeros((n, 2))
+
+        # Repulsion between nodes: k^2 / distance
+        if n <= EXACT_REPULSION_MAX_NODES:
+            delta = pos[:, None, :] - pos[None, :, :]
+            dist2 = np.einsum("ijk,ijk->ij", delta, delta) + 1e-9
+            disp += np.einsum("ijk,ij->ik", delta, k * k / dist2)
+        else:
+            others = rng.integers(0, n, size=(n, NEGATIVE_SAMPLES))
+            delta = pos[:, None, :] - pos[others]
+            dist2 = np.einsum("ijk,ijk->ij", delta, delta) + 1e-9
+            scale = (n - 1) / NEGATIVE_SAMPLES
+            disp += np.einsum("ijk,ij->ik", delta, k * k / dist2) * scale
+
+        # Attraction along edges: distance^2 / k
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta)) + 1e-9
+            force = delta * (dist * weight / k)[:, None]
+            np.add.at(disp, src, -force)
+            np.add.at(disp, dst, force)
+
+        # Move each node at most `temperature` along its displacement
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp)) + 1e-9
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature = max(temperature - cooling, 0.01)
+
+    pos -= pos.mean(axis=0)
+    spread = np.abs(pos).max() or 1.0
+    return pos * (NODE_SPACING * math.sqrt(n) / spread)
+
+def _hierarchical_positions(G, nodes):
+    """
+    Layered layout of the SCC condensation of G.
+
+    Strongly connected components are collapsed so cycles do not break the
+    ordering, each component is placed on its longest-path level, and nodes
+    within a level are ordered by the mean position of their parents.
+    """
+    C = nx.condensation(G)
+    members = C.graph["mapping"]  # node -> component id
+    component_level = {}
+    for comp in nx.topological_sort(C):
+        preds = [component_level[p] for p in C.predecessors(comp)]
+        component_level[comp] = max(preds) + 1 if preds else 0
+
+    levels = {}
+    for node in nodes:
+        levels.setdefault(component_level[members[node]], []).append(node)
+
+    x_of = {}
+    pos = np.zeros((len(nodes), 2))
+    index = {node: i for i, node in enumerate(nodes)}
+    for level in sorted(levels):
+        row = levels[level]
+        # Barycenter ordering keeps children under their parents
+        def barycenter(node):
+            parents = [x_of[p] for p in G.predecessors(node) if p in x_of]
+            return sum(parents) / len(parents) if parents else 0.0
+        row.sort(key=lambda node: (barycenter(node), members[node]))
+        xs = (np.arange(len(row)) - (len(row) - 1) / 2) * NODE_SPACING
+        for node, x in zip(row, xs):
+            x_of[node] = x
+            pos[index[node]] = (x, level * LEVEL_SPACING)
+    return pos
+
+def _circular_positions(G, nodes, seed):
+    """Nodes on one circle, grouped by community so clusters stay together."""
+    try:
+        communities = detect_communities(G, seed=seed)
+        order = {node: i for i, comm in enumerate(communities) for node in comm}
+        nodes = sorted(nodes, key=lambda node: order.get(node, len(communities)))
+    except Exception as e:
+        print(f"Community ordering failed: {e}")
+    n = len(nodes)
+    angles = 2 * np.pi * np.arange(n) / max(n, 1)
+    radius = max(n * NODE_SPACING / (2 * np.pi), NODE_SPACING)
+    return nodes, np.column_stack((radius * np.cos(angles), radius * np.sin(angles)))
+
+@traced("graph.layout")
+def compute_layout(G, layout_type="force", seed=DEFAULT_SEED, use_cache=True):
+    """
+    Compute fixed node positions for G in vis.js canvas coordinates.
+
+    layout_type is one of the options from get_layout_options(). Results are
+    cached per graph fingerprint and layout type.
+    Returns {node: (x, y)}.
+    """
+    if not G.number_of_nodes():
+        return {}
+
+    key = (graph_fingerprint(G), layout_type, seed) if use_cache else None
+    if key is not None:
+        cached = _layout_cache.get(key)
+        if cached is not None:
+            return cached
+
+    nodes = list(G.nodes)
+    if layout_type == "hierarchical":
+        pos = _hierarchical_positions(G, nodes)
+    elif layout_type == "circular":
+        nodes, pos = _circular_positions(G, nodes, seed)
+    else:  # force and spring
+        pos = _force_positions(G, nodes, seed)
+
+    positions = {node: (float(x), float(y)) for node, (x, y) in zip(nodes, pos)}
+    if key is not None:
+        _layout_cache.put(key, positions)
+    return positions
+
+def use_server_layout(G):
+    """Whether G is large enough that the browser should not run physics."""
+    return G.number_of_nodes() >= SERVER_LAYOUT_MIN_NODES
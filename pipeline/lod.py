@@ -0,0 +1,308 @@
+# pipeline/lod.py
+
+import heapq
+import json
+import math
+from collections import Counter
+
+import networkx as nx
+
+from pipeline.analytics import get_analytics
+from pipeline.concept_graph import (
+    EDGE_LEGEND_HTML,
+    fast_add_edge,
+    fast_add_node,
+    get_community_palette,
+    get_physics_config,
+    get_relation_color,
+    use_shared_template,
+)
+from pipeline.graph_cache import LRUCache, graph_fingerprint
+from pipeline.layouts import compute_layout, use_server_layout
+from utils.tracing import traced
+
+# Graphs at least this large open in cluster overview when detail level is "auto"
+LOD_MIN_NODES = 500
+CLUSTER_PREFIX = "cluster:"
+# Members and edges a cluster expands to (the most central members and the
+# heaviest edges), and bytes of cluster payloads embedded in one page, so
+# the page size does not grow with the graph
+LOD_MAX_MEMBERS = 300
+LOD_MAX_EDGES = 1200
+LOD_EMBED_BUDGET = 2 * 1024 * 1024
+
+_lod_cache = LRUCache(maxsize=8)
+
+def build_cluster_graph(G, communities):
+    """
+    Collapse each community of G into one super-node.
+
+    Super-nodes carry ``members`` and ``size``; edges between them carry the
+    summed ``weight`` of the concept edges they stand for and the most common
+    relation as ``label``.
+    """
+    C = nx.DiGraph()
+    cluster_of = {}
+    for idx, comm in enumerate(communities):
+        # Name the cluster after its best connected concepts
+        members = sorted(comm, key=lambda n: (-G.degree(n), str(n)))
+        C.add_node(idx, members=members, size=len(members))
+        for node in members:
+            cluster_of[node] = idx
+
+    weights = Counter()
+    labels = {}
+    for u, v, data in G.edges(data=True):
+        cu, cv = cluster_of[u], cluster_of[v]
+        if cu == cv:
+            continue
+        weights[(cu, cv)] += data.get("weight", 1)
+        labels.setdefault((cu, cv), Counter())[data.get("label", "")] += data.get("weight", 1)
+    C.add_edges_from(
+        (cu, cv, {"weight": w, "label": labels[(cu, cv)].most_common(1)[0][0]})
+        for (cu, cv), w in weights.items()
+    )
+    C.graph["cluster_of"] = cluster_of
+    return C
+
+def _edge_style(data):
+    label = data.get("label", "")
+    weight = data.get("weight", 1)
+    return {
+        "label": label,
+        "title": label,
+        "width": 2 + min(weight, 8),
+        "color": get_relation_color(label),
+        "arrows": "to",
+    }
+
+def cluster_payload(G, cid, max_members=LOD_MAX_MEMBERS, max_edges=LOD_MAX_EDGES):
+    """
+    What the browser adds when cluster cid is expanded: its most central
+    max_members members, the edges among them and the edges from them to
+    other clusters (the heaviest max_edges in all), plus the cluster's full
+    member count as "total". Returns None if G has no community cid.
+    """
+    analytics = get_analytics(G)
+    communities = analytics.communities
+    if not 0 <= cid < len(communities):
+        return None
+    node_community = analytics.node_community
+    centrality = analytics.centrality
+    palette = get_community_palette()
+    members = sorted(communities[cid], key=lambda n: (-centrality.get(n, 0), str(n)))
+    shown = members[:max_members]
+    shown_set = set(shown)
+
+    inner = []
+    cross = []
+    outgoing = G.out_edges(shown, data=True) if G.is_directed() else G.edges(shown, data=True)
+    for u, v, data in outgoing:
+        other = node_community[v]
+        if other != cid:
+            cross.append((u, v, data, other, True))
+        elif v in shown_set:
+            inner.append((u, v, data))
+    if G.is_directed():
+        for u, v, data in G.in_edges(shown, data=True):
+            other = node_community[u]
+            if other != cid:
+                cross.append((v, u, data, other, False))
+    if len(inner) + len(cross) > max_edges:
+        weight = lambda edge: edge[2].get("weight", 1)
+        inner = heapq.nlargest(min(len(inner), max_edges), inner, key=weight)
+        cross = heapq.nlargest(max_edges - len(inner), cross, key=weight)
+
+    return {
+        "nodes": [
+            {
+                "id": node,
+                "label": node,
+                "title": node,
+                "color": palette[cid % len(palette)],
+                "size": 15 + 25 * centrality.get(node, 0),
+                "shape": "dot",
+                "font": {"color": "white"},
+            }
+            for node in shown
+        ],
+        "edges": [dict(_edge_style(data), **{"from": u, "to": v}) for u, v, data in inner],
+        "cross": [
+            {"member": member, "other": node, "cluster": other, "outgoing": out, "style": _edge_style(data)}
+            for member, node, data, other, out in cross
+        ],
+        "total": len(members),
+    }
+
+def _payload_blob(cid, payload):
+    """A cluster payload as an inert JSON script element, parsed only when the cluster is expanded."""
+    data = json.dumps(payload).replace("</", "<\\/")
+    return f'<script type="application/json" id="lod-cluster-{cid}">{data}</script>\n'
+
+_EXPAND_SCRIPT = """
+<script type="text/javascript">
+var LOD_URL = %(url)s;
+var LOD_EXPANDED = {};
+function lodLoad(cid, done) {
+  var blob = document.getElementById("lod-cluster-" + cid);
+  if (blob) return done(JSON.parse(blob.textContent));
+  fetch(LOD_URL + cid).then(function (r) { return r.json(); }).then(done);
+}
+function lodExpand(cid) {
+  if (LOD_EXPANDED[cid]) return;
+  if (!LOD_URL && !document.getElementById("lod-cluster-" + cid)) return;
+  LOD_EXPANDED[cid] = true;
+  lodLoad(cid, function (payload) {
+    var sid = "%(prefix)s" + cid;
+    var center = network.getPositions([sid])[sid] || {x: 0, y: 0};
+    edges.remove(network.getConnectedEdges(sid));
+    nodes.remove(sid);
+    var count = payload.nodes.length;
+    var radius = 30 + 20 * Math.sqrt(count);
+    payload.nodes.forEach(function (node, i) {
+      var angle = 2 * Math.PI * i / count;
+      node.x = center.x + radius * Math.cos(angle);
+      node.y = center.y + radius * Math.sin(angle);
+    });
+    nodes.add(payload.nodes);
+    edges.add(payload.edges);
+    payload.cross.forEach(function (e) {
+      var other = "%(prefix)s" + e.cluster;
+      if (LOD_EXPANDED[e.cluster]) {
+        // Members left out of an expanded cluster, or not loaded yet, get no edge
+        if (!nodes.get(e.other)) return;
+        other = e.other;
+      }
+      var edge = Object.assign({}, e.style);
+      edge.from = e.outgoing ? e.member : other;
+      edge.to = e.outgoing ? other : e.member;
+      edges.add(edge);
+    });
+  });
+}
+network.on("click", function (params) {
+  if (params.nodes.length !== 1) return;
+  var id = String(params.nodes[0]);
+  if (id.indexOf("%(prefix)s") === 0) lodExpand(id.slice(%(prefix_len)d));
+});
+</script>
+"""
+
+@traced("render.lod")
+def render_lod_html(G, layout_type="force", use_cache=True, cluster_url=None):
+    """
+    Render a level-of-detail concept map as an HTML string.
+
+    The page initially shows one super-node per community, sized by member
+    count and linked by aggregated inter-community edges. Clicking a
+    super-node replaces it with its members (see cluster_payload), so the
+    browser only lays out what has been expanded.
+
+    With cluster_url, the page fetches cluster_url + <cluster id> on
+    expand and embeds no members at all. Otherwise each cluster's payload
+    is embedded as a JSON blob that is parsed only on expand, largest
+    clusters first while they fit in LOD_EMBED_BUDGET bytes; clusters past
+    the budget cannot be expanded. Either way the page grows with the
+    number of clusters, not with the graph. Results are memoized by graph
+    fingerprint, layout and cluster_url.
+    """
+    if not G.nodes():
+        print("Warning: No nodes in graph to visualize")
+        return ""
+
+    key = (graph_fingerprint(G), layout_type, cluster_url) if use_cache else None
+    if key is not None:
+        html = _lod_cache.get(key)
+        if html is not None:
+            return html
+
+    analytics = get_analytics(G)
+    communities = analytics.communities
+    C = build_cluster_graph(G, communities)
+    palette = get_community_palette()
+    colors = {idx: palette[idx % len(palette)] for idx in C.nodes}
+
+    from pyvis.network import Network  # Imported on first render; it is slow to import
+    net = Network(height="600px", width="100%", bgcolor="#222222", font_color="white")
+    use_shared_template(net)
+
+    # Clusters are largest first, so the embedding budget goes to the biggest ones
+    blobs = {}
+    budget = 0 if cluster_url else LOD_EMBED_BUDGET
+    for idx in C.nodes:
+        if budget <= 0:
+            break
+        blob = _payload_blob(idx, cluster_payload(G, idx))
+        if len(blob) <= budget:
+            blobs[idx] = blob
+            budget -= len(blob)
+
+    # The cluster graph itself may be large enough to need fixed positions
+    positions = compute_layout(C, layout_type) if use_server_layout(C) else {}
+    largest = max(C.nodes[idx]["size"] for idx in C.nodes)
+    for idx in C.nodes:
+        members = C.nodes[idx]["members"]
+        size = len(members)
+        label = ", ".join(members[:2]) + (f" +{size - 2}" if size > 2 else "")
+        if not cluster_url and idx not in blobs:
+            hint = "too large to expand here"
+        elif size > LOD_MAX_MEMBERS:
+            hint = f"click to expand the {LOD_MAX_MEMBERS} most central"
+        else:
+            hint = "click to expand"
+        title = f"{size} concepts: " + ", ".join(members[:10]) + (" ..." if size > 10 else "") + f" ({hint})"
+        options = dict(
+            label=label,
+            title=title,
+            color=colors[idx],
+            size=15 + 45 * math.sqrt(size / largest),
+        )
+        if idx in positions:
+            options.update(x=positions[idx][0], y=positions[idx][1], physics=False)
+        fast_add_node(net, f"{CLUSTER_PREFIX}{idx}", **options)
+
+    for cu, cv, data in C.edges(data=True):
+        weight = data["weight"]
+        fast_add_edge(
+            net, f"{CLUSTER_PREFIX}{cu}", f"{CLUSTER_PREFIX}{cv}",
+            title=f"{weight} connections (mostly '{data['label']}')",
+            width=1 + math.log2(1 + weight),
+            color=get_relation_color(data["label"]),
+            arrows="to",
+        )
+
+    net.set_options(get_physics_config(layout_type, precomputed=bool(positions)))
+    html = net.generate_html(notebook=False)
+
+    script = "".join(blobs.values()) + _EXPAND_SCRIPT % {
+        "url": json.dumps(cluster_url).replace("</", "<\\/"),
+        "prefix": CLUSTER_PREFIX,
+        "prefix_len": len(CLUSTER_PREFIX),
+    }
+
+    legend_html = f'''
+    <div style="position:fixed;top:20px;right:20px;z-index:1000;background:#222;color:#fff;padding:12px 18px;border-radius:8px;max-width:300px;font-size:13px;box-shadow:0 2px 8px #0007;max-height:80vh;overflow-y:auto;">
+      <b>Cluster overview</b><br>
+      {len(communities)} clusters of {G.number_of_nodes()} concepts<br>
+      <span style="font-size:11px;color:#aaa;">Node size = number of concepts in the cluster<br>
+      Click a cluster to expand its concepts</span>
+      {EDGE_LEGEND_HTML}
+    </div>
+    '''
+    html = html.replace('<body>', '<body>' + legend_html, 1)
+    html = html.replace('</body>', script + '</body>', 1)
+
+    if key is not None:
+        _lod_cache.put(key, html)
+    return html
+
+def use_level_of_detail(G, detail_level="auto"):
+    """
+    Whether to render G as a cluster overview.
+    detail_level is "auto", "clusters" or "all".
+    """
+    if detail_level == "clusters":
+        return True
+    if detail_level == "all":
+        return False
+    return G.number_of_nodes() >= LOD_MIN_NODES
@@ -0,0 +1,91 @@
+# pipeline/mermaid.py
+
+import heapq
+from collections import deque
+
+import networkx as nx
+
+from pipeline.analytics import get_analytics
+
+DEFAULT_MAX_NODES = 30
+DEFAULT_MAX_EDGES = 60
+
+def sanitize_label(text):
+    """Make text safe inside a quoted Mermaid label."""
+    text = " ".join(str(text).split())
+    return text.replace('"', "#quot;")
+
+def learning_path_skeleton(G, max_nodes=DEFAULT_MAX_NODES, max_edges=DEFAULT_MAX_EDGES):
+    """
+    Reduce G to a small prerequisite DAG suitable for a diagram.
+
+    1. Strongly connected components are condensed, so cycles become one step.
+    2. The max_nodes most important components (summed degree centrality)
+       are kept.
+    3. Kept components are linked if one reaches the other in the condensation
+       without passing through another kept component; one bounded search per
+       kept component, so the cost is O(max_nodes * (V + E)).
+    4. Transitive reduction removes shortcut edges, and the heaviest
+       max_edges edges are kept.
+
+    Returns (steps, edges): steps is a list of (step id, member names) in
+    prerequisite order and edges a list of (step id, step id) pairs.
+    """
+    analytics = get_analytics(G)
+    C = analytics.condensation
+    centrality = analytics.centrality
+
+    importance = {
+        comp: sum(centrality.get(n, 0) for n in C.nodes[comp]["members"])
+        for comp in C.nodes
+    }
+    kept = set(heapq.nlargest(max_nodes, C.nodes, key=lambda c: (importance[c], -c)))
+
+    # Edge weight between components, from the weights of the concept edges
+    mapping = C.graph["mapping"]
+    direct_weight = {}
+    for u, v, weight in G.edges(data="weight", default=1):
+        cu, cv = mapping[u], mapping[v]
+        if cu != cv and cu in kept and cv in kept:
+            direct_weight[(cu, cv)] = direct_weight.get((cu, cv), 0) + weight
+
+    H = nx.DiGraph()
+    H.add_nodes_from(kept)
+    for source in kept:
+        queue = deque(C.successors(source))
+        visited = set(queue)
+        while queue:
+            comp = queue.popleft()
+            if comp in kept:
+                H.add_edge(source, comp, weight=direct_weight.get((source, comp), 0))
+                continue  # Do not look past another kept step
+            for succ in C.successors(comp):
+                if succ not in visited:
+                    visited.add(succ)
+                    queue.append(succ)
+
+    reduced = nx.transitive_reduction(H)
+    edges = sorted(
+        reduced.edges(),
+        key=lambda e: (-H.edges[e]["weight"], -(importance[e[0]] + importance[e[1]]), e),
+    )[:max_edges]
+
+    rank = {comp: i for i, comp in enumerate(nx.topological_sort(C))}
+    steps = [
+        (comp, sorted(C.nodes[comp]["members"], key=lambda n: (-centrality.get(n, 0), str(n))))
+        for comp in sorted(kept, key=rank.get)
+    ]
+    return steps, edges
+
+def skeleton_to_mermaid(steps, edges):
+    """Render a learning path skeleton as a Mermaid flowchart."""
+    ids = {comp: f"n{i}" for i, (comp, _) in enumerate(steps)}
+    lines = ["flowchart TD"]
+    for comp, members in steps:
+        label = sanitize_label(members[0])
+        if len(members) > 1:
+            label += f" (+{len(members) - 1})"
+        lines.append(f'  {ids[comp]}["{label}"]')
+    for u, v in edges:
+        lines.append(f"  {ids[u]} --> {ids[v]}")
+    return "\n".join(lines)
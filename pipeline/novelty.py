@@ -0,0 +1,240 @@
+# pipeline/novelty.py
+
+import heapq
+import math
+import re
+from array import array
+from collections import deque
+
+from config import get_profile
+from pipeline.triplet_store import normalize_term
+from utils.triplets import as_triplet
+from utils.tracing import span
+
+# Document size categories (utils.preprocess.estimate_document_size) extracted adaptively
+ADAPTIVE_SIZES = frozenset({"very_large"})
+# Chunks whose novelty is averaged into the current rate
+NOVELTY_WINDOW = 6
+# Never stop before this many chunks, nor before this share of the document
+MIN_CHUNKS = 8
+MIN_SHARE = 0.2
+
+_TERM_RE = re.compile(r"[A-Za-z][A-Za-z-]{3,}")
+_STOPWORDS = frozenset(
+    "that this these those with from into onto over under than then they them their there here which "
+    "while where when what whom whose also such could might must shall should would have been being "
+    "were your other more most some only very each both about after before between through during".split()
+)
+
+def chunk_terms(chunks):
+    """
+    Distinct content words of every chunk, as sorted arrays of term ids,
+    and the number of distinct terms in the document.
+    """
+    ids = {}
+    terms = []
+    for chunk in chunks:
+        chunk_ids = {
+            ids.setdefault(word, len(ids))
+            for word in (match.lower() for match in _TERM_RE.findall(chunk))
+            if word not in _STOPWORDS
+        }
+        terms.append(array("I", sorted(chunk_ids)))
+    return terms, len(ids)
+
+def coverage_order(terms, vocabulary):
+    """
+    Chunk indices ordered so that each chunk adds as many terms not covered
+    by the chunks before it as possible (greedy maximum coverage, earlier
+    chunks first on ties). Gains only shrink as terms get covered, so a
+    chunk's gain is recomputed only when it reaches the top of the heap.
+    """
+    covered = bytearray(vocabulary)
+    heap = [(-len(chunk), i) for i, chunk in enumerate(terms)]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        _, i = heapq.heappop(heap)
+        gain = sum(1 for term in terms[i] if not covered[term])
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, i))
+            continue
+        order.append(i)
+        for term in terms[i]:
+            covered[term] = 1
+    return order
+
+class NoveltyTracker:
+    """
+    How much each processed chunk adds to the concept map.
+
+    A chunk's novelty is the share of its distinct concepts (nodes) and
+    concept pairs (edges) that no earlier chunk produced; rate is the mean
+    over the last window chunks. A chunk without triplets counts as adding
+    nothing.
+    """
+
+    def __init__(self, window=NOVELTY_WINDOW):
+        self._concept_chunks = {}   # concept -> number of chunks it was found in
+        self._edges = set()
+        self._recent = deque(maxlen=window)
+        self.chunks = 0
+
+    def update(self, triplets):
+        """Record one chunk's triplets. Returns the chunk's novelty (0 to 1)."""
+        concepts = set()
+        edges = set()
+        for triplet in triplets:
+            triplet = as_triplet(triplet)
+            subject = normalize_term(triplet.subject).lower()
+            obj = normalize_term(triplet.object).lower()
+            if subject and obj and subject != obj:
+                concepts.update((subject, obj))
+                edges.add((subject, obj))
+        new = sum(1 for concept in concepts if concept not in self._concept_chunks)
+        new += len(edges - self._edges)
+        for concept in concepts:
+            self._concept_chunks[concept] = self._concept_chunks.get(concept, 0) + 1
+        self._edges |= edges
+
+        novelty = new / (len(concepts) + len(edges)) if concepts else 0.0
+        self._recent.append(novelty)
+        self.chunks += 1
+        return novelty
+
+    @property
+    def rate(self):
+        return sum(self._recent) / len(self._recent) if self._recent else 1.0
+
+    @property
+    def concepts(self):
+        return len(self._concept_chunks)
+
+    @property
+    def edges(self):
+        return len(self._edges)
+
+    def coverage(self):
+        """
+        Good-Turing estimate of the share of concept mentions the concepts
+        found so far account for: 1 - (concepts seen in only one chunk) /
+        (concept-chunk observations). Chunks are not processed in document
+        order, so this is an estimate, not a bound.
+        """
+        observations = sum(self._concept_chunks.values())
+        if not observations:
+            return 0.0
+        singletons = sum(1 for count in self._concept_chunks.values() if count == 1)
+        return 1.0 - singletons / observations
+
+class NoveltyPlan:
+    """
+    Adaptive chunk order and stopping rule for relation extraction.
+
+    Iterating yields chunk indices in coverage order (coverage_order); the
+    triplets of each yielded chunk must be passed to record() in the same
+    order. Once the novelty rate drops below threshold (after min_chunks),
+    mode "stop" skips every remaining chunk and mode "sample" extracts only
+    every sample_every-th one. Sampled chunks keep updating the rate, so a
+    part of the document that brings new concepts switches extraction back
+    to every chunk.
+
+    The order is consulted lazily, so it can be passed as the order of
+    iter_relations_batch; with concurrent extraction, up to the concurrency
+    chunks are already in flight when the rate is checked.
+    """
+
+    def __init__(self, chunks, mode="sample", threshold=0.1, sample_every=4, min_chunks=None):
+        if mode not in ("stop", "sample"):
+            raise ValueError(f"Unknown novelty mode: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.sample_every = max(1, sample_every)
+        self.chunks_total = len(chunks)
+        self.min_chunks = min_chunks or max(MIN_CHUNKS, math.ceil(len(chunks) * MIN_SHARE))
+        with span("novelty.plan", chunks=len(chunks)):
+            self._terms, self._vocabulary = chunk_terms(chunks)
+            self.order = coverage_order(self._terms, self._vocabulary)
+        self.reset()
+
+    def reset(self):
+        """Forget every recorded chunk, e.g. before extraction starts over."""
+        self.tracker = NoveltyTracker()
+        self.processed = []
+        self.saturated_after = None
+        self._covered = bytearray(self._vocabulary)
+        self._covered_count = 0
+        self._issued = deque()
+
+    @property
+    def saturated(self):
+        return self.tracker.chunks >= self.min_chunks and self.tracker.rate < self.threshold
+
+    def __iter__(self):
+        skipped = 0
+        for index in self.order:
+            if self.saturated:
+                if self.saturated_after is None:
+                    self.saturated_after = self.tracker.chunks
+                    print(f"Novelty below {self.threshold:.0%} after {self.tracker.chunks} chunks; "
+                          f"{'stopping' if self.mode == 'stop' else 'sampling the rest'}")
+                if self.mode == "stop":
+                    return
+                skipped += 1
+                if skipped % self.sample_every:
+                    continue
+            self._issued.append(index)
+            yield index
+
+    def record(self, triplets, index=None):
+        """
+        Triplets of the oldest yielded chunk not recorded yet, or of chunk
+        index when extraction did not follow the plan. Returns the novelty.
+        """
+        if index is None:
+            index = self._issued.popleft()
+        self.processed.append(index)
+        for term in self._terms[index]:
+            if not self._covered[term]:
+                self._covered[term] = 1
+                self._covered_count += 1
+        return self.tracker.update(triplets)
+
+    def scaled_min_count(self, min_count):
+        """
+        A triplet repeat threshold (TripletAggregator.min_count) scaled by
+        the share of chunks processed, since skipped chunks would have
+        repeated some of the triplets that were only seen once.
+        """
+        share = len(self.processed) / self.chunks_total if self.chunks_total else 1.0
+        return max(1, round(min_count * share))
+
+    def report(self):
+        """What adaptive extraction did, as a plain dict."""
+        processed = len(self.processed)
+        return {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "chunks_total": self.chunks_total,
+            "chunks_processed": processed,
+            "calls_saved": self.chunks_total - processed,
+            "saturated_after": self.saturated_after,
+            "novelty_rate": round(self.tracker.rate, 4),
+            "concepts": self.tracker.concepts,
+            "edges": self.tracker.edges,
+            # Share of the document's content words that occur in processed chunks
+            "term_coverage": round(self._covered_count / self._vocabulary, 4) if self._vocabulary else 1.0,
+            "concept_coverage": round(self.tracker.coverage(), 4),
+        }
+
+def adaptive_plan(chunks, doc_size, profile=None):
+    """
+    A NoveltyPlan for the chunks when the profile (default: the active
+    one) extracts documents of doc_size adaptively, else None.
+    """
+    profile = get_profile(profile)
+    mode = profile["novelty_mode"]
+    if mode == "off" or doc_size not in ADAPTIVE_SIZES or len(chunks) <= MIN_CHUNKS:
+        return None
+    return NoveltyPlan(chunks, mode, threshold=profile["novelty_threshold"],
+                       sample_every=profile["novelty_sample_every"])
@@ -0,0 +1,250 @@
+# pipeline/persistence.py
+
+import json
+import os
+import struct
+import sys
+from array import array
+
+import networkx as nx
+
+from pipeline.analytics import get_analytics
+from utils.triplets import Triplet, as_triplet
+
+MAGIC = b"MSKG"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sII")  # magic, format version, metadata length
+
+# Edge and node attributes stored as typed arrays; anything else goes to "extra"
+_NODE_FIELDS = {"mentions"}
+_EDGE_FIELDS = {"weight", "label", "relations", "sources"}
+# Graph attributes that only live in memory
+_TRANSIENT_GRAPH_KEYS = {"analytics", "concept_index"}
+
+class StringTable:
+    """Interns strings into consecutive integer IDs."""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def id(self, text):
+        text = str(text)
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.strings)
+            self.strings.append(text.replace("\0", " "))
+        return string_id
+
+    def to_bytes(self):
+        return "\0".join(self.strings).encode("utf-8")
+
+def _decode_strings(blob, count):
+    if not count:
+        return []
+    return blob.decode("utf-8").split("\0")
+
+def _write(path, kind, meta, arrays, strings):
+    """
+    Write one file: fixed header, JSON metadata describing the sections,
+    then the raw bytes of the string table and each typed array.
+    """
+    blob = strings.to_bytes()
+    header = {
+        "kind": kind,
+        "byteorder": sys.byteorder,
+        "strings": [len(strings.strings), len(blob)],
+        "arrays": [[name, arr.typecode, len(arr)] for name, arr in arrays.items()],
+        "meta": meta,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(blob)
+        for arr in arrays.values():
+            arr.tofile(f)
+    os.replace(tmp_path, path)  # never leave a half-written file behind
+
+def _read(path, kind):
+    """Read a file written by _write. Returns (meta, arrays, strings)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, header_len = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a MindSketch data file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"{path} uses format version {version}; this version reads up to {FORMAT_VERSION}")
+
+    view = memoryview(data)
+    offset = _HEADER.size
+    header = json.loads(bytes(view[offset:offset + header_len]))
+    offset += header_len
+    if header["kind"] != kind:
+        raise ValueError(f"{path} holds {header['kind']} data, expected {kind}")
+
+    count, blob_len = header["strings"]
+    strings = _decode_strings(bytes(view[offset:offset + blob_len]), count)
+    offset += blob_len
+
+    swap = header["byteorder"] != sys.byteorder
+    arrays = {}
+    for name, typecode, length in header["arrays"]:
+        arr = array(typecode)
+        size = arr.itemsize * length
+        arr.frombytes(view[offset:offset + size])
+        if swap:
+            arr.byteswap()
+        arrays[name] = arr
+        offset += size
+    return header["meta"], arrays, strings
+
+def save_triplets(triplets, path):
+    """
+    Save Triplets (or plain 3-tuples) in the compact binary format, with
+    their counts and source chunks.
+    """
+    strings = StringTable()
+    arrays = {
+        "subject": array("I"), "relation": array("I"), "object": array("I"),
+        "chunk_id": array("i"), "confidence": array("f"),
+        "count": array("I"),
+        # Source chunks as offset-indexed runs
+        "source_offsets": array("I", [0]), "source": array("i"),
+    }
+    for triplet in triplets:
+        triplet = as_triplet(triplet)
+        arrays["subject"].append(strings.id(triplet.subject))
+        arrays["relation"].append(strings.id(triplet.relation))
+        arrays["object"].append(strings.id(triplet.object))
+        arrays["chunk_id"].append(-1 if triplet.chunk_id is None else triplet.chunk_id)
+        arrays["confidence"].append(triplet.confidence)
+        arrays["count"].append(triplet.count)
+        arrays["source"].extend(triplet.sources)
+        arrays["source_offsets"].append(len(arrays["source"]))
+    _write(path, "triplets", {}, arrays, strings)
+
+def load_triplets(path):
+    """Load a list of Triplets saved with save_triplets."""
+    _, arrays, strings = _read(path, "triplets")
+    total = len(arrays["subject"])
+    # Files written before counts were stored hold one occurrence per entry
+    counts = arrays.get("count", [1] * total)
+    src_off = arrays.get("source_offsets", [0] * (total + 1))
+    sources = arrays.get("source", array("i"))
+    return [
+        Triplet(strings[s], strings[r], strings[o], None if c < 0 else c, f, n,
+                tuple(sources[src_off[i]:src_off[i + 1]]))
+        for i, (s, r, o, c, f, n) in enumerate(zip(
+            arrays["subject"], arrays["relation"], arrays["object"],
+            arrays["chunk_id"], arrays["confidence"], counts,
+        ))
+    ]
+
+def save_graph(G, path, include_analytics=True):
+    """
+    Save a graph from build_graph, with its edge weights, relation counts,
+    sources and any analytics already computed, in the compact binary format.
+    """
+    strings = StringTable()
+    nodes = list(G.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    arrays = {
+        "node": array("I", (strings.id(n) for n in nodes)),
+        "node_mentions": array("I", (G.nodes[n].get("mentions", 0) for n in nodes)),
+        "edge_src": array("I"), "edge_dst": array("I"),
+        "edge_weight": array("d"), "edge_label": array("I"),
+        # Relation histograms and chunk sources as offset-indexed runs
+        "relation_offsets": array("I", [0]), "relation_label": array("I"), "relation_count": array("I"),
+        "source_offsets": array("I", [0]), "source": array("i"),
+    }
+    extra_nodes = {
+        i: {k: v for k, v in G.nodes[n].items() if k not in _NODE_FIELDS}
+        for i, n in enumerate(nodes)
+    }
+    extra_edges = {}
+    for e, (u, v, data) in enumerate(G.edges(data=True)):
+        arrays["edge_src"].append(index[u])
+        arrays["edge_dst"].append(index[v])
+        arrays["edge_weight"].append(data.get("weight", 1))
+        arrays["edge_label"].append(strings.id(data.get("label", "")))
+        for label, count in data.get("relations", {}).items():
+            arrays["relation_label"].append(strings.id(label))
+            arrays["relation_count"].append(count)
+        arrays["relation_offsets"].append(len(arrays["relation_label"]))
+        extra = {k: v for k, v in data.items() if k not in _EDGE_FIELDS}
+        sources = data.get("sources", ())
+        if all(isinstance(source, int) for source in sources):
+            arrays["source"].extend(sources)
+        else:
+            # e.g. a corpus graph's [doc_id, chunk id] pairs
+            extra["sources"] = list(sources)
+        arrays["source_offsets"].append(len(arrays["source"]))
+        if extra:
+            extra_edges[e] = extra
+
+    analytics = G.graph.get("analytics")
+    if include_analytics and analytics is not None and analytics.G is G:
+        centrality = analytics.peek("centrality")
+        if centrality is not None:
+            arrays["centrality"] = array("d", (centrality.get(n, 0.0) for n in nodes))
+        if analytics.peek("communities") is not None:
+            community = analytics.node_community
+            arrays["community"] = array("i", (community.get(n, -1) for n in nodes))
+
+    meta = {
+        "directed": G.is_directed(),
+        "graph": {k: v for k, v in G.graph.items() if k not in _TRANSIENT_GRAPH_KEYS},
+        "extra_nodes": {i: d for i, d in extra_nodes.items() if d},
+        "extra_edges": extra_edges,
+    }
+    _write(path, "graph", meta, arrays, strings)
+
+def load_graph(path):
+    """
+    Load a graph saved with save_graph. Saved analytics are restored
+    into the graph's analytics memo so they are not recomputed.
+    """
+    meta, arrays, strings = _read(path, "graph")
+    G = nx.DiGraph() if meta["directed"] else nx.Graph()
+    G.graph.update(meta["graph"])
+
+    nodes = [strings[i] for i in arrays["node"]]
+    extra_nodes = meta["extra_nodes"]
+    G.add_nodes_from(
+        (node, dict(extra_nodes.get(str(i), {}), mentions=mentions))
+        for i, (node, mentions) in enumerate(zip(nodes, arrays["node_mentions"]))
+    )
+
+    rel_off, rel_label, rel_count = arrays["relation_offsets"], arrays["relation_label"], arrays["relation_count"]
+    src_off, sources = arrays["source_offsets"], arrays["source"]
+    extra_edges = meta["extra_edges"]
+
+    def edge_rows():
+        for e, (s, d, w, label) in enumerate(zip(
+                arrays["edge_src"], arrays["edge_dst"], arrays["edge_weight"], arrays["edge_label"])):
+            data = {
+                "weight": int(w) if w.is_integer() else w,
+                "label": strings[label],
+                "relations": {
+                    strings[rel_label[k]]: rel_count[k] for k in range(rel_off[e], rel_off[e + 1])
+                },
+                "sources": sources[src_off[e]:src_off[e + 1]].tolist(),
+            }
+            data.update(extra_edges.get(str(e), {}))
+            yield nodes[s], nodes[d], data
+
+    G.add_edges_from(edge_rows())
+
+    analytics = get_analytics(G)
+    if "centrality" in arrays:
+        analytics.prime("centrality", dict(zip(nodes, arrays["centrality"])))
+    if "community" in arrays:
+        communities = {}
+        for node, idx in zip(nodes, arrays["community"]):
+            if idx >= 0:
+                communities.setdefault(idx, set()).add(node)
+        analytics.prime("communities", [frozenset(communities[idx]) for idx in sorted(communities)])
+    return G
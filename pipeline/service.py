@@ -0,0 +1,329 @@
+# pipeline/service.py
+
+import json
+import queue
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import get_profile
+from pipeline import stages
+from pipeline.jobs import DONE, PENDING, PipelineJob
+from utils.groq_utils import llm_available
+from utils.tracing import tracing
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+DEFAULT_WORKERS = None  # the profile's service_workers
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+MAX_JOBS = 256
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]{32})(?:/(triplets|graph|html|trace|clusters/\d+))?/?$")
+
+class ServiceBusy(Exception):
+    """Raised by PipelineService.submit when max_jobs jobs are already queued or running."""
+
+class LocalQueue:
+    """
+    In-process job queue, the default backend. Anything with the same
+    put/get methods (e.g. a wrapper around an external broker) can be
+    passed to PipelineService instead.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put(self, job_id):
+        self._queue.put(job_id)
+
+    def get(self, timeout=None):
+        """Next job id, or None after timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        return self._queue.qsize()
+
+class PipelineService:
+    """
+    Accepts PDFs, queues them and runs them on a pool of worker threads.
+
+    Each job is a PipelineJob run synchronously by one worker; most of a
+    job's time is spent waiting on LLM calls, so throughput grows with the
+    number of workers. Finished graphs and HTML are built on first request
+    and kept with the job, under a lock of that job only. At most max_jobs
+    jobs are queued or running at once (submit raises ServiceBusy beyond
+    that), and the oldest finished jobs are forgotten once more than
+    max_jobs are remembered. Every job
+    runs under the service's profile (default: MINDSKETCH_PROFILE), and is
+    traced when trace is set.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, use_llm=None, job_queue=None, max_jobs=MAX_JOBS, profile=None,
+                 trace=False):
+        self.profile = get_profile(profile)
+        self.trace = trace
+        workers = workers or self.profile["service_workers"]
+        self.use_llm = llm_available() if use_llm is None else use_llm
+        self.queue = job_queue or LocalQueue()
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._artifacts = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"pipeline-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, pdf_bytes):
+        """Queue a PDF. Returns the new job; raises ServiceBusy when the queue is full."""
+        job = PipelineJob(pdf_bytes, use_llm=self.use_llm, profile=self.profile["name"], trace=self.trace)
+        with self._lock:
+            # Queued and running jobs hold their upload, so they are capped too
+            unfinished = sum(not other.finished_running for other in self._jobs.values())
+            if unfinished >= self.max_jobs:
+                raise ServiceBusy(f"{unfinished} jobs are queued or running")
+            self._jobs[job.id] = job
+            self._evict()
+        self.queue.put(job.id)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def graph(self, job):
+        """Canonicalized concept graph of a finished job, built once."""
+        artifacts = self._artifacts_for(job)
+        with artifacts["lock"], tracing(job.tracer):
+            if "graph" not in artifacts:
+                triplets, _ = stages.canonicalize_stage(job.result["triplets"])
+                artifacts["triplets"] = triplets
+                artifacts["graph"] = stages.graph_stage(triplets)
+        return artifacts["graph"]
+
+    def triplets(self, job):
+        """Canonicalized triplets once finished; the raw ones found so far before that."""
+        if job.status == DONE:
+            self.graph(job)
+            return self._artifacts_for(job)["triplets"]
+        return job.partial_triplets()
+
+    def html(self, job):
+        """Rendered concept map of a finished job, built once."""
+        from pipeline.concept_graph import render_graph_html
+        from pipeline.lod import render_lod_html, use_level_of_detail
+        G = self.graph(job)
+        artifacts = self._artifacts_for(job)
+        with artifacts["lock"], tracing(job.tracer):
+            if "html" not in artifacts:
+                # The cluster overview loads each cluster from the clusters route when it is expanded
+                artifacts["html"] = (render_lod_html(G, cluster_url=f"/jobs/{job.id}/clusters/")
+                                     if use_level_of_detail(G) else render_graph_html(G))
+        return artifacts["html"]
+
+    def cluster(self, job, cid):
+        """Expansion payload of one cluster of a finished job's concept map, or None."""
+        from pipeline.lod import cluster_payload
+        G = self.graph(job)
+        with self._artifacts_for(job)["lock"], tracing(job.tracer):
+            return cluster_payload(G, cid)
+
+    def _artifacts_for(self, job):
+        """Built results of a job, with the lock they are built under."""
+        with self._lock:
+            artifacts = self._artifacts.get(job.id)
+            if artifacts is None:
+                artifacts = self._artifacts[job.id] = {"lock": threading.Lock()}
+            return artifacts
+
+    def health(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": len(self._workers),
+            "queued": sum(job.status == PENDING for job in jobs),
+            "jobs": len(jobs),
+            "llm": self.use_llm,
+            "profile": self.profile["name"],
+        }
+
+    def shutdown(self):
+        self._stop.set()
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+
+    def _work(self):
+        while not self._stop.is_set():
+            job_id = self.queue.get(timeout=0.5)
+            if job_id is None:
+                continue
+            job = self.get(job_id)
+            if job is not None:
+                job.run()
+
+    def _evict(self):
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_running][:max(0, excess)]:
+            del self._jobs[job_id]
+            self._artifacts.pop(job_id, None)
+
+def graph_to_json(G):
+    """Node-link JSON for a concept graph."""
+    return {
+        "directed": G.is_directed(),
+        "nodes": [{"id": node, "mentions": data.get("mentions", 0)} for node, data in G.nodes(data=True)],
+        "edges": [
+            {
+                "source": u,
+                "target": v,
+                "weight": data.get("weight", 1),
+                "label": data.get("label", ""),
+                "relations": data.get("relations", {}),
+                "sources": data.get("sources", []),
+            }
+            for u, v, data in G.edges(data=True)
+        ],
+    }
+
+def _triplet_json(triplet):
+    return {
+        "subject": triplet.subject,
+        "relation": triplet.relation,
+        "object": triplet.object,
+        "chunk_id": triplet.chunk_id,
+        "confidence": triplet.confidence,
+        "count": triplet.count,
+        "sources": list(triplet.sources),
+    }
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+      POST   /jobs                  PDF bytes in the body -> 202 {"id", "status"}, 503 when busy
+      GET    /jobs/<id>             progress
+      GET    /jobs/<id>/triplets    triplets (partial while running)
+      GET    /jobs/<id>/graph       node-link graph JSON (finished jobs)
+      GET    /jobs/<id>/html        concept map page (finished jobs)
+      GET    /jobs/<id>/clusters/<n> members and edges of cluster n, fetched by the page on expand
+      GET    /jobs/<id>/trace       Chrome trace JSON (services started with tracing)
+      DELETE /jobs/<id>             cancel
+      GET    /health                worker and queue counts
+    """
+
+    service = None  # set by make_server
+    server_version = "MindSketch"
+
+    def log_message(self, format, *args):
+        pass  # Keep load tests quiet
+
+    def _send(self, status, body, content_type="application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        self._send(status, {"error": message})
+
+    def _job(self):
+        match = _JOB_PATH.match(self.path.split("?", 1)[0])
+        if not match:
+            return None, None
+        return self.service.get(match.group(1)), match.group(2)
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+            return self._error(404, "not found")
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return self._error(400, "request body must be the PDF file")
+        if length > MAX_UPLOAD_BYTES:
+            return self._error(413, "file too large")
+        pdf_bytes = self.rfile.read(length)
+        if not pdf_bytes.startswith(b"%PDF"):
+            return self._error(415, "body is not a PDF")
+        try:
+            job = self.service.submit(pdf_bytes)
+        except ServiceBusy as e:
+            return self._error(503, f"service busy: {e}")
+        self._send(202, {"id": job.id, "status": job.status, "url": f"/jobs/{job.id}"})
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0].rstrip("/") == "/health":
+            return self._send(200, self.service.health())
+        job, resource = self._job()
+        if job is None:
+            return self._error(404, "no such job")
+        if resource is None:
+            return self._send(200, job.snapshot())
+        if resource == "trace":
+            if job.tracer is None:
+                return self._error(404, "tracing is off for this service")
+            return self._send(200, job.tracer.to_chrome_trace())
+        if resource == "triplets":
+            return self._send(200, {
+                "complete": job.status == DONE,
+                "triplets": [_triplet_json(t) for t in self.service.triplets(job)],
+            })
+        if job.status != DONE:
+            return self._error(409, f"job is {job.status}")
+        try:
+            if resource == "graph":
+                return self._send(200, graph_to_json(self.service.graph(job)))
+            if resource.startswith("clusters/"):
+                payload = self.service.cluster(job, int(resource.split("/", 1)[1]))
+                if payload is None:
+                    return self._error(404, "no such cluster")
+                return self._send(200, payload)
+            return self._send(200, self.service.html(job), content_type="text/html")
+        except Exception as e:
+            return self._error(500, str(e))
+
+    def do_DELETE(self):
+        job, resource = self._job()
+        if job is None or resource is not None:
+            return self._error(404, "no such job")
+        self.service.cancel(job.id)
+        self._send(200, job.snapshot())
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None, workers=DEFAULT_WORKERS, profile=None,
+                trace=False):
+    """HTTP server bound to host:port, serving a PipelineService."""
+    service = service or PipelineService(workers=workers, profile=profile, trace=trace)
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, profile=None, trace=False):
+    """Run the HTTP service until interrupted."""
+    server = make_server(host, port, workers=workers, profile=profile, trace=trace)
+    service = server.service
+    print(f"🌐 MindSketch service on http://{host}:{port} with {service.health()['workers']} workers, "
+          f"profile '{service.profile['name']}' ({'LLM' if service.use_llm else 'fallback models'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.service.shutdown()
+        server.server_close()
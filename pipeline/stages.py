@@ -0,0 +1,181 @@
+# pipeline/stages.py
+
+import hashlib
+from contextlib import nullcontext
+
+from config import get_profile
+from utils.document import Document
+from utils.tracing import span, traced
+
+from utils.preprocess import (
+    chunk_text,
+    estimate_document_size,
+    extract_text_from_pdf,
+    get_document_stats,
+    overlap_chunks,
+)
+from models.summarizer import summarize_chunks
+from models.relations_extract import extract_relations, iter_relations_batch
+from pipeline.canonicalize import canonicalize_triplets
+from pipeline.concept_graph import build_graph
+from pipeline.triplet_store import TripletAggregator
+
+# Documents at least this long are kept as a utils.document.Document (one
+# normalized text buffer plus offsets) unless extract_stage is told otherwise
+LEAN_MIN_CHARS = 200000
+
+# Each stage is a plain function of its inputs, so callers can memoize it by
+# the upload's content hash plus the stage parameters. Bump a stage's version
+# when its output changes for the same input, so stale cache entries are not reused.
+STAGE_VERSIONS = {
+    "extract": 2,
+    "chunk": 2,
+    "summarize": 1,
+    "relations": 3,
+    "canonicalize": 1,
+    "graph": 1,
+}
+
+class StageCancelled(Exception):
+    """Raised by a stage's on_chunk callback to stop the stage."""
+
+def content_hash(data):
+    """Hex digest identifying an upload by its bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+@traced("stage.extract")
+def extract_stage(pdf, progress_callback=None, lean=None):
+    """
+    PDF (path or bytes) to (text, document stats).
+
+    With lean (by default, for documents of LEAN_MIN_CHARS or more) the text
+    is returned as a Document, so later stages share one normalized buffer
+    instead of holding the raw text, sentence lists and chunk copies.
+    """
+    raw_text = extract_text_from_pdf(pdf, progress_callback)
+    if lean is None:
+        lean = len(raw_text) >= LEAN_MIN_CHARS
+    if lean and raw_text:
+        with span("document.index", chars=len(raw_text)):
+            document = Document(raw_text)
+        del raw_text
+        return document, get_document_stats(document)
+    return raw_text, get_document_stats(raw_text)
+
+@traced("stage.chunk")
+def chunk_stage(raw_text, progress_callback=None, profile=None):
+    """
+    Raw text (or a Document) to overlapping chunks, sized by
+    estimate_document_size and scaled by the profile (default: the active
+    one). A Document gives a ChunkList of offset views, materialized one
+    chunk at a time when read. Returns (chunks, document size category).
+    """
+    profile = get_profile(profile)
+    doc_size, chunk_size, overlap = estimate_document_size(raw_text)
+    chunk_size = max(64, int(chunk_size * profile["chunk_scale"]))
+    overlap = min(overlap, profile["max_overlap"])
+    if isinstance(raw_text, Document):
+        return raw_text.chunks(chunk_size, overlap), doc_size
+    chunks = chunk_text(raw_text, max_tokens=chunk_size, progress_callback=progress_callback)
+    chunks = overlap_chunks(chunks, overlap=overlap, progress_callback=progress_callback)
+    return chunks, doc_size
+
+@traced("stage.summarize")
+def summarize_stage(chunks, on_chunk=None):
+    """
+    One summary per chunk. on_chunk(done) is called after each summary and
+    raises StageCancelled to stop the stage, as for relations_stage.
+    """
+    if on_chunk is None:
+        return summarize_chunks(chunks)
+    cancelled = []
+
+    def keep_going(done):
+        try:
+            on_chunk(done)
+        except StageCancelled as e:
+            cancelled.append(e)
+            return False
+        return True
+
+    summaries = summarize_chunks(chunks, on_chunk=keep_going)
+    if cancelled:
+        raise cancelled[0]
+    return summaries
+
+@traced("stage.relations")
+def relations_stage(chunks, use_batch=True, plan=None, aggregator=None, lock=None, on_chunk=None):
+    """
+    Extract, validate and count triplets for every chunk.
+
+    Uses batch extraction when use_batch is set (Groq available), falling
+    back to per-chunk extraction. With a pipeline.novelty.NoveltyPlan, batch
+    extraction follows the plan's order and stops or samples once chunks
+    stop adding concepts; plan.report() then says how much was skipped.
+    Returns (deduplicated triplets with counts, warnings), where warnings lists the
+    failures worth showing to the user.
+
+    Callers that follow progress (pipeline.jobs) pass the TripletAggregator
+    to fill, the lock they read it under, and on_chunk(done), called with
+    the number of chunks extracted so far (0 when extraction starts over);
+    on_chunk raises StageCancelled to stop the stage.
+    """
+    warnings = []
+    aggregator = TripletAggregator() if aggregator is None else aggregator
+    lock = nullcontext() if lock is None else lock
+    done = 0
+
+    def record(chunk_triplets, index=None):
+        nonlocal done
+        with lock:
+            aggregator.add_many(chunk_triplets)
+        if plan is not None:
+            plan.record(chunk_triplets, index=index)
+        done += 1
+        if on_chunk is not None:
+            on_chunk(done)
+
+    if use_batch:
+        try:
+            for chunk_triplets in iter_relations_batch(chunks, order=plan):
+                record(chunk_triplets)
+        except StageCancelled:
+            raise
+        except Exception as e:
+            warnings.append(f"Batch extraction failed: {e}. Trying individual extraction...")
+            with lock:
+                aggregator.clear()
+
+    if not len(aggregator):
+        # Every chunk is extracted here, so the plan only reports on them
+        if plan is not None:
+            plan.reset()
+        done = 0
+        if on_chunk is not None:
+            on_chunk(done)
+        for i, chunk in enumerate(chunks):
+            chunk_triplets = []
+            try:
+                with span("chunk.relations", chunk_id=i, chars=len(chunk)):
+                    chunk_triplets = extract_relations(chunk, chunk_id=i)
+            except Exception as e:
+                warnings.append(f"Relation extraction failed for chunk {i+1}: {e}")
+            record(chunk_triplets, index=i)
+    if plan is not None:
+        with lock:
+            aggregator.min_count = plan.scaled_min_count(aggregator.min_count)
+
+    # Triplets seen more than once (or all valid ones for sparse documents),
+    # each with its count; build_graph turns counts into edge weights
+    return aggregator.results(), warnings
+
+@traced("stage.canonicalize")
+def canonicalize_stage(triplets):
+    """Merge near-duplicate concepts. Returns (triplets, stats)."""
+    canonical, _, stats = canonicalize_triplets(triplets)
+    return canonical, stats
+
+@traced("stage.graph")
+def graph_stage(triplets):
+    """Concept graph for a list of triplets."""
+    return build_graph(triplets)
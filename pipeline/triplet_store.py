@@ -0,0 +1,165 @@
+# pipeline/triplet_store.py
+
+from array import array
+
+from utils.triplets import Triplet, as_triplet
+
+# Relations too generic to be useful as concept map edges
+GENERIC_RELATIONS = frozenset({"has", "is", "part", "of", "in", "on", "with"})
+MIN_TERM_LENGTH = 2
+
+def normalize_term(text):
+    """Strip and collapse internal whitespace."""
+    return " ".join(text.split())
+
+class TripletAggregator:
+    """
+    Streaming filter and deduplicator for extracted triplets.
+
+    Triplets can be added chunk by chunk. Every string is interned once into
+    an integer ID, each distinct triplet is stored as three IDs in compact
+    arrays, and repeats only bump a counter (and record a chunk the triplet
+    was not seen in before), so memory grows with the number of distinct
+    triplets rather than the number extracted.
+    """
+
+    def __init__(self, min_count=2, min_results=5):
+        self.min_count = min_count
+        self.min_results = min_results
+
+        self._ids = {}                # string -> id
+        self._strings = []            # id -> string
+        self._generic = bytearray()   # id -> 1 if string is a generic relation
+
+        self._index = {}              # packed (subject, relation, object) ids -> row
+        self._subjects = array("I")
+        self._relations = array("I")
+        self._objects = array("I")
+        self._counts = array("I")
+        self._chunk_ids = array("i")      # first chunk the triplet was seen in, -1 if unknown
+        self._confidences = array("f")    # highest confidence seen
+        self._more_chunks = {}            # row -> array of the other chunks it was seen in
+
+        self.seen = 0
+        self.rejected = 0
+
+    def _intern(self, text):
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._ids[text] = string_id
+            self._strings.append(text)
+            self._generic.append(text.lower() in GENERIC_RELATIONS)
+        return string_id
+
+    def add(self, triplet):
+        """
+        Validate and record one Triplet (or plain 3-tuple).
+        Returns True if the triplet was kept.
+        """
+        self.seen += 1
+        triplet = as_triplet(triplet)
+        subj, rel, obj = (normalize_term(part) if part else "" for part in triplet.key())
+        if (len(subj) < MIN_TERM_LENGTH or len(rel) < MIN_TERM_LENGTH
+                or len(obj) < MIN_TERM_LENGTH or subj == obj):
+            self.rejected += 1
+            return False
+
+        rel_id = self._intern(rel)
+        if self._generic[rel_id]:
+            self.rejected += 1
+            return False
+        subj_id = self._intern(subj)
+        obj_id = self._intern(obj)
+
+        key = (subj_id << 64) | (rel_id << 32) | obj_id
+        chunks = triplet.sources or ([] if triplet.chunk_id is None else [triplet.chunk_id])
+        row = self._index.get(key)
+        if row is None:
+            row = len(self._counts)
+            self._index[key] = row
+            self._subjects.append(subj_id)
+            self._relations.append(rel_id)
+            self._objects.append(obj_id)
+            self._counts.append(triplet.count)
+            self._chunk_ids.append(chunks[0] if chunks else -1)
+            self._confidences.append(triplet.confidence)
+            chunks = chunks[1:]
+        else:
+            self._counts[row] += triplet.count
+            if triplet.confidence > self._confidences[row]:
+                self._confidences[row] = triplet.confidence
+        for chunk_id in chunks:
+            self._add_chunk(row, chunk_id)
+        return True
+
+    def _add_chunk(self, row, chunk_id):
+        if self._chunk_ids[row] < 0:
+            self._chunk_ids[row] = chunk_id
+        elif chunk_id != self._chunk_ids[row]:
+            more = self._more_chunks.get(row)
+            if more is None:
+                self._more_chunks[row] = array("i", [chunk_id])
+            # Triplets mostly arrive chunk by chunk, so check the last chunk first
+            elif more[-1] != chunk_id and chunk_id not in more:
+                more.append(chunk_id)
+
+    def add_many(self, triplets):
+        """Record an iterable of triplets. Returns the number kept."""
+        kept = 0
+        for triplet in triplets:
+            kept += self.add(triplet)
+        return kept
+
+    def clear(self):
+        """Forget every recorded triplet, keeping the thresholds."""
+        self.__init__(self.min_count, self.min_results)
+
+    def __len__(self):
+        return len(self._counts)
+
+    def _rows(self):
+        """Rows that pass the frequency threshold, or every row if too few do."""
+        rows = [i for i, count in enumerate(self._counts) if count >= self.min_count]
+        if len(rows) < self.min_results:
+            rows = range(len(self._counts))
+        return rows
+
+    def _triplet(self, row):
+        strings = self._strings
+        chunk_id = self._chunk_ids[row]
+        sources = ()
+        if chunk_id >= 0:
+            sources = tuple(sorted((chunk_id, *self._more_chunks.get(row, ()))))
+        return Triplet(
+            strings[self._subjects[row]],
+            strings[self._relations[row]],
+            strings[self._objects[row]],
+            None if chunk_id < 0 else chunk_id,
+            self._confidences[row],
+            self._counts[row],
+            sources,
+        )
+
+    def results(self):
+        """
+        Deduplicated Triplets seen at least ``min_count`` times, in first-seen
+        order, tagged with the first chunk they came from, how often they
+        were extracted (count) and every chunk they came from (sources).
+        build_graph weights edges by count. Falls back to every valid
+        triplet when fewer than ``min_results`` pass the threshold.
+        """
+        return [self._triplet(row) for row in self._rows()]
+
+    def counts(self):
+        """Map of every distinct valid triplet to the number of times it was seen."""
+        return {self._triplet(row).key(): count for row, count in enumerate(self._counts)}
+
+    def get_stats(self):
+        """Summary of what the aggregator has seen so far."""
+        return {
+            "seen": self.seen,
+            "rejected": self.rejected,
+            "distinct": len(self._counts),
+            "strings": len(self._strings),
+        }
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+The lean (Document) and legacy (plain text) paths must size and chunk a
+document the same way, also right above a size threshold where the
+Document's whitespace-normalized text is shorter than the raw text.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline import stages
+from utils.document import Document
+from utils.preprocess import get_document_stats
+
+VERY_LARGE_CHARS = 500000
+
+def boundary_text(chars=525000):
+    """Text of chars characters whose normalized form is below VERY_LARGE_CHARS."""
+    paragraph = ("Neurons   carry   signals   along   axons   to   synapses.  "
+                 "Dendrites   receive   them   from   other   cells.\n\n\n")
+    return (paragraph * (chars // len(paragraph) + 1))[:chars]
+
+def test_size_category_matches_at_threshold():
+    text = boundary_text()
+    document = Document(text)
+    assert len(document) < VERY_LARGE_CHARS <= len(text)
+
+    legacy_chunks, legacy_size = stages.chunk_stage(text)
+    lean_chunks, lean_size = stages.chunk_stage(document)
+    assert lean_size == legacy_size == "very_large"
+    assert len(lean_chunks) == len(legacy_chunks)
+    assert get_document_stats(document)["size_category"] == get_document_stats(text)["size_category"]
+
+if __name__ == "__main__":
+    test_size_category_matches_at_threshold()
+    print("✅ Lean and legacy paths agree on document size")
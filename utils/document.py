@@ -0,0 +1,150 @@
+# utils/document.py
+
+import re
+from array import array
+from collections.abc import Sequence
+
+_SENTENCE_END = re.compile(r"(?<=[.!?]) ")
+# Normalization works on blocks of this many characters, so the temporary
+# word lists stay small however long the document is
+_NORMALIZE_BLOCK = 1 << 16
+
+def normalize_whitespace(raw_text, block=_NORMALIZE_BLOCK):
+    """Same as " ".join(raw_text.split()), without a word list for the whole text."""
+    pieces = []
+    pending_space = False
+    for start in range(0, len(raw_text), block):
+        part = raw_text[start:start + block]
+        words = " ".join(part.split())
+        if not words:
+            pending_space = True
+            continue
+        # A whitespace run or a word may straddle the block boundary
+        if pieces and (pending_space or part[0].isspace()):
+            pieces.append(" ")
+        pieces.append(words)
+        pending_space = part[-1].isspace()
+    return "".join(pieces)
+
+def _count_paragraphs(raw_text):
+    """Non-blank blocks separated by blank lines, without splitting the whole text."""
+    count = 0
+    start = 0
+    while start <= len(raw_text):
+        end = raw_text.find("\n\n", start)
+        if end < 0:
+            end = len(raw_text)
+        if raw_text[start:end].strip():
+            count += 1
+        start = end + 2
+    return count
+
+def _sentence_spans(text):
+    """(start, end) of every sentence, with NLTK's punkt when available."""
+    from utils.preprocess import ensure_nltk_data
+    if ensure_nltk_data():
+        from nltk.tokenize.punkt import PunktTokenizer
+        yield from PunktTokenizer().span_tokenize(text)
+        return
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+class Document:
+    """
+    Memory-lean view of a document's text.
+
+    The whitespace-normalized text is kept in a single string; sentences
+    are stored as start/end offsets in compact arrays rather than as
+    separate strings, and chunks (see chunks()) are offset ranges that are
+    only turned into strings when read. str(document) is the normalized
+    text, so a Document can be passed wherever the text is formatted into a
+    prompt.
+    """
+
+    def __init__(self, raw_text):
+        self.raw_length = len(raw_text)
+        self.paragraphs = _count_paragraphs(raw_text)
+        self.text = normalize_whitespace(raw_text)
+        self._starts = array("I")
+        self._ends = array("I")
+        self._words = array("I")
+        text = self.text
+        for start, end in _sentence_spans(text):
+            self._starts.append(start)
+            self._ends.append(end)
+            # Normalized text has single spaces, so words are spaces + 1
+            self._words.append(text.count(" ", start, end) + 1)
+
+    def __str__(self):
+        return self.text
+
+    def __len__(self):
+        return len(self.text)
+
+    @property
+    def sentence_count(self):
+        return len(self._starts)
+
+    @property
+    def word_count(self):
+        return self.text.count(" ") + 1 if self.text else 0
+
+    def sentence(self, i):
+        return self.text[self._starts[i]:self._ends[i]]
+
+    def sentences(self):
+        """Sentences one at a time."""
+        for i in range(len(self._starts)):
+            yield self.sentence(i)
+
+    def chunks(self, max_tokens=512, overlap=0):
+        """
+        Sentence-aligned chunks of at most max_tokens words (a single longer
+        sentence forms its own chunk), each prefixed with the last overlap
+        sentences of the previous chunk. Same boundaries as
+        utils.preprocess.chunk_text followed by overlap_chunks.
+        """
+        bounds = []  # (first sentence, end sentence) per chunk
+        first = 0
+        tokens = 0
+        for i, words in enumerate(self._words):
+            if tokens and tokens + words > max_tokens:
+                bounds.append((first, i))
+                first, tokens = i, 0
+            tokens += words
+        if first < len(self._words):
+            bounds.append((first, len(self._words)))
+
+        starts = array("I")
+        ends = array("I")
+        for index, (first, end) in enumerate(bounds):
+            if index and overlap > 0:
+                prev_first, prev_end = bounds[index - 1]
+                first = max(prev_first, prev_end - overlap)
+            starts.append(self._starts[first])
+            ends.append(self._ends[end - 1])
+        return ChunkList(self, starts, ends)
+
+class ChunkList(Sequence):
+    """Chunks of a Document as offset ranges; each chunk is materialized when accessed."""
+
+    def __init__(self, document, starts, ends):
+        self.document = document
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.document.text[self._starts[index]:self._ends[index]]
+
+    def spans(self):
+        """(start, end) offsets of every chunk in the document text."""
+        return list(zip(self._starts, self._ends))
@@ -0,0 +1,75 @@
+# utils/fake_llm.py
+
+import os
+import re
+import time
+from types import SimpleNamespace
+
+# Optional per-call delay in seconds, to mimic network latency in load tests
+LATENCY_ENV = "MINDSKETCH_FAKE_LATENCY"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z-]{2,}")
+_STOPWORDS = frozenset(
+    "the and for are was were been being this that these those with from into onto over under "
+    "than then they them their there here which while where when what who whom whose also such "
+    "can could may might must shall should will would has have had not but its it's our your".split()
+)
+_MAX_TRIPLETS = 25
+
+def _prompt_text(prompt):
+    """The document text embedded in one of the groq_utils prompts."""
+    for marker in ("Text to summarize:", "Text:"):
+        if marker in prompt:
+            text = prompt.split(marker, 1)[1]
+            return text.rsplit("\n\nSummary:", 1)[0].rsplit("\n\nConcept Summary:", 1)[0].rsplit("\n\nTriplets:", 1)[0]
+    return prompt
+
+def fake_triplets(text):
+    """
+    Deterministic "(subject, relation, object)" lines built from the text:
+    per sentence, the first content word is the subject, the next word the
+    relation and the last content word the object.
+    """
+    lines = []
+    for sentence in _SENTENCE_RE.split(text):
+        words = [w for w in _WORD_RE.findall(sentence) if w.lower() not in _STOPWORDS]
+        if len(words) < 3:
+            continue
+        subject, relation, obj = words[0], words[1].lower(), words[-1]
+        if subject.lower() != obj.lower():
+            lines.append(f"({subject}, {relation}, {obj})")
+        if len(lines) >= _MAX_TRIPLETS:
+            break
+    return "\n".join(lines)
+
+def fake_summary(text, sentences=3):
+    """The first few sentences of the text."""
+    parts = [s.strip() for s in _SENTENCE_RE.split(" ".join(text.split())) if s.strip()]
+    return " ".join(parts[:sentences])
+
+class _Completions:
+    def create(self, model=None, messages=(), temperature=None, max_tokens=None, **kwargs):
+        latency = float(os.getenv(LATENCY_ENV, "0") or 0)
+        if latency:
+            time.sleep(latency)
+        prompt = messages[-1]["content"] if messages else ""
+        text = _prompt_text(prompt)
+        if "triplets" in prompt.lower():
+            content = fake_triplets(text)
+        else:
+            content = fake_summary(text)
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)], model=model)
+
+class FakeLLMClient:
+    """
+    Offline stand-in for the OpenAI-compatible Groq client.
+
+    Returns deterministic answers derived from the prompt text, so the whole
+    pipeline (and the HTTP service) can be exercised and load-tested without
+    an API key or network access. Selected with MINDSKETCH_LLM_BACKEND=fake.
+    """
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_Completions())
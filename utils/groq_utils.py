@@ -1,26 +1,100 @@
 # utils/groq_utils.py
 
 import os
-import openai
+import threading
 import time
-from typing import List, Tuple, Optional
+from collections import OrderedDict
+from typing import List, Optional
 from dotenv import load_dotenv
 
+from config import get_profile
+from utils.tracing import span
+from utils.triplets import Triplet, parse_triplets
+
 load_dotenv()
 
+# "groq" (default) or "fake" for the offline stand-in in utils/fake_llm.py
+LLM_BACKEND_ENV = "MINDSKETCH_LLM_BACKEND"
+
+def llm_backend() -> str:
+    """Name of the configured LLM backend."""
+    return os.getenv(LLM_BACKEND_ENV, "groq").strip().lower() or "groq"
+
+def llm_available() -> bool:
+    """Whether LLM calls can be made: the fake backend, or Groq with an API key."""
+    if llm_backend() == "fake":
+        return True
+    return os.getenv("GROQ_API_KEY") is not None
+
 def get_groq_client():
-    """Get a configured Groq client."""
+    """Get a configured Groq client (or the fake client when selected)."""
+    if llm_backend() == "fake":
+        from utils.fake_llm import FakeLLMClient
+        return FakeLLMClient()
+    import openai  # Imported on first use; it is slow to import
     return openai.OpenAI(
         api_key=os.getenv("GROQ_API_KEY"),
         base_url="https://api.groq.com/openai/v1"
     )
 
-def summarize_text(text: str, max_length: int = 150) -> str:
+# Responses are memoized per process, so resubmitting a document (or an
+# unchanged chunk) does not pay for the same call twice. Keyed by model,
+# sampling settings and prompt; the size comes from the active profile.
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+# Whether the calling thread's last chat_completion was answered from the cache
+_last_call = threading.local()
+
+def chat_completion(prompt: str, temperature: float, max_tokens: int, profile: Optional[dict] = None) -> str:
+    """One chat completion with the profile's model, through the response cache."""
+    profile = profile or get_profile()
+    key = (llm_backend(), profile["model"], temperature, max_tokens, prompt)
+    _last_call.cached = False
+    with span("llm.call", category="llm", model=profile["model"], max_tokens=max_tokens,
+              prompt_chars=len(prompt)) as call:
+        with _response_cache_lock:
+            if key in _response_cache:
+                _response_cache.move_to_end(key)
+                call.set(cache_hit=True)
+                _last_call.cached = True
+                return _response_cache[key]
+
+        client = get_groq_client()
+        response = client.chat.completions.create(
+            model=profile["model"],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        content = response.choices[0].message.content.strip()
+        usage = getattr(response, "usage", None)
+        call.set(
+            cache_hit=False,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+        )
+
+    with _response_cache_lock:
+        _response_cache[key] = content
+        while len(_response_cache) > profile["llm_cache_size"]:
+            _response_cache.popitem(last=False)
+    return content
+
+def last_call_cached():
+    """True if the calling thread's last chat_completion came from the response cache."""
+    return getattr(_last_call, "cached", False)
+
+def clear_response_cache():
+    """Forget memoized LLM responses."""
+    with _response_cache_lock:
+        _response_cache.clear()
+
+def summarize_text(text: str, max_length: Optional[int] = None) -> str:
     """
-    Summarize text using Groq's Llama3-70b model with better prompting.
+    Summarize text using the profile's Groq model with better prompting.
     """
     try:
-        client = get_groq_client()
+        profile = get_profile()
         prompt = f"""Please provide a clear, concise summary of the following educational content in 3-5 sentences. 
 Focus on the main concepts, key relationships, and important facts. Make it suitable for creating a concept map.
 
@@ -29,28 +103,31 @@ Text to summarize:
 
 Summary:"""
         
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=max_length
+        return chat_completion(
+            prompt, profile["summary_temperature"], max_length or profile["summary_max_tokens"], profile
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"Error in summarization: {e}")
         return f"Summary error: {str(e)}"
 
-def summarize_chunks(chunks: List[str]) -> List[str]:
+def summarize_chunks(chunks: List[str], on_chunk=None) -> List[str]:
     """
-    Summarize multiple text chunks using Groq.
+    Summarize multiple text chunks using Groq. on_chunk(done) is called
+    after each summary; if it returns False, the summaries so far are
+    returned without making further calls.
     """
+    delay = get_profile()["request_delay"]
     summaries = []
     for i, chunk in enumerate(chunks):
         print(f"Summarizing chunk {i+1}/{len(chunks)}")
-        summary = summarize_text(chunk)
+        with span("chunk.summary", chunk_id=i, chars=len(chunk)):
+            summary = summarize_text(chunk)
         summaries.append(summary)
-        # Small delay to avoid rate limiting
-        time.sleep(0.5)
+        if on_chunk is not None and on_chunk(i + 1) is False:
+            break
+        # Small delay to avoid rate limiting; cached summaries made no request
+        if delay and llm_backend() != "fake" and not last_call_cached():
+            time.sleep(delay)
     return summaries
 
 def extract_triplets(text: str) -> str:
@@ -58,7 +135,7 @@ def extract_triplets(text: str) -> str:
     Extract subject-relation-object triplets using Groq with improved prompting.
     """
     try:
-        client = get_groq_client()
+        profile = get_profile()
         prompt = f"""Extract all factual (subject, relation, object) triplets from the following text. 
 Format each triplet as: (subject, relation, object)
 Focus on educational concepts, relationships, and factual information.
@@ -69,23 +146,17 @@ Text:
 
 Triplets:"""
         
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=500
-        )
-        return response.choices[0].message.content.strip()
+        return chat_completion(prompt, profile["extraction_temperature"], profile["extraction_max_tokens"], profile)
     except Exception as e:
         print(f"Error in triplet extraction: {e}")
         return f"Extraction error: {str(e)}"
 
-def extract_relations_enhanced(text: str) -> List[Tuple[str, str, str]]:
+def extract_relations_enhanced(text: str, chunk_id: Optional[int] = None) -> List[Triplet]:
     """
     Enhanced relation extraction that returns parsed triplets directly.
     """
     try:
-        client = get_groq_client()
+        profile = get_profile()
         prompt = f"""Extract all factual (subject, relation, object) triplets from the following text. 
 Return ONLY the triplets in this exact format:
 (subject, relation, object)
@@ -97,46 +168,18 @@ Focus on educational concepts and meaningful relationships. Do not include gener
 Text:
 {text}"""
         
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
-            max_tokens=800
-        )
-        
-        result = response.choices[0].message.content.strip()
-        return parse_triplets_from_text(result)
+        result = chat_completion(prompt, profile["extraction_temperature"], profile["extraction_max_tokens"], profile)
+        return parse_triplets(result, chunk_id, plain_text=False)
     except Exception as e:
         print(f"Error in enhanced relation extraction: {e}")
         return []
 
-def parse_triplets_from_text(text: str) -> List[Tuple[str, str, str]]:
-    """
-    Parse triplets from text output.
-    """
-    triplets = []
-    lines = text.strip().split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if line.startswith('(') and line.endswith(')'):
-            # Remove parentheses and split by comma
-            content = line[1:-1]
-            parts = [part.strip() for part in content.split(',')]
-            if len(parts) >= 3:
-                subject = parts[0]
-                relation = parts[1]
-                object_part = ','.join(parts[2:])  # Handle objects with commas
-                triplets.append((subject, relation, object_part))
-    
-    return triplets
-
 def create_concept_summary(text: str) -> str:
     """
     Create a high-level concept summary for the entire document.
     """
     try:
-        client = get_groq_client()
+        profile = get_profile()
         prompt = f"""Create a comprehensive concept summary of the following educational content. 
 Identify the main themes, key concepts, and their relationships. This will be used as an overview for a concept map.
 
@@ -145,13 +188,7 @@ Text:
 
 Concept Summary:"""
         
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.4,
-            max_tokens=300
-        )
-        return response.choices[0].message.content.strip()
+        return chat_completion(prompt, profile["overview_temperature"], profile["overview_max_tokens"], profile)
     except Exception as e:
         print(f"Error in concept summary: {e}")
         return f"Summary error: {str(e)}"
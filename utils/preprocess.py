@@ -1,21 +1,91 @@
-import fitz  # PyMuPDF
-import nltk
 import os
+import re
+import threading
 import time
 from typing import List, Tuple
 
-def ensure_nltk_data():
-    """Ensure required NLTK data is downloaded."""
+from utils.tracing import span, traced
+
+# Heavy modules (PyMuPDF, NLTK) are imported on first use to keep startup fast
+
+# Seconds to wait for a one-time NLTK data download before falling back
+NLTK_DOWNLOAD_TIMEOUT = 15
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_nltk_ready = None
+_nltk_lock = threading.Lock()
+
+def is_offline():
+    """Whether MINDSKETCH_OFFLINE asks us not to touch the network."""
+    return os.getenv("MINDSKETCH_OFFLINE", "").strip().lower() in ("1", "true", "yes")
+
+def _find_punkt():
+    import nltk
     try:
-        nltk.data.find('tokenizers/punkt')
+        nltk.data.find('tokenizers/punkt_tab')
+        return True
     except LookupError:
-        print("Downloading NLTK punkt tokenizer...")
-        nltk.download('punkt', quiet=True)
+        return False
+
+def _check_nltk_data():
+    try:
+        if _find_punkt():
+            return True
+    except ImportError:
+        return False
+    if is_offline():
+        print("NLTK punkt data not found (offline). Using simple sentence splitting.")
+        return False
+
+    import nltk
+    print("Downloading NLTK punkt tokenizer...")
+    # nltk.download has no timeout of its own, so never let it block startup
+    downloader = threading.Thread(target=nltk.download, args=('punkt_tab',), kwargs={"quiet": True}, daemon=True)
+    downloader.start()
+    downloader.join(NLTK_DOWNLOAD_TIMEOUT)
+    if not downloader.is_alive() and _find_punkt():
+        return True
+    print("NLTK punkt data unavailable. Using simple sentence splitting.")
+    return False
 
+def ensure_nltk_data():
+    """
+    Check once per process that NLTK's punkt tokenizer data is available,
+    downloading it (with a timeout, and not at all when MINDSKETCH_OFFLINE
+    is set) if it is missing. Returns True if NLTK can split sentences.
+    """
+    global _nltk_ready
+    if _nltk_ready is None:
+        with _nltk_lock:
+            if _nltk_ready is None:
+                with span("nltk.data_check") as s:
+                    _nltk_ready = _check_nltk_data()
+                    s.set(available=_nltk_ready)
+    return _nltk_ready
+
+def sent_tokenize(text):
+    """
+    Split text into sentences with NLTK's punkt tokenizer, or with a simple
+    punctuation-based splitter when the NLTK data is not available.
+    """
+    with span("sentences.split", chars=len(text)) as s:
+        if ensure_nltk_data():
+            import nltk
+            sentences = nltk.sent_tokenize(text)
+            s.set(backend="nltk", sentences=len(sentences))
+            return sentences
+        sentences = [part for part in _SENTENCE_END.split(text) if part.strip()]
+        s.set(backend="regex", sentences=len(sentences))
+        return sentences
+
+@traced("pdf.extract")
 def extract_text_from_pdf(file_path, progress_callback=None):
-    """Extract text from PDF file with progress tracking."""
+    """Extract text from PDF file (path or bytes) with progress tracking."""
     try:
-        doc = fitz.open(file_path)
+        import fitz  # PyMuPDF
+        if isinstance(file_path, (bytes, bytearray)):
+            doc = fitz.open(stream=file_path, filetype="pdf")
+        else:
+            doc = fitz.open(file_path)
         total_pages = len(doc)
         
         if progress_callback:
@@ -42,10 +112,12 @@ def extract_text_from_pdf(file_path, progress_callback=None):
         return ""
 
 def estimate_document_size(text):
-    """Estimate document size and recommend chunking strategy."""
-    char_count = len(text)
-    word_count = len(text.split())
-    page_estimate = char_count / 2000  # Rough estimate: 2000 chars per page
+    """
+    Estimate document size and recommend chunking strategy. A
+    utils.document.Document is sized by its raw length, like the text it
+    was built from, so both representations get the same category.
+    """
+    char_count = getattr(text, "raw_length", len(text))
     
     if char_count < 50000:  # Small document
         return "small", 512, 1
@@ -56,10 +128,9 @@ def estimate_document_size(text):
     else:  # Very large document
         return "very_large", 1536, 4
 
+@traced("chunk.split")
 def chunk_text(text, max_tokens=512, progress_callback=None):
     """Split text into chunks for processing with adaptive sizing."""
-    ensure_nltk_data()
-    
     if not text:
         return []
     
@@ -79,14 +150,14 @@ def chunk_text(text, max_tokens=512, progress_callback=None):
     text = ' '.join(text.split())  # Remove extra whitespace
     
     # Split by sentences first
-    sentences = nltk.sent_tokenize(text)
+    sentences = sent_tokenize(text)
     
     if progress_callback:
         progress_callback(f"📚 Processing {len(sentences)} sentences...")
     
     chunks = []
-    current_chunk = ""
-    chunk_count = 0
+    current_sentences = []
+    current_tokens = 0  # kept as a running count; re-splitting the chunk every sentence was quadratic
     
     for i, sentence in enumerate(sentences):
         sentence_tokens = len(sentence.split())
@@ -96,17 +167,18 @@ def chunk_text(text, max_tokens=512, progress_callback=None):
             progress_callback(f"📚 Processing sentence {i + 1}/{len(sentences)}")
         
         # If adding this sentence would exceed max_tokens, save current chunk
-        if len(current_chunk.split()) + sentence_tokens > max_tokens and current_chunk:
-            chunks.append(current_chunk.strip())
-            chunk_count += 1
-            current_chunk = sentence
-        else:
-            current_chunk += " " + sentence if current_chunk else sentence
+        if current_tokens + sentence_tokens > max_tokens and current_sentences:
+            chunks.append(" ".join(current_sentences).strip())
+            current_sentences = []
+            current_tokens = 0
+        current_sentences.append(sentence)
+        current_tokens += sentence_tokens
     
     # Add the last chunk if it exists
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-        chunk_count += 1
+    if current_sentences:
+        last_chunk = " ".join(current_sentences).strip()
+        if last_chunk:
+            chunks.append(last_chunk)
     
     # Ensure we have at least one chunk
     if not chunks and text:
@@ -117,6 +189,7 @@ def chunk_text(text, max_tokens=512, progress_callback=None):
     
     return chunks
 
+@traced("chunk.overlap")
 def overlap_chunks(chunks, overlap=1, progress_callback=None):
     """Create overlapping chunks for better context preservation."""
     if not chunks:
@@ -134,7 +207,7 @@ def overlap_chunks(chunks, overlap=1, progress_callback=None):
             # Add previous chunk content for overlap
             prev_chunk = chunks[i-1]
             # Take last few sentences from previous chunk
-            prev_sentences = nltk.sent_tokenize(prev_chunk)
+            prev_sentences = sent_tokenize(prev_chunk)
             overlap_text = " ".join(prev_sentences[-overlap:]) if len(prev_sentences) >= overlap else prev_chunk
             chunk = overlap_text + " " + chunk
         
@@ -146,13 +219,23 @@ def overlap_chunks(chunks, overlap=1, progress_callback=None):
     return overlapped
 
 def get_document_stats(text):
-    """Get comprehensive document statistics."""
+    """Get comprehensive document statistics (text may be a utils.document.Document)."""
     if not text:
         return {}
+    if hasattr(text, "sentence_count"):
+        # Counted from the document's offsets, without splitting its text again
+        return {
+            'characters': text.raw_length,
+            'words': text.word_count,
+            'sentences': text.sentence_count,
+            'paragraphs': text.paragraphs,
+            'estimated_pages': text.raw_length / 2000,
+            'size_category': estimate_document_size(text)[0]
+        }
     
     char_count = len(text)
     word_count = len(text.split())
-    sentence_count = len(nltk.sent_tokenize(text))
+    sentence_count = len(sent_tokenize(text))
     paragraph_count = len([p for p in text.split('\n\n') if p.strip()])
     
     return {
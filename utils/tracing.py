@@ -0,0 +1,187 @@
+# utils/tracing.py
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Tracer of the current job; spans opened while none is active cost one lookup
+_active_tracer = ContextVar("mindsketch_tracer", default=None)
+
+class _NoopSpan:
+    """Returned by span() when tracing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class Span:
+    """One timed region. Attributes can be added while it is open with set()."""
+
+    __slots__ = ("tracer", "name", "category", "attrs", "start", "thread")
+
+    def __init__(self, tracer, name, category, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.start = None
+        self.thread = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.thread = threading.current_thread()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._record(self, end)
+        return False
+
+class Tracer:
+    """
+    Collects timed spans for one pipeline run.
+
+    Activate it with tracing(tracer); every span() opened in that context,
+    including in threads started with a copy of it, is recorded. Export
+    with to_chrome_trace() (load the file in chrome://tracing or
+    ui.perfetto.dev) or summarize with summary().
+    """
+
+    def __init__(self, name="pipeline"):
+        self.name = name
+        self.events = []
+        self._origin = time.perf_counter_ns()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, category="pipeline", **attrs):
+        return Span(self, name, category, attrs)
+
+    def _record(self, span, end):
+        thread = span.thread
+        with self._lock:
+            tid = self._threads.setdefault(thread.ident, (len(self._threads) + 1, thread.name))[0]
+            self.events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - self._origin) / 1000,
+                "dur": (end - span.start) / 1000,
+                "pid": 1,
+                "tid": tid,
+                "args": span.attrs,
+            })
+
+    def to_chrome_trace(self):
+        """Trace Event Format dict (complete events plus thread names)."""
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+            threads = list(self._threads.values())
+        metadata = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.name}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread_name}}
+            for tid, thread_name in threads
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        """Write the Chrome trace JSON to path."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        return path
+
+    def summary(self):
+        """
+        One row per span name, slowest total first: count, total, mean and
+        max duration in milliseconds, and the share of the run's wall time.
+        """
+        with self._lock:
+            events = list(self.events)
+        if not events:
+            return []
+        wall = max(e["ts"] + e["dur"] for e in events) - min(e["ts"] for e in events)
+        rows = {}
+        for event in events:
+            row = rows.setdefault(event["name"], {"name": event["name"], "category": event["cat"],
+                                                  "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            duration = event["dur"] / 1000
+            row["count"] += 1
+            row["total_ms"] += duration
+            row["max_ms"] = max(row["max_ms"], duration)
+        for row in rows.values():
+            row["mean_ms"] = row["total_ms"] / row["count"]
+            row["share"] = row["total_ms"] * 1000 / wall if wall else 0.0
+        return sorted(rows.values(), key=lambda row: row["total_ms"], reverse=True)
+
+    def format_summary(self):
+        """summary() as a fixed-width text table."""
+        lines = [f"{'span':<28} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'share':>6}"]
+        for row in self.summary():
+            lines.append(
+                f"{row['name'][:28]:<28} {row['count']:>6} {row['total_ms']:>10.1f} "
+                f"{row['mean_ms']:>9.2f} {row['max_ms']:>9.1f} {row['share']:>6.0%}"
+            )
+        return "\n".join(lines)
+
+def current_tracer():
+    """The active tracer, or None."""
+    return _active_tracer.get()
+
+@contextmanager
+def tracing(tracer):
+    """Make tracer the active one (None turns tracing off) for this context."""
+    token = _active_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _active_tracer.reset(token)
+
+def span(name, category="pipeline", **attrs):
+    """
+    Context manager timing a region under the active tracer:
+
+        with span("llm.call", chunk_id=3) as s:
+            ...
+            s.set(cache_hit=False)
+
+    A shared no-op when tracing is off.
+    """
+    tracer = _active_tracer.get()
+    if tracer is None:
+        return _NOOP_SPAN
+    return Span(tracer, name, category, attrs)
+
+def traced(name=None, category="pipeline"):
+    """Decorator wrapping every call of a function in a span."""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _active_tracer.get()
+            if tracer is None:
+                return func(*args, **kwargs)
+            with Span(tracer, span_name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
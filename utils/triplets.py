@@ -0,0 +1,67 @@
+# utils/triplets.py
+
+from typing import List, NamedTuple, Optional, Tuple
+
+class Triplet(NamedTuple):
+    """
+    A (subject, relation, object) fact extracted from one chunk of a document.
+
+    Deduplicated triplets (pipeline.triplet_store.TripletAggregator) also
+    carry count, the number of times the fact was extracted, and sources,
+    the IDs of every chunk it was extracted from.
+    """
+    subject: str
+    relation: str
+    object: str
+    chunk_id: Optional[int] = None
+    confidence: float = 1.0
+    count: int = 1
+    sources: Tuple[int, ...] = ()
+
+    def key(self):
+        """The (subject, relation, object) identity of the triplet."""
+        return (self.subject, self.relation, self.object)
+
+# Confidence assigned when the relation had to be guessed from plain text
+HEURISTIC_CONFIDENCE = 0.5
+
+def as_triplet(value, chunk_id=None) -> Triplet:
+    """Coerce a Triplet or a plain (subject, relation, object) tuple to a Triplet."""
+    if isinstance(value, Triplet):
+        return value
+    subject, relation, obj = value[:3]
+    return Triplet(subject, relation, obj, chunk_id)
+
+def parse_triplets(text: str, chunk_id: Optional[int] = None, plain_text: bool = True) -> List[Triplet]:
+    """
+    Parse triplets from model output.
+    Handles both Groq format "(subject, relation, object)" and REBEL
+    format "subject relation object". Set plain_text=False to ignore
+    lines that are not parenthesized.
+    """
+    if not text or text.lower().startswith(("extraction error", "summary error")):
+        return []
+
+    triplets = []
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # Handle Groq format: (subject, relation, object)
+        if line.startswith('(') and line.endswith(')'):
+            parts = [part.strip() for part in line[1:-1].split(',')]
+            if len(parts) >= 3:
+                object_part = ','.join(parts[2:])  # Handle objects with commas
+                triplets.append(Triplet(parts[0], parts[1], object_part, chunk_id))
+
+        # Handle REBEL format: subject relation object
+        elif plain_text:
+            tokens = line.split()
+            if len(tokens) >= 3:
+                # The relation is guessed to be the second token
+                triplets.append(Triplet(
+                    tokens[0], tokens[1], ' '.join(tokens[2:]), chunk_id, HEURISTIC_CONFIDENCE
+                ))
+
+    return triplets